@@ -1,13 +1,17 @@
 # app.py
 
 import os
-from flask import Flask, request, jsonify, render_template, send_from_directory
+from contextlib import closing
+from flask import Flask, Response, request, jsonify, render_template, send_from_directory, stream_with_context
+import json_codec
 
 
 # from agenticai_lotus import  LotusElectronicsBot
 # from try_agentic import chat_with_agent
 
 app = Flask(__name__, static_folder="static", template_folder="templates")
+# Compact (orjson when available) encoding for jsonify()
+app.json = json_codec.CompactJSONProvider(app)
 # allow all origins; adjust in production as needed
 
 @app.route("/static")
@@ -19,12 +23,12 @@ def index():
     # Renders templates/chatbot.html
     return render_template("chat.html")
 
-from chat import chat_with_agent, redis_memory
-from tools.product_search_tool import ProductSearchTool
+from chat import CHAT_BATCH_MAX_ITEMS, chat_with_agent, chat_with_agent_batch, redis_memory
+from tools.product_search_tool import product_search_instance
 import json
 
-# Initialize the product search tool
-search_tool = ProductSearchTool()
+# The agent's product search tool instance: /search shares its indexes and result cache
+search_tool = product_search_instance
 
 @app.route("/health", methods=["GET"])
 def health():
@@ -63,21 +67,43 @@ def chat():
         return jsonify({"error": "Missing 'message' in request"}), 400
 
     try:
-        ai_reply = chat_with_agent(message, session_id)
-        data = json.loads(ai_reply)
+        data = chat_with_agent(message, session_id)
         
         response = {
             "status": "success",
             "data": data
         }
         return jsonify(response)
-    except json.JSONDecodeError as e:
-        app.logger.error(f"JSON decode error: {e}")
-        return jsonify({"error": "Invalid JSON response from agent"}), 500
     except Exception as e:
         app.logger.exception("Error in chat_with_agent")
         return jsonify({"error": str(e)}), 500
 
+@app.route("/chat/batch", methods=["POST"])
+def chat_batch():
+    """Run many turns at once; streams one NDJSON result line per turn as it completes."""
+    payload = request.get_json(force=True, silent=True)
+    if not isinstance(payload, dict):
+        return jsonify({"error": "Request body must be a JSON object"}), 400
+    turns = payload.get("turns")
+    
+    if not isinstance(turns, list) or not turns:
+        return jsonify({"error": "Missing 'turns' list in request"}), 400
+    if len(turns) > CHAT_BATCH_MAX_ITEMS:
+        return jsonify({"error": f"At most {CHAT_BATCH_MAX_ITEMS} turns per batch"}), 400
+    try:
+        max_concurrency = int(payload.get("max_concurrency") or 0) or None
+    except (TypeError, ValueError):
+        return jsonify({"error": "'max_concurrency' must be an integer"}), 400
+    
+    def generate():
+        # The WSGI server closes this generator when the client disconnects; closing
+        # the batch with it cancels the turns still running
+        with closing(chat_with_agent_batch(turns, max_concurrency)) as results:
+            for result in results:
+                yield json_codec.dumps_line(result)
+    
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
 @app.route("/search", methods=["POST"])
 def direct_search():
     """Direct product search endpoint using hybrid search"""
@@ -91,23 +117,23 @@ def direct_search():
         return jsonify({"error": "Missing 'query' in request"}), 400
     
     try:
-        # Use the hybrid search directly
-        results = search_tool.search_products(
-            query=query,
-            top_k=min(top_k, 20),  # Limit to 20 max
-            price_min=price_min,
-            price_max=price_max
-        )
+        # Parse price/brand filters out of free-text queries ("samsung ac under 50k")
+        normalized = search_tool.normalize(query, price_min, price_max)
         
-        # Format results for response
-        formatted_response = search_tool.format_results(results)
+        # Hybrid search + formatting, or the cached result of an identical recent search
+        formatted_response = search_tool.search_formatted(
+            query, top_k=min(top_k, 20),  # Limit to 20 max
+            price_min=normalized["price_min"], price_max=normalized["price_max"],
+            normalized=normalized
+        )
         data = json.loads(formatted_response)
         
         response = {
             "status": "success",
             "search_method": "hybrid",
             "query": query,
-            "total_results": len(results),
+            "normalized_query": normalized,
+            "total_results": data["total_found"],
             "data": data
         }
         return jsonify(response)
@@ -2,7 +2,6 @@
 
 import os
 import logging
-import json
 from flask import Flask, request, jsonify, render_template, send_from_directory
 
 # Import your modules
@@ -63,12 +62,8 @@ def chat():
         return jsonify({"error": "Missing 'message' in request"}), 400
 
     try:
-        ai_reply = chat_with_agent(message, session_id)
-        data = json.loads(ai_reply)
+        data = chat_with_agent(message, session_id)
         return jsonify({"status": "success", "data": data})
-    except json.JSONDecodeError as e:
-        logger.error(f"JSON decode error: {e}")
-        return jsonify({"error": "Invalid JSON response from agent"}), 500
     except Exception as e:
         logger.exception("Error in chat_with_agent")
         return jsonify({"error": str(e)}), 500
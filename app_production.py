@@ -2,14 +2,17 @@
 import os
 import time
 import logging
+from contextlib import closing
 from functools import wraps
-from flask import Flask, request, jsonify, render_template, send_from_directory, g
+from flask import Flask, Response, request, jsonify, render_template, send_from_directory, g, stream_with_context
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 from flask_caching import Cache
 from prometheus_flask_exporter import PrometheusMetrics
+from prometheus_flask_exporter.multiprocess import GunicornInternalPrometheusMetrics
 import redis
 import structlog
+import json_codec
 
 # Configure structured logging
 structlog.configure(
@@ -34,6 +37,8 @@ logger = structlog.get_logger()
 
 # Initialize Flask app
 app = Flask(__name__, static_folder="static", template_folder="templates")
+# Compact (orjson when available) encoding for jsonify(); replies are serialized only here
+app.json = json_codec.CompactJSONProvider(app)
 
 # Configuration
 app.config.update({
@@ -55,7 +60,13 @@ limiter = Limiter(
 limiter.init_app(app)
 
 # Initialize Prometheus metrics
-metrics = PrometheusMetrics(app)
+# Under gunicorn each worker is a separate process: with PROMETHEUS_MULTIPROC_DIR set
+# (see gunicorn.conf.py) samples are written per worker and aggregated on /metrics.
+# The stage metrics from chat_metrics.py live in the default registry and are exported here too.
+if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+    metrics = GunicornInternalPrometheusMetrics(app)
+else:
+    metrics = PrometheusMetrics(app)
 metrics.info('app_info', 'Application info', version='1.0.0')
 
 # Static metrics for monitoring
@@ -68,7 +79,7 @@ chat_response_time = metrics.histogram(
 )
 
 # Import your existing modules
-from chat import chat_with_agent, redis_memory
+from chat import CHAT_BATCH_MAX_ITEMS, chat_with_agent, chat_with_agent_batch, redis_memory
 from tools.product_search_tool import ProductSearchTool
 import json
 
@@ -264,7 +275,7 @@ def chat():
                 request_id=g.request_id
             )
 
-            # Add CORS headers
+            # result is the reply dict - encoded once, compactly, by the app's JSON provider
             response = jsonify({"response": result})
             response.headers.add("Access-Control-Allow-Origin", "*")
             response.headers.add("Access-Control-Allow-Headers", "*")
@@ -300,11 +311,49 @@ def chat():
             "message": "We're experiencing technical difficulties. Please try again."
         }), 500
 
+@app.route("/chat/batch", methods=["POST"])
+@limiter.limit("10 per minute")
+def chat_batch():
+    """
+    Bulk chat endpoint for QA replays and channel backfills.
+    Body: {"turns": [{"session_id", "message", "id"?}, ...], "max_concurrency"?: int}
+    Streams one NDJSON line per turn as it completes.
+    """
+    api_key = request.headers.get("X-API-Key")
+    if not api_key or api_key != "nawabkhan":
+        logger.warning("unauthorized_access", remote_addr=get_remote_address())
+        return jsonify({"error": "Unauthorized"}), 401
+
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({"error": "Request body must be a JSON object"}), 400
+    turns = data.get("turns")
+    if not isinstance(turns, list) or not turns:
+        return jsonify({"error": "'turns' must be a non-empty list"}), 400
+    if len(turns) > CHAT_BATCH_MAX_ITEMS:
+        return jsonify({"error": f"At most {CHAT_BATCH_MAX_ITEMS} turns per batch"}), 400
+
+    try:
+        max_concurrency = int(data.get("max_concurrency") or 0) or None
+    except (TypeError, ValueError):
+        return jsonify({"error": "'max_concurrency' must be an integer"}), 400
+
+    logger.info("chat_batch_request", turns=len(turns), max_concurrency=max_concurrency, request_id=g.request_id)
+
+    def generate():
+        # The WSGI server closes this generator when the client disconnects; closing
+        # the batch with it cancels the turns still running
+        with closing(chat_with_agent_batch(turns, max_concurrency)) as results:
+            for result in results:
+                yield json_codec.dumps_line(result)
+
+    response = Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+    # Let nginx pass lines through as they are produced
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
+
 # Additional monitoring endpoints
-@app.route("/metrics")
-def metrics_endpoint():
-    """Prometheus metrics endpoint"""
-    return metrics.generate_latest()
+# /metrics is registered by the PrometheusMetrics instance above
 
 @app.route("/status")
 @cached_response(timeout=60)  # Cache for 1 minute
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Add a numeric price_num metadata field to every product in the Pinecone index,
+so ProductSearchTool can push price_min/price_max into the query as a metadata
+filter ({"price_num": {"$gte": ..., "$lte": ...}}). The catalog's own "price"
+field is not reliably numeric and Pinecone range filters only match numbers.
+
+Products whose price does not parse, or is not positive, are left without
+price_num and therefore never match a price-filtered query (search_products
+drops them anyway). Safe to re-run; only changed values are written.
+Run it before enabling price filters on the workers (PINECONE_PRICE_FILTER=true,
+default false): an index without price_num returns nothing for a filtered query.
+
+Usage:
+    python backfill_price_num.py
+    python backfill_price_num.py --dry-run
+"""
+
+import argparse
+import os
+import time
+
+from pinecone import Pinecone
+
+from build_catalog_snapshot import PINECONE_HOST, PINECONE_INDEX_NAME
+
+
+def parse_price(value):
+    """The price as a positive float, or None ("₹1,299.00" and 1299 both parse)."""
+    if isinstance(value, str):
+        value = value.replace("₹", "").replace(",", "").strip()
+    try:
+        price = float(value)
+    except (TypeError, ValueError):
+        return None
+    return price if price > 0 else None
+
+
+def backfill(index, batch_size: int = 100, dry_run: bool = False):
+    """(updated, unchanged, unpriced) counts after setting price_num on every vector."""
+    updated = unchanged = unpriced = 0
+    for id_page in index.list(limit=batch_size):
+        ids = list(id_page)
+        for start in range(0, len(ids), batch_size):
+            fetched = index.fetch(ids=ids[start:start + batch_size]).vectors
+            for vector_id, vector in fetched.items():
+                metadata = vector.metadata or {}
+                price = parse_price(metadata.get("price"))
+                if price is None:
+                    unpriced += 1
+                elif metadata.get("price_num") == price:
+                    unchanged += 1
+                else:
+                    if not dry_run:
+                        index.update(id=vector_id, set_metadata={"price_num": price})
+                    updated += 1
+        print(f"   ... {updated + unchanged + unpriced} vectors")
+    return updated, unchanged, unpriced
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--batch-size', type=int, default=100, help='Ids per list/fetch request')
+    parser.add_argument('--dry-run', action='store_true', help='Count the changes without writing them')
+    args = parser.parse_args()
+
+    api_key = os.getenv("PINECONE_API_KEY")
+    if not api_key:
+        print("❌ Set PINECONE_API_KEY to backfill the catalog")
+        return 1
+    index = Pinecone(api_key=api_key).Index(PINECONE_INDEX_NAME, host=PINECONE_HOST)
+
+    print(f"💰 Backfilling price_num in {PINECONE_INDEX_NAME}{' (dry run)' if args.dry_run else ''} ...")
+    start = time.perf_counter()
+    updated, unchanged, unpriced = backfill(index, args.batch_size, args.dry_run)
+    print(f"✅ {updated} updated, {unchanged} already set, {unpriced} without a usable price "
+          f"in {time.perf_counter() - start:.1f}s")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Benchmark: torch vs ONNX Runtime (fp32, int8) query embedding backends.
+
+Each backend runs in its own subprocess so import cost and memory are measured
+cleanly: load time (imports + model), resident memory after warm-up, latency
+of single-query encodes (the search tools' case) and throughput of 32-text
+batches. ONNX outputs are also compared with torch (min / mean cosine).
+
+Needs an export from export_onnx_embedding.py for the ONNX rows; torch rows
+need sentence-transformers. Missing backends are reported and skipped.
+
+Usage:
+    python benchmarks/bench_embedding_backends.py
+    python benchmarks/bench_embedding_backends.py --backends torch onnx-int8 --number 500
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+QUERIES = [
+    "samsung smartphone under 20000", "55 inch 4k smart tv", "double door refrigerator",
+    "1.5 ton split inverter ac", "gaming laptop", "noise cancelling headphones", "what is the return policy",
+    "warranty terms for televisions", "front load washing machine", "bluetooth earbuds with long battery",
+]
+
+
+def rss_mb() -> float:
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def child(backend: str, number: int) -> dict:
+    """Runs in the subprocess: load one backend and time it."""
+    baseline = rss_mb()
+    start = time.perf_counter()
+    from tools.embeddings import EMBEDDING_MODEL_NAME, EMBEDDING_MODEL_VERSION, LocalEncoder
+    if backend == "torch":
+        encoder = LocalEncoder(EMBEDDING_MODEL_NAME)
+    else:
+        from tools.onnx_encoder import OnnxEncoder
+        encoder = OnnxEncoder.load(EMBEDDING_MODEL_NAME, EMBEDDING_MODEL_VERSION, quantized=backend == "onnx-int8")
+    encoder.encode_batch(QUERIES[:2])
+    load_seconds = time.perf_counter() - start
+
+    latencies = []
+    for i in range(number):
+        start = time.perf_counter()
+        encoder.encode_batch([QUERIES[i % len(QUERIES)]])
+        latencies.append(time.perf_counter() - start)
+    batch = [QUERIES[i % len(QUERIES)] + f" {i}" for i in range(32)]
+    start = time.perf_counter()
+    rounds = max(1, number // 32)
+    for _ in range(rounds):
+        encoder.encode_batch(batch)
+    throughput = rounds * len(batch) / (time.perf_counter() - start)
+
+    return {
+        "backend": backend,
+        "load_seconds": load_seconds,
+        "rss_mb": rss_mb() - baseline,
+        "p50_ms": float(np.percentile(latencies, 50) * 1000),
+        "p95_ms": float(np.percentile(latencies, 95) * 1000),
+        "batch_texts_per_s": throughput,
+        "torch_loaded": "torch" in sys.modules,
+        "embeddings": encoder.encode_batch(QUERIES).tolist(),
+    }
+
+
+def run_child(backend: str, number: int):
+    result = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--child", backend, "--number", str(number)],
+        capture_output=True, text=True, cwd=ROOT,
+    )
+    lines = [line for line in result.stdout.splitlines() if line.startswith("{")]
+    if result.returncode != 0 or not lines:
+        error = (result.stderr.strip().splitlines() or ["no output"])[-1]
+        return None, error
+    return json.loads(lines[-1]), None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--backends', nargs='+', default=['torch', 'onnx-fp32', 'onnx-int8'],
+                        choices=['torch', 'onnx-fp32', 'onnx-int8'])
+    parser.add_argument('--number', type=int, default=200, help='Single-query encodes per backend')
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(child(args.child, args.number)))
+        return 0
+
+    results = {}
+    for backend in args.backends:
+        result, error = run_child(backend, args.number)
+        if result is None:
+            print(f"⚠️  {backend}: skipped ({error})")
+        else:
+            results[backend] = result
+
+    reference = np.array(results["torch"]["embeddings"]) if "torch" in results else None
+    print(f"\n{'backend':<10} {'load s':>7} {'RSS MB':>7} {'p50 ms':>7} {'p95 ms':>7} {'batch/s':>8} "
+          f"{'torch?':>6} {'min cos':>8} {'mean cos':>8}")
+    for backend, result in results.items():
+        agreement = ("-", "-")
+        if reference is not None and backend != "torch":
+            emb = np.array(result["embeddings"])
+            cos = (emb * reference).sum(axis=1) / (np.linalg.norm(emb, axis=1) * np.linalg.norm(reference, axis=1))
+            agreement = (f"{cos.min():.5f}", f"{cos.mean():.5f}")
+        print(f"{backend:<10} {result['load_seconds']:>7.1f} {result['rss_mb']:>7.0f} {result['p50_ms']:>7.2f} "
+              f"{result['p95_ms']:>7.2f} {result['batch_texts_per_s']:>8.0f} "
+              f"{'yes' if result['torch_loaded'] else 'no':>6} {agreement[0]:>8} {agreement[1]:>8}")
+    if results:
+        print("\n✅ RSS is the growth over a bare interpreter; multiply by the worker count for a box")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Benchmark: micro-batched query embeddings vs one encode per request.
+
+C client threads each encode distinct search queries as fast as they can
+(the embedding cache is disabled, so every call reaches the model). For each
+batching window (0 = no batching, every thread calls model.encode itself) it
+reports throughput and the p50/p95 latency a caller sees, which includes the
+time spent waiting for a batch to fill.
+
+Usage:
+    python benchmarks/bench_embedding_batching.py
+    python benchmarks/bench_embedding_batching.py --concurrency 1 4 16 --waits 0 2 5 --requests 400
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools.embeddings import EMBEDDING_MODEL_NAME, Embedder, EmbeddingCache
+
+PRODUCTS = ["smartphone", "laptop", "smart tv", "refrigerator", "air conditioner", "washing machine",
+            "earbuds", "soundbar", "smartwatch", "tablet", "microwave", "water purifier"]
+MODIFIERS = ["samsung", "lg", "under 20000", "5 star", "best", "budget", "gaming", "with warranty"]
+
+
+def queries(count):
+    # Distinct texts, so batches never collapse duplicate rows
+    return [f"{MODIFIERS[i % len(MODIFIERS)]} {PRODUCTS[i % len(PRODUCTS)]} {i}" for i in range(count)]
+
+
+def run(model, concurrency, wait_ms, texts, max_batch):
+    embedder = Embedder(cache=EmbeddingCache("bench", None, max_entries=0, ttl=0), model=model,
+                        max_batch=max_batch, max_wait_ms=wait_ms)
+    latencies = []
+    lock = threading.Lock()
+    chunks = [texts[i::concurrency] for i in range(concurrency)]
+
+    def client(chunk):
+        local = []
+        for text in chunk:
+            start = time.perf_counter()
+            embedder.encode(text)
+            local.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=client, args=(chunk,)) for chunk in chunks]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    return len(texts) / elapsed, np.percentile(latencies, 50) * 1000, np.percentile(latencies, 95) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 2, 4, 8, 16, 32], help='Client threads')
+    parser.add_argument('--waits', type=float, nargs='+', default=[0, 1, 2, 5, 10], help='Batch windows in ms (0 = off)')
+    parser.add_argument('--requests', type=int, default=256, help='Encodes per run')
+    parser.add_argument('--max-batch', type=int, default=32, help='Texts per batch')
+    args = parser.parse_args()
+
+    from sentence_transformers import SentenceTransformer
+    model = SentenceTransformer(EMBEDDING_MODEL_NAME)
+    texts = queries(args.requests)
+    model.encode(texts[:8])  # warm-up
+    print(f"🧠 {EMBEDDING_MODEL_NAME}, {args.requests} encodes per run, max batch {args.max_batch}")
+
+    print(f"\n{'clients':>7} {'wait ms':>8} {'texts/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'vs unbatched':>13}")
+    for concurrency in args.concurrency:
+        baseline = None
+        for wait_ms in args.waits:
+            throughput, p50, p95 = run(model, concurrency, wait_ms, texts, args.max_batch)
+            if baseline is None:
+                baseline = throughput
+            print(f"{concurrency:>7} {wait_ms:>8g} {throughput:>9.0f} {p50:>8.1f} {p95:>8.1f} "
+                  f"{throughput / baseline:>12.2f}x")
+    print("\n✅ Done: pick the smallest window that gets most of the throughput at your usual concurrency")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Benchmark: ProductSearchTool.format_results with display fields derived per
+query (features from the description, default features, price string, URL;
+what every search did before they were stored in the catalog snapshot) vs
+selected from the fields save_snapshot precomputed.
+
+Writes a synthetic catalog snapshot, turns its rows into search results the
+way search_products does, and formats random top_k pages of them both ways.
+The two outputs are checked to be identical. Also reports what deriving the
+fields costs once per product at snapshot build time.
+
+Importing the tool loads the embedding model (as the agent does); the
+snapshot is used as the local backend, so Pinecone is not contacted.
+
+Usage:
+    python benchmarks/bench_format_results.py
+    python benchmarks/bench_format_results.py --products 5000 --top-k 10 --number 5000
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+NAMES = ["Samsung Galaxy A36 5G 8GB RAM 128GB", "OnePlus Nord CE4 Lite 5G", "Sony WH-CH720N Wireless Headphones",
+         "LG 55 inch 4K Smart TV", "HP Pavilion Laptop 16GB", "LG 1.5 Ton 5 Star Split Inverter AC",
+         "Samsung 253 L Double Door Refrigerator", "boAt Airdopes 141 Earbuds", "IFB 8 kg Front Load Washing Machine"]
+SPECS = ["Display: 6.7 inch Super AMOLED", "Processor: Octa Core 2.4 GHz", "Battery: 5000 mAh", "Camera Back: 50MP",
+         "Internal Memory: 128 GB", "Network: 5G", "Operating System: Android 14", "Energy Rating: 5 Star",
+         "Capacity: 253 L", "Warranty: 1 Year", "Colour: Black", "Connectivity: Bluetooth 5.3", "Fast Charging",
+         "Refresh Rate: 120Hz", "undefined", "N/A"]
+
+
+def synthetic_catalog(count, seed=0):
+    rng = random.Random(seed)
+    ids, metadata = [], []
+    for i in range(count):
+        name = f"{rng.choice(NAMES)} {i}"
+        text = f"{name} | " + " | ".join(rng.sample(SPECS, rng.randint(0, 8)))
+        ids.append(f"p{i}")
+        metadata.append({"product_id": str(10000 + i), "product_name": name, "price": rng.randint(999, 150000),
+                         "url": f"category/{name.lower().replace(' ', '-')}", "image_url": f"https://img/{i}.jpg",
+                         "text": text})
+    return ids, metadata
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--products', type=int, default=2000, help='Synthetic catalog size')
+    parser.add_argument('--top-k', type=int, default=5, help='Results per formatted response')
+    parser.add_argument('--number', type=int, default=20000, help='format_results calls per variant')
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), "catalog.snap")
+    os.environ["PRODUCT_SEARCH_BACKEND"] = "local"
+    os.environ["CATALOG_SNAPSHOT_PATH"] = path
+
+    from tools.product_display import display_fields, search_description
+    from tools.vector_index import CatalogSnapshot, Match, save_snapshot
+
+    ids, metadata = synthetic_catalog(args.products)
+    vectors = np.random.default_rng(0).standard_normal((args.products, 384)).astype(np.float32)
+    save_snapshot(path, ids, vectors, metadata)
+    start = time.perf_counter()
+    for m in metadata:
+        display_fields(m["product_name"], search_description(m["text"]), float(m["price"]), m["url"], m["product_id"])
+    ingest_seconds = time.perf_counter() - start
+
+    from tools.product_search_tool import ProductSearchTool
+
+    snapshot = CatalogSnapshot(path)
+    matches = [Match(snapshot.string("id", row), 0.5, snapshot.metadata(row)) for row in range(len(snapshot))]
+    stored = ProductSearchTool._to_products(matches, None, None)
+    derived = [dict(product, display=None) for product in stored]
+    rng = random.Random(1)
+    pages = [rng.sample(range(len(stored)), args.top_k) for _ in range(args.number)]
+
+    mismatches = sum(
+        ProductSearchTool.format_results([derived[i] for i in page], "q", args.top_k)
+        != ProductSearchTool.format_results([stored[i] for i in page], "q", args.top_k)
+        for page in pages[:1000]
+    )
+
+    timings = {}
+    for label, products in (("derived per query", derived), ("precomputed", stored)):
+        start = time.perf_counter()
+        for page in pages:
+            ProductSearchTool.format_results([products[i] for i in page], "q", args.top_k)
+        timings[label] = (time.perf_counter() - start) / args.number * 1e6
+
+    print(f"\n📦 {args.products} products, top_k {args.top_k}, {args.number} calls per variant")
+    print(f"{'display fields':<20} {'us/call':>9}")
+    for label, micros in timings.items():
+        print(f"{label:<20} {micros:>9.1f}")
+    print(f"\n⚡ {timings['derived per query'] / timings['precomputed']:.2f}x faster; deriving at build time costs "
+          f"{ingest_seconds / args.products * 1e6:.1f} us per product once")
+    print("✅ Outputs identical" if not mismatches else f"❌ {mismatches} outputs differ")
+    return 1 if mismatches else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Benchmark: single-pass response extractor vs the old multi-stage repair chain.
+
+The legacy chain (fence strip -> json.loads -> nested re-parse -> greedy regex
+fallback -> canned reply) is reproduced verbatim below, minus tracing, so both
+paths run on the same corpus of model outputs.
+
+The bundled corpus (data/synthetic_model_outputs.jsonl) is 16 handwritten,
+synthetic outputs, one or two per shape the parser has to handle (fenced,
+prose around the JSON, nested "data"/"answer", truncated, ...); they are not
+recorded from the model. On it the result that matters is the parse rate:
+outputs the legacy chain turned into the canned reply. Per-parse times are
+reported for reference only; both parsers take microseconds next to a
+multi-second LLM call, and a synthetic corpus says nothing about the mix of
+shapes in production. Pass real final LLM texts with --corpus before drawing
+conclusions from either number.
+
+Usage:
+    python benchmarks/bench_response_parser.py
+    python benchmarks/bench_response_parser.py --corpus recorded_outputs.jsonl --number 2000
+
+Corpus format: one JSON object per line with an "output" field holding the raw
+final LLM text (and an optional "kind" label).
+"""
+
+import argparse
+import ast
+import json
+import os
+import re
+import sys
+import timeit
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from response_parser import parse_agent_response
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'synthetic_model_outputs.jsonl')
+
+
+def legacy_parse(final_response):
+    """The pre-extractor parsing chain; returns the parsed dict or None (canned fallback)."""
+    clean_response = final_response.strip()
+    if clean_response.startswith('```json'):
+        clean_response = clean_response.replace('```json', '').replace('```', '').strip()
+
+    try:
+        parsed_json = json.loads(clean_response)
+
+        def parse_nested_structure(data_dict):
+            if isinstance(data_dict, dict):
+                if 'data' in data_dict and isinstance(data_dict['data'], dict):
+                    data_content = data_dict['data']
+                    if 'answer' in data_content and isinstance(data_content['answer'], str):
+                        try:
+                            nested_json = json.loads(data_content['answer'])
+                            if isinstance(nested_json, dict):
+                                return parse_nested_structure(nested_json)
+                        except (json.JSONDecodeError, TypeError):
+                            pass
+                    return data_content
+
+                if 'answer' in data_dict and isinstance(data_dict['answer'], str):
+                    try:
+                        nested_json = json.loads(data_dict['answer'])
+                        if isinstance(nested_json, dict):
+                            return parse_nested_structure(nested_json)
+                    except (json.JSONDecodeError, TypeError):
+                        pass
+
+                if 'product_details' in data_dict and isinstance(data_dict['product_details'], dict):
+                    if 'output' in data_dict['product_details']:
+                        try:
+                            output_str = data_dict['product_details']['output']
+                            data_dict['product_details'] = ast.literal_eval(output_str)
+                        except (ValueError, SyntaxError):
+                            pass
+            return data_dict
+
+        parsed_json = parse_nested_structure(parsed_json)
+        if isinstance(parsed_json, dict):
+            expected_keys = {'answer', 'products', 'product_details', 'stores', 'end'}
+            if not any(key in parsed_json for key in expected_keys) and 'data' in parsed_json:
+                parsed_json = parsed_json['data']
+        json.dumps(parsed_json, ensure_ascii=False, indent=2)
+        return parsed_json
+
+    except json.JSONDecodeError:
+        json_match = re.search(r'\{.*\}', clean_response, re.DOTALL)
+        if json_match:
+            try:
+                parsed_json = json.loads(json_match.group(0))
+                # The old code called parse_nested_structure here, which is only
+                # defined inside the try block above -> NameError, swallowed below
+                parsed_json = parse_nested_structure(parsed_json)  # noqa: F821
+                return parsed_json
+            except:  # noqa: E722
+                pass
+        return None
+
+
+def new_parse(final_response):
+    """Current path: one extractor pass plus unwrap, serialized like format_agent_response."""
+    parsed = parse_agent_response(final_response)
+    if parsed is not None:
+        json.dumps(parsed, ensure_ascii=False, indent=2)
+    return parsed
+
+
+def load_corpus(path):
+    samples = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                record = json.loads(line)
+                samples.append((record.get('kind', 'sample'), record['output']))
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--corpus', default=DEFAULT_CORPUS, help='JSONL file of model outputs (default: the synthetic corpus)')
+    parser.add_argument('--number', type=int, default=1000, help='Parses per sample per timing run')
+    parser.add_argument('--verbose', action='store_true', help='Show per-sample outcome')
+    args = parser.parse_args()
+
+    samples = load_corpus(args.corpus)
+    print(f"📄 Corpus: {args.corpus} ({len(samples)} samples)")
+
+    legacy_ok = new_ok = agree = 0
+    for kind, output in samples:
+        old = legacy_parse(output)
+        new = new_parse(output)
+        legacy_ok += old is not None
+        new_ok += new is not None
+        agree += old == new
+        if args.verbose:
+            print(f"  {kind:<24} legacy={'ok' if old is not None else 'fallback':<8} "
+                  f"new={'ok' if new is not None else 'fallback':<8} {'same' if old == new else 'DIFF'}")
+
+    total_legacy = total_new = 0.0
+    for _, output in samples:
+        total_legacy += timeit.timeit(lambda: legacy_parse(output), number=args.number)
+        total_new += timeit.timeit(lambda: new_parse(output), number=args.number)
+
+    runs = len(samples) * args.number
+    print(f"\n{'parser':<10} {'parsed':>8} {'us/parse':>10}")
+    print(f"{'legacy':<10} {legacy_ok:>4}/{len(samples):<3} {total_legacy / runs * 1e6:>10.1f}")
+    print(f"{'single':<10} {new_ok:>4}/{len(samples):<3} {total_new / runs * 1e6:>10.1f}")
+    print(f"\n✅ Identical results on {agree}/{len(samples)} samples; "
+          f"{new_ok - legacy_ok} more parsed instead of the canned reply")
+    if args.corpus == DEFAULT_CORPUS:
+        print("⚠️  Synthetic corpus: timings are not representative of production outputs")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Benchmark: in-process catalog index (tools/vector_index.py) vs Pinecone.
+
+Live mode embeds a set of shopper queries, runs each against Pinecone and the
+local snapshot, and reports recall@k of the local results against Pinecone's
+plus p50/p95 query latency of both. Needs PINECONE_API_KEY and a snapshot
+built with build_catalog_snapshot.py.
+
+Synthetic mode needs neither: it writes a random catalog of N embeddings to a
+temporary snapshot (--dtype float16 or int8) and compares search over it with
+exact float32 search (the ground truth) and with hnswlib when installed.
+
+Usage:
+    python benchmarks/bench_vector_search.py
+    python benchmarks/bench_vector_search.py --queries my_queries.txt --top-k 15
+    python benchmarks/bench_vector_search.py --synthetic 50000
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools.vector_index import (CATALOG_SNAPSHOT_PATH, HNSWLIB_AVAILABLE, LocalVectorIndex, Match,
+                                QueryResponse, save_snapshot)
+
+DEFAULT_QUERIES = [
+    "samsung smartphone", "iphone 15", "5g phone with good camera", "gaming laptop",
+    "hp laptop for students", "55 inch smart tv", "oled television", "double door refrigerator",
+    "1.5 ton split air conditioner", "inverter ac", "front load washing machine",
+    "top load washing machine", "convection microwave", "noise cancelling headphones",
+    "bluetooth earbuds", "soundbar with subwoofer", "smartwatch", "android tablet",
+    "ro water purifier", "air cooler", "instant geyser", "mixer grinder", "ceiling fan",
+    "dslr camera", "wireless speaker",
+]
+
+
+def percentile(samples, pct):
+    return float(np.percentile(samples, pct) * 1000) if samples else 0.0
+
+
+def timed_query(index, vector, top_k):
+    start = time.perf_counter()
+    response = index.query(vector=vector, top_k=top_k, include_metadata=False)
+    return [m.id for m in response.matches], time.perf_counter() - start
+
+
+def recall_at_k(found, expected):
+    return len(set(found) & set(expected)) / len(expected) if expected else 1.0
+
+
+def report(name, latencies, recall=None):
+    recall_text = f"{recall:>10.3f}" if recall is not None else f"{'-':>10}"
+    print(f"{name:<12} {recall_text} {percentile(latencies, 50):>9.2f} {percentile(latencies, 95):>9.2f}")
+
+
+class Float32Index:
+    """Exact search over the unquantized vectors: the synthetic ground truth."""
+
+    def __init__(self, vectors):
+        self.vectors = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+    def query(self, vector, top_k, **kwargs):
+        scores = self.vectors @ vector
+        rows = np.argsort(-scores)[:top_k]
+        return QueryResponse([Match(str(row), float(scores[row]), None) for row in rows])
+
+
+def run_live(args):
+    from pinecone import Pinecone
+    from sentence_transformers import SentenceTransformer
+    from build_catalog_snapshot import PINECONE_HOST, PINECONE_INDEX_NAME
+
+    api_key = os.getenv("PINECONE_API_KEY")
+    if not api_key:
+        print("❌ Set PINECONE_API_KEY (or use --synthetic N)")
+        return 1
+    queries = DEFAULT_QUERIES
+    if args.queries:
+        with open(args.queries, encoding='utf-8') as f:
+            queries = [line.strip() for line in f if line.strip()]
+
+    remote = Pinecone(api_key=api_key).Index(PINECONE_INDEX_NAME, host=PINECONE_HOST)
+    local = LocalVectorIndex.load(args.snapshot)
+    print(f"📦 Snapshot: {args.snapshot} ({len(local)} products, {local.snapshot.dtype}, {local.backend} search)")
+    model = SentenceTransformer("all-MiniLM-L6-v2")
+    vectors = [model.encode(q).tolist() for q in queries]
+    print(f"🔍 {len(queries)} queries, top_k={args.top_k}")
+
+    remote_latency, local_latency, recalls = [], [], []
+    for vector in vectors:
+        expected, seconds = timed_query(remote, vector, args.top_k)
+        remote_latency.append(seconds)
+        for _ in range(args.repeat):
+            found, seconds = timed_query(local, vector, args.top_k)
+            local_latency.append(seconds)
+        recalls.append(recall_at_k(found, expected))
+
+    print(f"\n{'index':<12} {'recall@k':>10} {'p50 ms':>9} {'p95 ms':>9}")
+    report('pinecone', remote_latency)
+    report(f'local-{local.backend}', local_latency, float(np.mean(recalls)))
+    misses = [q for q, r in zip(queries, recalls) if r < 1.0]
+    if misses:
+        print(f"\n⚠️  Differs from Pinecone on {len(misses)} queries: {', '.join(misses[:5])}")
+    print(f"\n✅ Local p50 {percentile(local_latency, 50):.2f} ms vs Pinecone {percentile(remote_latency, 50):.1f} ms")
+    return 0
+
+
+def run_synthetic(args):
+    rng = np.random.default_rng(args.seed)
+    # Clustered like real catalogs (many near-identical variants of one model)
+    centers = rng.normal(size=(max(1, args.synthetic // 50), args.dim)).astype(np.float32)
+    vectors = centers[rng.integers(len(centers), size=args.synthetic)]
+    vectors += 0.3 * rng.normal(size=vectors.shape).astype(np.float32)
+    queries = centers[rng.integers(len(centers), size=args.num_queries)]
+    queries += 0.3 * rng.normal(size=queries.shape).astype(np.float32)
+    ids = [str(i) for i in range(args.synthetic)]
+    metadata = [{"product_name": f"Product {i}", "price": 1000 + i} for i in range(args.synthetic)]
+    print(f"🧪 Synthetic catalog: {args.synthetic} x {args.dim}, {args.num_queries} queries, top_k={args.top_k}")
+
+    path = os.path.join(tempfile.mkdtemp(), 'catalog.snap')
+    save_snapshot(path, ids, vectors, metadata, dtype=args.dtype)
+    print(f"📦 Snapshot: {args.dtype}, {os.path.getsize(path) / 1e6:.1f} MB "
+          f"(float32 would be {vectors.nbytes / 1e6:.1f} MB)")
+
+    exact = Float32Index(vectors)
+    indexes = [('float32', exact), (f'mmap-{args.dtype}', LocalVectorIndex.load(path, use_hnsw=False))]
+    if HNSWLIB_AVAILABLE:
+        start = time.perf_counter()
+        indexes.append(('hnsw', LocalVectorIndex.load(path, use_hnsw=True)))
+        print(f"🏗️  HNSW build: {time.perf_counter() - start:.1f}s")
+    else:
+        print("ℹ️  hnswlib not installed - skipping HNSW")
+
+    truth = [timed_query(exact, q, args.top_k)[0] for q in queries]
+    print(f"\n{'index':<12} {'recall@k':>10} {'p50 ms':>9} {'p95 ms':>9}")
+    for name, index in indexes:
+        latencies, recalls = [], []
+        for query, expected in zip(queries, truth):
+            for _ in range(args.repeat):
+                found, seconds = timed_query(index, query, args.top_k)
+                latencies.append(seconds)
+            recalls.append(recall_at_k(found, expected))
+        report(name, latencies, float(np.mean(recalls)))
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--snapshot', default=CATALOG_SNAPSHOT_PATH, help='Snapshot file (live mode)')
+    parser.add_argument('--queries', help='Text file with one query per line (live mode)')
+    parser.add_argument('--synthetic', type=int, default=0, help='Benchmark a random catalog of N vectors instead')
+    parser.add_argument('--dim', type=int, default=384, help='Embedding size (synthetic mode)')
+    parser.add_argument('--num-queries', type=int, default=200, help='Queries (synthetic mode)')
+    parser.add_argument('--dtype', choices=['float16', 'int8'], default='float16', help='Snapshot dtype (synthetic mode)')
+    parser.add_argument('--seed', type=int, default=7, help='Random seed (synthetic mode)')
+    parser.add_argument('--top-k', type=int, default=15, help='Results per query (search_products asks for 3x top_k)')
+    parser.add_argument('--repeat', type=int, default=5, help='Timed runs per query against the local index')
+    args = parser.parse_args()
+    return run_synthetic(args) if args.synthetic else run_live(args)
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Export the Pinecone product catalog to a local snapshot for
+PRODUCT_SEARCH_BACKEND=local (see tools/vector_index.py).
+
+Pages through every id in the all-products-lotus index, fetches the vectors
+with their metadata in batches and writes one memory-mapped snapshot file
+(float16 or int8 embeddings plus columnar metadata, including the search
+result display fields derived once here: features, category, formatted price
+and product URL, see tools/product_display.py). The file is replaced
+atomically; re-run after catalog updates. Running workers reload it within
+CATALOG_CHECK_SECONDS (see tools/product_search_tool.py).
+
+Usage:
+    python build_catalog_snapshot.py
+    python build_catalog_snapshot.py --output /srv/lotus/catalog.snap --dtype int8
+"""
+
+import argparse
+import os
+import time
+
+from pinecone import Pinecone
+
+from tools.vector_index import CATALOG_SNAPSHOT_PATH, LocalVectorIndex, save_snapshot
+
+# The index ProductSearchTool queries
+PINECONE_INDEX_NAME = "all-products-lotus"
+PINECONE_HOST = "https://all-products-lotus-imbj1oj.svc.aped-4627-b74a.pinecone.io"
+
+
+def export_catalog(index, batch_size: int = 100, limit: int = 0):
+    """All (id, values, metadata) rows of a serverless Pinecone index."""
+    rows = []
+    for id_page in index.list(limit=batch_size):
+        ids = list(id_page)
+        for start in range(0, len(ids), batch_size):
+            fetched = index.fetch(ids=ids[start:start + batch_size]).vectors
+            for vector_id in ids[start:start + batch_size]:
+                vector = fetched.get(vector_id)
+                if vector is not None:
+                    rows.append((vector_id, list(vector.values), dict(vector.metadata or {})))
+        print(f"   ... {len(rows)} vectors")
+        if limit and len(rows) >= limit:
+            return rows[:limit]
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--output', default=CATALOG_SNAPSHOT_PATH, help='Snapshot file to write')
+    parser.add_argument('--dtype', choices=['float16', 'int8'], default='float16',
+                        help='Embedding storage (int8 halves the file again, slightly lower recall)')
+    parser.add_argument('--batch-size', type=int, default=100, help='Ids per list/fetch request')
+    parser.add_argument('--limit', type=int, default=0, help='Stop after this many vectors (0 = all)')
+    args = parser.parse_args()
+
+    api_key = os.getenv("PINECONE_API_KEY")
+    if not api_key:
+        print("❌ Set PINECONE_API_KEY to export the catalog")
+        return 1
+    index = Pinecone(api_key=api_key).Index(PINECONE_INDEX_NAME, host=PINECONE_HOST)
+
+    print(f"📦 Exporting {PINECONE_INDEX_NAME} ...")
+    start = time.perf_counter()
+    rows = export_catalog(index, args.batch_size, args.limit)
+    if not rows:
+        print("❌ No vectors exported")
+        return 1
+
+    ids, vectors, metadata = zip(*rows)
+    checksum = save_snapshot(args.output, list(ids), vectors, list(metadata), dtype=args.dtype)
+    size_mb = os.path.getsize(args.output) / 1e6
+    print(f"✅ Wrote {len(ids)} products ({len(vectors[0])} dims, {args.dtype}) to {args.output} "
+          f"in {time.perf_counter() - start:.1f}s: {size_mb:.1f} MB, sha256 {checksum[:12]}")
+
+    # Sanity check: the snapshot loads and finds its own first vector
+    local = LocalVectorIndex.load(args.output)
+    top = local.query(vector=vectors[0], top_k=1).matches
+    print(f"🔍 Self-query: {'ok' if top and top[0].id == ids[0] else 'MISMATCH'}")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,148 @@
+"""
+Cancellation of chat turns nobody is waiting for any more.
+A CancelToken travels with each turn (config["configurable"]["cancel_token"] for
+the graph nodes, a context variable for tool HTTP calls). It is cancelled when
+the client disconnects (FastAPI polls request.is_disconnected(), the NDJSON
+batch stream is closed) or when the turn's deadline passes. The graph loop and the nodes check it
+between steps, so an abandoned turn stops before its next LLM call or tool
+call, and the calls themselves get what is left of the budget as their
+timeout (request_timeout for the LLM, http_timeout for tool HTTP calls).
+
+The default deadline ends a few seconds before the gunicorn worker timeout
+(GUNICORN_TIMEOUT, which gunicorn.conf.py exports to the workers), and never
+later than 55s, below nginx's 60s proxy_read_timeout.
+
+Configuration (environment):
+    CHAT_DEADLINE_SECONDS   time budget of one chat turn (default: GUNICORN_TIMEOUT - 5, at most 55)
+    GUNICORN_TIMEOUT        worker timeout the default is derived from (default: 30)
+"""
+
+import os
+import threading
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+WORKER_TIMEOUT_SECONDS = float(os.getenv("GUNICORN_TIMEOUT", "30"))
+# Left between the end of a turn's budget and the worker timeout, to send the reply
+DEADLINE_MARGIN_SECONDS = 5.0
+# Below nginx's 60s proxy_read_timeout
+MAX_DEADLINE_SECONDS = 55.0
+CHAT_DEADLINE_SECONDS = float(os.getenv(
+    "CHAT_DEADLINE_SECONDS",
+    str(max(1.0, min(MAX_DEADLINE_SECONDS, WORKER_TIMEOUT_SECONDS - DEADLINE_MARGIN_SECONDS)))
+))
+
+# Cancellation reasons (metric label values)
+CLIENT_DISCONNECT = "client_disconnect"
+DEADLINE = "deadline"
+
+# Shortest timeout handed to an HTTP call, so a nearly spent budget fails fast instead of not at all
+MIN_HTTP_TIMEOUT = 0.1
+
+
+class TurnCancelled(Exception):
+    """Raised where a cancelled turn is noticed; `stage` tells where (graph, llm, tools, ...)."""
+
+    def __init__(self, reason: str, stage: str = ""):
+        super().__init__(f"turn cancelled ({reason}){f' during {stage}' if stage else ''}")
+        self.reason = reason
+        self.stage = stage
+
+
+class CancelToken:
+    """Thread-safe cancellation flag with an optional deadline and parent (e.g. a whole batch)."""
+
+    def __init__(self, timeout: Optional[float] = None, parent: Optional["CancelToken"] = None):
+        self.deadline = time.monotonic() + timeout if timeout else None
+        self.parent = parent
+        self._event = threading.Event()
+        self._reason = None
+
+    def cancel(self, reason: str = CLIENT_DISCONNECT) -> None:
+        if not self._event.is_set():
+            self._reason = reason
+            self._event.set()
+
+    @property
+    def reason(self) -> Optional[str]:
+        """Why the token is cancelled, or None while it isn't."""
+        if self._event.is_set():
+            return self._reason
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            self.cancel(DEADLINE)
+            return DEADLINE
+        if self.parent is not None and self.parent.reason is not None:
+            self.cancel(self.parent.reason)
+            return self._reason
+        return None
+
+    @property
+    def cancelled(self) -> bool:
+        return self.reason is not None
+
+    def remaining(self) -> Optional[float]:
+        """Seconds until the deadline (own or inherited), None without one."""
+        deadlines = [t.deadline for t in (self, self.parent) if t is not None and t.deadline is not None]
+        return max(0.0, min(deadlines) - time.monotonic()) if deadlines else None
+
+    def check(self, stage: str = "") -> None:
+        """Raise TurnCancelled if the token is cancelled."""
+        reason = self.reason
+        if reason is not None:
+            raise TurnCancelled(reason, stage)
+
+
+_current_token: ContextVar[Optional[CancelToken]] = ContextVar("lotus_cancel_token", default=None)
+
+
+def set_current(token: Optional[CancelToken]):
+    """Make `token` the current turn's token; returns the ContextVar reset token."""
+    return _current_token.set(token)
+
+
+def reset_current(context_token) -> None:
+    _current_token.reset(context_token)
+
+
+def current() -> Optional[CancelToken]:
+    return _current_token.get()
+
+
+def from_config(config) -> Optional[CancelToken]:
+    """The token a graph node was run with (falls back to the context's)."""
+    configurable = (config or {}).get("configurable") or {}
+    return configurable.get("cancel_token") or _current_token.get()
+
+
+def check(config=None, stage: str = "") -> None:
+    """Raise TurnCancelled if the current turn was cancelled (no-op outside a turn)."""
+    token = from_config(config)
+    if token is not None:
+        token.check(stage)
+
+
+def request_timeout(config=None) -> Optional[float]:
+    """What is left of the turn's time budget, as a timeout for one call (None without a deadline)."""
+    token = from_config(config)
+    if token is None:
+        return None
+    token.check("llm")
+    remaining = token.remaining()
+    return None if remaining is None else max(MIN_HTTP_TIMEOUT, remaining)
+
+
+def http_timeout(default: float) -> float:
+    """`default`, shortened to what is left of the current turn's time budget."""
+    token = _current_token.get()
+    if token is None:
+        return default
+    token.check("http")
+    remaining = token.remaining()
+    if remaining is None:
+        return default
+    return max(MIN_HTTP_TIMEOUT, min(default, remaining))
+
+
+__all__ = ['CancelToken', 'TurnCancelled', 'CHAT_DEADLINE_SECONDS', 'CLIENT_DISCONNECT', 'DEADLINE',
+           'set_current', 'reset_current', 'current', 'from_config', 'check', 'request_timeout', 'http_timeout']
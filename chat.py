@@ -1,6 +1,9 @@
 import os
 import uuid
-import re
+import hashlib
+import asyncio
+import contextvars
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
 from langgraph.checkpoint.memory import InMemorySaver
 from collections import deque
 from datetime import datetime, timedelta
@@ -15,6 +18,16 @@ from typing_extensions import TypedDict
 from langgraph.graph import StateGraph, START, END
 from langgraph.graph.message import add_messages
 
+import tracing
+import json_codec
+import cancellation
+from cancellation import CancelToken, TurnCancelled
+from response_parser import parse_agent_response, strip_code_fences
+from response_schema import AgentResponse, RESPOND_TOOL
+from chat_metrics import (
+    LLM_CALL_SECONDS, TOOL_CALL_SECONDS, REDIS_OP_SECONDS, POSTPROCESS_SECONDS,
+    GRAPH_ITERATIONS, LLM_HOPS, RESPONSE_PARSE_TOTAL, CHAT_CANCELLED_TOTAL, timed, record_llm_usage,
+)
 
 
 tavily_api_key = os.getenv("TAVILY_API_KEY","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")
@@ -29,8 +42,13 @@ from langgraph.graph.message import add_messages # helper function to add messag
 class AgentState(TypedDict):
     """The state of the agent."""
     messages: Annotated[Sequence[BaseMessage], add_messages]
+    # LLM calls made so far this turn (see MAX_LLM_HOPS)
     number_of_steps: int
     user_id: str
+    # SESSION CONTEXT line for this turn (products/stores shown so far, resolved references)
+    context: str
+    # Budget/brand/category/city remembered for the session (see slot_memory.py)
+    slots: dict
 
 class RedisMemory:
     """Redis-based memory for storing user conversations with TTL."""
@@ -59,10 +77,18 @@ class RedisMemory:
             # Test connection before attempting operation
             self.redis_client.ping()
             key = f"user_messages:{user_id}"
-            data = self.redis_client.get(key)
-            if data:
+            with timed(REDIS_OP_SECONDS, op='get'):
+                data = self.redis_client.get(key)
+            if not data:
+                return []
+            if data[:1] != b'[':
+                # Histories written before the compact format
                 return pickle.loads(data)
-            return []
+            from langchain_core.messages import AIMessage, HumanMessage
+            return [
+                HumanMessage(content=content) if msg_type == 'human' else AIMessage(content=content)
+                for msg_type, content in json_codec.loads(data)
+            ]
         except redis.ConnectionError as e:
             print(f"❌ Redis connection error for user {user_id}: {e}")
             return []
@@ -76,8 +102,10 @@ class RedisMemory:
             # Test connection before attempting operation
             self.redis_client.ping()
             key = f"user_messages:{user_id}"
-            serialized_data = pickle.dumps(messages)
-            self.redis_client.setex(key, self.ttl_seconds, serialized_data)
+            # Only type and content are kept: ids and provider metadata are never replayed
+            serialized_data = json_codec.dumps([[msg.type, msg.content] for msg in messages])
+            with timed(REDIS_OP_SECONDS, op='save'):
+                self.redis_client.setex(key, self.ttl_seconds, serialized_data)
         except redis.ConnectionError as e:
             print(f"❌ Redis connection error when saving for user {user_id}: {e}")
         except Exception as e:
@@ -99,11 +127,29 @@ class RedisMemory:
         except Exception as e:
             print(f"❌ Error adding message for user {user_id}: {type(e).__name__}: {e}")
     
+    def save_last_response(self, user_id: str, reply: dict):
+        """Keep the full payload of the user's latest reply (history only holds a condensed form)."""
+        try:
+            with timed(REDIS_OP_SECONDS, op='save_last_response'):
+                self.redis_client.setex(f"last_response:{user_id}", self.ttl_seconds, json_codec.dumps(reply))
+        except Exception as e:
+            print(f"❌ Error saving last response for user {user_id}: {type(e).__name__}: {e}")
+    
+    def get_last_response(self, user_id: str) -> dict:
+        """Full payload of the user's latest reply, or {}."""
+        try:
+            data = self.redis_client.get(f"last_response:{user_id}")
+            return json_codec.loads(data) if data else {}
+        except Exception as e:
+            print(f"❌ Error retrieving last response for user {user_id}: {type(e).__name__}: {e}")
+            return {}
+    
     def clear_user_messages(self, user_id: str):
         """Clear all messages for a specific user."""
         try:
             key = f"user_messages:{user_id}"
-            self.redis_client.delete(key)
+            # Also forget the latest full reply, the products/stores shown (see session_context.py) and the slots
+            self.redis_client.delete(key, f"last_response:{user_id}", f"session_context:{user_id}", f"slots:{user_id}")
         except Exception as e:
             print(f"Error clearing messages for user {user_id}: {e}")
     
@@ -162,11 +208,33 @@ if not redis_memory:
         def get_user_messages(self, user_id: str) -> list: return []
         def add_message_to_user(self, user_id: str, message): pass
         def save_user_messages(self, user_id: str, messages: list): pass
+        def save_last_response(self, user_id: str, reply: dict): pass
+        def get_last_response(self, user_id: str) -> dict: return {}
         def clear_user_messages(self, user_id: str): pass
         def get_active_users(self) -> list: return []
         def test_connection(self) -> bool: return False
     redis_memory = FallbackMemory()
 
+from singleflight import SingleFlight
+
+# Coalesce duplicate in-flight work across threads and gunicorn workers:
+# the same message re-sent for a session (double-clicks, client retries) and
+# identical concurrent tool calls share one execution and its result. Only calls
+# made while the work is running share it; nothing is cached once it finishes.
+_singleflight_redis = getattr(redis_memory, 'redis_client', None)
+chat_flight = SingleFlight("chat", redis_client=_singleflight_redis, lock_ttl=90, result_ttl=5)
+tool_flight = SingleFlight("tool", redis_client=_singleflight_redis, lock_ttl=30, result_ttl=5)
+
+from session_context import SessionContext
+
+# Products/stores shown per session, for resolving "the second one" / "that Samsung"
+session_context = SessionContext(getattr(redis_memory, 'redis_client', None), ttl_seconds=1800)
+
+from slot_memory import SlotMemory, apply_slot_defaults, format_slots
+
+# Budget/brand/category/city stated earlier in the session, kept outside the history window
+slot_memory = SlotMemory(getattr(redis_memory, 'redis_client', None), ttl_seconds=1800)
+
 from langchain_core.tools import tool
 from geopy.geocoders import Nominatim
 from pydantic import BaseModel, Field
@@ -216,115 +284,36 @@ from langchain_core.messages import SystemMessage
 # System prompt for Lotus Electronics chatbot
 SYSTEM_PROMPT = """You are Lotus Electronics Sales Assistant - helping customers find electronics products and store locations in India.
 
-CRITICAL RESPONSE FORMAT REQUIREMENT:
-You MUST respond with EXACTLY this JSON structure - NO nested JSON strings, NO escaped quotes, NO additional wrapping:
-
-{
-  "answer": "your conversational response only - NO product details or store details here",
-  "products": [array of product objects if search_products was used],
-  "product_details": {product object if get_filtered_product_details_tool was used},
-  "stores": [array of store objects if get_near_store was used],
-  "policy_info": {policy object if search_terms_conditions was used},
-  "end": "follow-up question to continue conversation"
-}
+RESPONDING:
+Every turn ends with a call to AgentResponse. Call the data tools you need first, then AgentResponse with:
+- answer: conversational guidance and insights only - no product names, prices, specs, store addresses or timings
+- products: the products to show, copied from search_products results (product_id, product_name, product_mrp, product_url, product_image, features)
+- product_details: the product from get_filtered_product_details, when used
+- stores: the stores from get_near_store, when used
+- end: a follow-up question to continue the conversation
 
 TOOL USAGE RULES:
 1. Use search_products ONLY when user asks for NEW products they haven't seen yet
 2. Use get_near_store ONLY when user asks about store locations by city or zipcode
-3. Use get_filtered_product_details_tool when user wants MORE DETAILS about a specific product from previous results (extract product_id from conversation context)
-4. Use search_terms_conditions when user asks about:
-   - Return policy ("return", "return it", "want to return")
-   - Refund policy ("refund", "money back", "refund conditions")
-   - Warranty terms ("warranty", "guarantee", "warranty terms")
-   - Privacy policy ("privacy", "data protection", "personal information")
-   - Terms and conditions ("terms", "conditions", "policy")
-   - Cancellation policy ("cancel", "cancellation")
-   - Shipping/delivery terms ("shipping policy", "delivery terms")
+3. Use get_filtered_product_details when user wants MORE DETAILS about a specific product from previous results (extract product_id from conversation context)
+4. Use search_terms_conditions when user asks about return, refund, warranty, privacy, cancellation or shipping policy, or terms and conditions
 5. DON'T use tools when discussing general product info that doesn't need specific details
 
-IMPORTANT POLICY RESPONSE RULE:
-When using search_terms_conditions, DO NOT put raw policy sections in policy_info field. Instead:
-- Summarize the policy information in a clear, conversational way in the "answer" field
-- Set policy_info to empty object {}
-- Make the answer comprehensive and user-friendly based on the tool results
-
-MANDATORY: If user mentions "return", "refund", "warranty", "policy", "terms", or "conditions" - YOU MUST use search_terms_conditions tool and summarize the results in your answer.
+POLICY QUESTIONS:
+If user mentions "return", "refund", "warranty", "policy", "terms", or "conditions" - YOU MUST use search_terms_conditions and summarize the results clearly and comprehensively in "answer".
 
-IMPORTANT: When user refers to a specific product from previous search results (like "tell me more about that Samsung phone"), you MUST:
-- Extract the product_id from the previous search results in conversation context
-- Use the product_id with get_filtered_product_details_tool
+PRODUCT REFERENCES:
+When user refers to a specific product from previous search results (like "tell me more about that Samsung phone"):
+- Take the product_id from SESSION CONTEXT (products shown so far, and which one the user is referring to); otherwise extract it from the previous search results in conversation context
+- Use the product_id with get_filtered_product_details
 - Use user's city preference for accurate stock information
-- If user Say other Search for other brand products with same product category like smartphone the search result give smartphone of Samsung company if user say other then search fro Onepluse Smartphone or Oppo Vivo or iPhone.
-
-CRITICAL JSON RESPONSE RULES:
-❌ NEVER create nested JSON strings inside JSON
-❌ NEVER wrap responses in additional data objects
-❌ NEVER escape quotes in JSON values
-❌ NEVER put JSON as string values
-✅ Return clean, direct JSON structure
-✅ Put actual objects/arrays in fields, not strings
-
-CRITICAL ANSWER FIELD RULES:
-❌ NEVER put product names, prices, or specs in "answer"
-❌ NEVER put store names, addresses, or timings in "answer"
-❌ NEVER put detailed product specifications in "answer"
-❌ NEVER put policy text or terms content in "answer"
-✅ Only put conversational guidance and insights in "answer"
-✅ Set unused fields to empty arrays [] or objects {} as appropriate
-
-EXAMPLES OF CORRECT RESPONSES:
-When user asks "show me phones":
-{
-  "answer": "I found some great smartphones for you! These offer excellent value and modern features.",
-  "products": [{"product_id": "123", "product_url":"https://www.lotuselectronics.com/product/smartphones/samsung-android-smartphone-a36-5g-8gb-ram-128gb-storagerom-a366ej-awesome-lavender/39721", "product_name": "Samsung Galaxy A36", "product_mrp": "30999", ...}],
-  "stores": [],
-  "product_details": {},
-  "end": "What's your budget range?"
-}
-
-When user asks "tell me more about that Samsung phone" (referring to product_id from previous results):
-{
-  "answer": "Here are the complete specifications and availability details for that Samsung smartphone.",
-  "products": [],
-  "product_details": {"product_id": "123","product_url":"https://www.lotuselectronics.com/product/smartphones/samsung-android-smartphone-a36-5g-8gb-ram-128gb-storagerom-a366ej-awesome-lavender/39721", "product_name": "Samsung Galaxy A36", "product_specification": [...], ...},
-  "stores": [],
-  "end": "Would you like to check availability at a nearby store?"
-}
-
-When user asks "find store in Delhi":
-{
-  "answer": "Perfect! I found several Lotus stores in Delhi where you can visit.",
-  "products": [],
-  "product_details": {},
-  "stores": [{"store_name": "Lotus CP", "address": "Connaught Place", ...}],
-  "policy_info": {},
-  "end": "Which area is most convenient for you?"
-}
-
-When user asks "what is your return policy":
-{
-  "answer": "Our return policy allows you to return unopened items in original packaging within 7 days of delivery for a full refund (excluding shipping costs). For damaged or defective products, contact us within 7 days for a replacement at no cost. Please note that used or tampered items may incur deduction charges of 5% to full value depending on condition. Refunds are processed to your original payment method.",
-  "products": [],
-  "product_details": {},
-  "stores": [],
-  "policy_info": {},
-  "end": "Do you have a specific product you'd like to return or any other questions about our policies?"
-}
-
-CRITICAL POLICY_INFO RULES:
-❌ NEVER nest policy tool results in additional objects like "search_terms_conditions_response"
-❌ NEVER wrap policy data in extra fields
-✅ Put the search_terms_conditions tool result DIRECTLY in the policy_info field
-✅ Use the exact JSON structure returned by the tool without modification
+- If user asks for "other" options in the same category, search for products of other brands (e.g. OnePlus, Oppo, Vivo or iPhone after Samsung smartphones)
 
 CONVERSATION INTELLIGENCE:
 - Remember what products/stores were already shown
-- When user says "tell me more about that Samsung phone" - use get_filtered_product_details_tool with the product_id
 - When user says "what about the store timings" - answer from previous store results
-- Track user preferences (budget, brands, features) across conversation
-- Extract product_id from previous search results when user asks for specific product details
-- Always use the user's city preference for stock availability when getting product details
-- Sort The Product Based on user Query.
+- Track user preferences (budget, brands, features) across conversation; "Known preferences" in SESSION CONTEXT lists the budget, brand, category and city stated so far
+- Sort the products based on the user query
 
 SALES APPROACH:
 - Be helpful and conversational
@@ -332,20 +321,50 @@ SALES APPROACH:
 - Suggest visiting stores for hands-on experience
 - Ask relevant follow-up questions
 - Focus on customer needs and value
-- Highlight stock availability and delivery options
-
-REMEMBER: Return ONLY the JSON structure above. NO additional text, NO markdown formatting, NO nested JSON strings."""
+- Highlight stock availability and delivery options"""
 
 # Create LLM class
+LLM_MODEL_NAME = "gemini-2.5-flash"
 llm = ChatGoogleGenerativeAI(
-    model= "gemini-2.5-flash",
+    model=LLM_MODEL_NAME,
     temperature=0.7,
     max_retries=2,
     google_api_key=google_api_key,
 )
 
-# Bind tools to the model
-model = llm.bind_tools([search_products, get_near_store, get_filtered_product_details_tool, search_terms_conditions])
+# Bind tools to the model. AgentResponse is the "respond" tool: with tool_choice="any"
+# Gemini must call a function every step, so the final answer arrives as
+# schema-validated call arguments instead of free-form JSON text.
+model = llm.bind_tools(tools + [AgentResponse], tool_choice="any")
+
+# Plan-then-execute (default): the model calls every tool the request needs in its
+# first step, they run concurrently, and the next LLM call has to give the answer.
+# With AGENT_PLAN_MODE=false the model may call tools one step at a time.
+AGENT_PLAN_MODE = os.getenv("AGENT_PLAN_MODE", "true").lower() in ("1", "true", "yes")
+# Hard cap on LLM calls per turn in either mode; the call that reaches it must answer
+MAX_LLM_HOPS = max(1, int(os.getenv("MAX_LLM_HOPS", "4")))
+LLM_HOP_LIMIT = min(2, MAX_LLM_HOPS) if AGENT_PLAN_MODE else MAX_LLM_HOPS
+
+# Same tools (the history references them), but only AgentResponse may be called
+final_model = llm.bind_tools(tools + [AgentResponse], tool_choice=RESPOND_TOOL)
+
+PLANNING_PROMPT = """
+
+PLANNING:
+- Work out everything the request needs and call ALL of those tools together in your first step, e.g. one search_products per brand being compared, or search_products plus get_near_store for "phones and a store near me"
+- After the tool results you get exactly ONE more step, and it must be AgentResponse - don't plan on calling tools one after another
+- If a follow-up would need data you can't request yet (e.g. details of a product not shown so far), answer with what you have and offer it in the "end" question"""
+
+FINAL_STEP_PROMPT = """
+
+FINAL STEP: No more tools can be called this turn - reply now with AgentResponse, using any tool results above."""
+
+from llm_cache import LLMResponseCache
+
+# Opt-in exact-match response cache (LLM_CACHE_ENABLED) for replays and load tests
+llm_cache = LLMResponseCache(
+    getattr(redis_memory, 'redis_client', None), model_name=LLM_MODEL_NAME, tools=tools + [AgentResponse]
+)
 
 # Test the model with tools
 # res=model.invoke(f"What is the weather in Berlin on {datetime.today()}?")
@@ -357,182 +376,343 @@ from langchain_core.runnables import RunnableConfig
 
 tools_by_name = {tool.name: tool for tool in tools}
 
-def call_tool(state: AgentState):
+# Read-only tools whose identical concurrent calls share one backend request
+COALESCED_TOOLS = {"search_products", "get_filtered_product_details", "search_terms_conditions"}
+
+def invoke_tool(tool_call: dict):
+    """Invoke a tool call, coalescing it with identical in-flight calls where safe."""
+    selected_tool = tools_by_name[tool_call["name"]]
+    if tool_call["name"] not in COALESCED_TOOLS:
+        return selected_tool.invoke(tool_call["args"])
+    args_digest = hashlib.sha256(json.dumps(tool_call["args"], sort_keys=True, default=str).encode("utf-8")).hexdigest()
+    return tool_flight.do(f"{tool_call['name']}:{args_digest}", lambda: selected_tool.invoke(tool_call["args"]))
+
+async def ainvoke_tool(tool_call: dict):
+    """Async invoke_tool. Tools without a native coroutine (the Pinecone/embedding
+    searches, the SQLite store lookup) are run by LangChain in the default executor."""
+    selected_tool = tools_by_name[tool_call["name"]]
+    if tool_call["name"] not in COALESCED_TOOLS:
+        return await selected_tool.ainvoke(tool_call["args"])
+    args_digest = hashlib.sha256(json.dumps(tool_call["args"], sort_keys=True, default=str).encode("utf-8")).hexdigest()
+    return await tool_flight.do_async(f"{tool_call['name']}:{args_digest}", lambda: selected_tool.ainvoke(tool_call["args"]))
+
+def _tool_message(tool_call: dict, tool_result) -> ToolMessage:
+    # Don't save ToolMessage to Redis to avoid conversation flow issues
+    return ToolMessage(
+        content=tool_result,
+        name=tool_call["name"],
+        tool_call_id=tool_call["id"],
+    )
+
+def _tool_calls(state: AgentState) -> list:
+    """The last message's tool calls, with arguments the LLM left out filled from the session slots."""
+    slots = state.get("slots") or {}
+    return [apply_slot_defaults(tool_call, slots) for tool_call in state["messages"][-1].tool_calls]
+
+# Runs the tool calls of one (planned) step concurrently in the sync graph
+_tool_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="tool")
+
+def _run_tool(tool_call: dict):
+    with tracing.span("tool", tool=tool_call["name"], args=tool_call["args"]) as span, \
+            timed(TOOL_CALL_SECONDS, tool=tool_call["name"], outcome='ok'):
+        tool_result = invoke_tool(tool_call)
+        if tracing.is_sampled():
+            span.set(result_chars=len(str(tool_result)))
+    return tool_result
+
+# How often call_tool looks at the cancel token while tool calls are running
+TOOL_CANCEL_POLL_SECONDS = 0.1
+
+def _await_tool_futures(futures: list, config: RunnableConfig) -> list:
+    """Results of the futures; on cancellation the ones not yet started are dropped."""
+    pending = set(futures)
+    while pending:
+        done, pending = wait(pending, timeout=TOOL_CANCEL_POLL_SECONDS, return_when=FIRST_EXCEPTION)
+        try:
+            cancellation.check(config, "tools")
+        except TurnCancelled:
+            for future in pending:
+                future.cancel()
+            raise
+        if any(future.exception() is not None for future in done):
+            break
+    return [future.result() for future in futures]
+
+def call_tool(state: AgentState, config: RunnableConfig):
+    cancellation.check(config, "tools")
+    tool_calls = _tool_calls(state)
+    if len(tool_calls) == 1:
+        tool_results = [_run_tool(tool_calls[0])]
+    else:
+        # Each call gets a copy of the context so its span nests under the current trace
+        # (and its HTTP timeouts follow the turn's cancel token)
+        futures = [
+            _tool_executor.submit(contextvars.copy_context().run, _run_tool, tool_call)
+            for tool_call in tool_calls
+        ]
+        tool_results = _await_tool_futures(futures, config)
+    
     outputs = []
-    user_id = state.get("user_id", "default_user")
+    for tool_call, tool_result in zip(tool_calls, tool_results):
+        session_context.record_tool_result(state.get("user_id", "default_user"), tool_call["name"], tool_call["args"], tool_result)
+        outputs.append(_tool_message(tool_call, tool_result))
     
-    print(f"🔧 Executing tool calls for user: {user_id}")
+    return {"messages": outputs}
+
+async def acall_tool(state: AgentState, config: RunnableConfig):
+    """Async call_tool: the tool calls of one LLM step run concurrently (and are
+    cancelled together when the turn's task is)."""
+    cancellation.check(config, "tools")
+    async def run(tool_call):
+        with tracing.span("tool", tool=tool_call["name"], args=tool_call["args"]) as span, \
+                timed(TOOL_CALL_SECONDS, tool=tool_call["name"], outcome='ok'):
+            tool_result = await ainvoke_tool(tool_call)
+            if tracing.is_sampled():
+                span.set(result_chars=len(str(tool_result)))
+        return _tool_message(tool_call, tool_result), tool_result
     
-    # Iterate over the tool calls in the last message
-    for tool_call in state["messages"][-1].tool_calls:
-        print(f"🛠️  Calling tool: {tool_call['name']} with args: {tool_call['args']}")
-        # Get the tool by name
-        tool_result = tools_by_name[tool_call["name"]].invoke(tool_call["args"])
-        print(f"📋 Tool result length: {len(str(tool_result))} characters")
-        
-        tool_message = ToolMessage(
-            content=tool_result,
-            name=tool_call["name"],
-            tool_call_id=tool_call["id"],
+    tool_calls = _tool_calls(state)
+    results = await asyncio.gather(*(run(tool_call) for tool_call in tool_calls))
+    # Recorded in call order, so the latest result of the step wins as in call_tool
+    for tool_call, (_, tool_result) in zip(tool_calls, results):
+        await asyncio.to_thread(
+            session_context.record_tool_result, state.get("user_id", "default_user"),
+            tool_call["name"], tool_call["args"], tool_result,
         )
-        outputs.append(tool_message)
-        
-        # Don't save ToolMessage to Redis to avoid conversation flow issues
-        # redis_memory.add_message_to_user(user_id, tool_message)
+    return {"messages": [message for message, _ in results]}
+
+def _is_final_hop(state: AgentState) -> bool:
+    """Whether the next LLM call is the last one allowed this turn (LLM_HOP_LIMIT)."""
+    return state.get("number_of_steps", 0) + 1 >= LLM_HOP_LIMIT
+
+def _model_messages(state: AgentState, final: bool = False) -> list:
+    # For Gemini, we need to ensure proper message sequence
+    # Use only the current conversation state messages with system prompt
+    system_prompt = SYSTEM_PROMPT
+    if AGENT_PLAN_MODE:
+        system_prompt += PLANNING_PROMPT
+    if state.get("context"):
+        system_prompt += "\n\nSESSION CONTEXT:\n" + state["context"]
+    # The prompt differs on the final hop, so cached responses never cross over between the two models
+    if final:
+        system_prompt += FINAL_STEP_PROMPT
+    return [SystemMessage(content=system_prompt)] + list(state["messages"])
+
+def _handle_model_response(state: AgentState, response, span):
+    """Record usage/trace attributes; returns the node update."""
+    record_llm_usage(LLM_MODEL_NAME, response)
     
-    print(f"🎯 Returning {len(outputs)} tool message(s)")
-    return {"messages": outputs}
+    if tracing.is_sampled():
+        span.set(
+            message_types=[getattr(msg, 'type', 'unknown') for msg in state["messages"]],
+            tool_calls=[{"name": tc['name'], "args": tc['args']} for tc in getattr(response, 'tool_calls', None) or []],
+            content_chars=len(response.content or ""),
+            usage=getattr(response, 'usage_metadata', None),
+        )
+    
+    # The turn's reply is saved to Redis once, by _save_reply, when the graph finishes
+    # We return a list, because this will get added to the existing messages state using the add_messages reducer
+    return {"messages": [response], "number_of_steps": state.get("number_of_steps", 0) + 1}
+
+def _model_error_response(e: Exception):
+    print(f"❌ Error in call_model: {e}")
+    tracing.event("llm_error", error=f"{type(e).__name__}: {e}")
+    # Create a simple error response
+    from langchain_core.messages import AIMessage
+    error_response = AIMessage(content=json.dumps({
+        "answer": "I'm sorry, I encountered an error while processing your request. Please try again.",
+        "end": "How else can I help you with Lotus Electronics products?"
+    }))
+    return {"messages": [error_response]}
+
+def _llm_timeout(config: RunnableConfig) -> dict:
+    """Gemini request timeout for the rest of the turn's budget (nothing blocks past the deadline)."""
+    timeout = cancellation.request_timeout(config)
+    return {} if timeout is None else {"timeout": timeout}
+
+def _raise_if_cancelled(config: RunnableConfig, error: Exception) -> None:
+    """An LLM error of a cancelled turn (the request timed out at the deadline) cancels the turn."""
+    token = cancellation.from_config(config)
+    if token is not None and token.cancelled:
+        raise TurnCancelled(token.reason, "llm") from error
 
 def call_model(
     state: AgentState,
     config: RunnableConfig,
 ):
-    # Get user ID from state
-    user_id = state.get("user_id", "default_user")
-    
-    # Get the current conversation messages from state
-    messages = state["messages"]
-    
-    # Get the latest user message for debugging
-    latest_user_message = None
-    conversation_context = []
-    
-    # Analyze conversation history to extract product context
-    for msg in reversed(messages):
-        if hasattr(msg, 'type') and msg.type == 'human':
-            if latest_user_message is None:
-                latest_user_message = msg.content
-            conversation_context.append(msg.content)
-            if len(conversation_context) >= 3:  # Get last 3 user messages for context
-                break
-    
-    if latest_user_message:
-        print(f"🔍 Processing user query: '{latest_user_message}'")
-        # Add context awareness to debug output
-        if len(conversation_context) > 1:
-            print(f"📝 Conversation context: {conversation_context[-2::-1]}")  # Show previous messages
-        
-        # Debug: Show current message types in state
-        message_types = []
-        for msg in messages:
-            if hasattr(msg, 'type'):
-                message_types.append(msg.type)
-        print(f"🗂️  Current message types in state: {message_types}")
-    
-    # For Gemini, we need to ensure proper message sequence
-    # Use only the current conversation state messages with system prompt
-    messages_with_system = [SystemMessage(content=SYSTEM_PROMPT)] + messages
-    
+    cancellation.check(config, "llm")
+    timeout = _llm_timeout(config)
     try:
         # Invoke the model with the system prompt and the messages
-        response = model.invoke(messages_with_system, config)
-        
-        # Debug: Check if the model called any tools
-        if hasattr(response, 'tool_calls') and response.tool_calls:
-            print(f"✅ Model called {len(response.tool_calls)} tool(s): {[tc['name'] for tc in response.tool_calls]}")
-            # Debug: Show tool parameters
-            for tool_call in response.tool_calls:
-                print(f"🔧 Tool parameters: {tool_call['args']}")
-        else:
-            print("⚠️  Model did not call any tools")
-            # Debug: Show response content preview
-            if hasattr(response, 'content'):
-                content_preview = response.content[:100] + "..." if len(response.content) > 100 else response.content
-                print(f"📝 Response content preview: {content_preview}")
-        
-        # Save the new response to Redis (only HumanMessage and AIMessage)
-        if hasattr(response, 'type') and response.type == 'ai':
-            redis_memory.add_message_to_user(user_id, response)
-        
-        # We return a list, because this will get added to the existing messages state using the add_messages reducer
-        return {"messages": [response]}
-        
+        final = _is_final_hop(state)
+        with tracing.span("llm", model=LLM_MODEL_NAME, final=final) as span:
+            messages = _model_messages(state, final)
+            response = llm_cache.get(messages)
+            if response is None:
+                with timed(LLM_CALL_SECONDS, model=LLM_MODEL_NAME, outcome='ok'):
+                    response = (final_model if final else model).invoke(messages, config, **timeout)
+                llm_cache.put(messages, response)
+            else:
+                span.set(cache_hit=True)
+        return _handle_model_response(state, response, span)
+    except TurnCancelled:
+        raise
+    except Exception as e:
+        _raise_if_cancelled(config, e)
+        return _model_error_response(e)
+
+async def acall_model(
+    state: AgentState,
+    config: RunnableConfig,
+):
+    """Async call_model: awaits the Gemini round trip instead of blocking the event loop."""
+    cancellation.check(config, "llm")
+    timeout = _llm_timeout(config)
+    try:
+        final = _is_final_hop(state)
+        with tracing.span("llm", model=LLM_MODEL_NAME, final=final) as span:
+            messages = _model_messages(state, final)
+            response = await asyncio.to_thread(llm_cache.get, messages) if llm_cache.enabled else None
+            if response is None:
+                with timed(LLM_CALL_SECONDS, model=LLM_MODEL_NAME, outcome='ok'):
+                    response = await (final_model if final else model).ainvoke(messages, config, **timeout)
+                if llm_cache.enabled:
+                    await asyncio.to_thread(llm_cache.put, messages, response)
+            else:
+                span.set(cache_hit=True)
+        return _handle_model_response(state, response, span)
+    except TurnCancelled:
+        raise
     except Exception as e:
-        print(f"❌ Error in call_model: {e}")
-        # Create a simple error response
-        from langchain_core.messages import AIMessage
-        error_response = AIMessage(content=json.dumps({
-            "answer": "I'm sorry, I encountered an error while processing your request. Please try again.",
-            "end": "How else can I help you with Lotus Electronics products?"
-        }))
-        return {"messages": [error_response]}
+        _raise_if_cancelled(config, e)
+        return _model_error_response(e)
+
+
+def _coerce_reply(args: dict) -> dict:
+    """Best-effort reply from AgentResponse arguments that failed validation."""
+    def listed(value):
+        return [item for item in value if isinstance(item, dict)] if isinstance(value, list) else []
+    details = args.get("product_details")
+    return {
+        "answer": str(args.get("answer") or "How can I help you with Lotus Electronics products?"),
+        "products": listed(args.get("products")),
+        "product_details": details if isinstance(details, dict) else {},
+        "stores": listed(args.get("stores")),
+        "policy_info": {},
+        "end": str(args.get("end") or "Is there anything else I can help you with?"),
+    }
 
+def respond(state: AgentState):
+    """Turn the model's AgentResponse call into the final reply message."""
+    from langchain_core.messages import AIMessage
+    from pydantic import ValidationError
+    tool_calls = state["messages"][-1].tool_calls
+    respond_call = next(tc for tc in tool_calls if tc["name"] == RESPOND_TOOL)
+    try:
+        reply = AgentResponse.model_validate(respond_call["args"]).to_reply()
+        RESPONSE_PARSE_TOTAL.labels(outcome='structured').inc()
+    except ValidationError as e:
+        RESPONSE_PARSE_TOTAL.labels(outcome='schema_invalid').inc()
+        tracing.event("response_schema_invalid", errors=e.error_count())
+        reply = _coerce_reply(respond_call["args"])
+    
+    # Answer every call of the step so the turn's final state has no dangling tool calls
+    # (the graph ends here; only the condensed reply is kept as history, see _save_reply)
+    outputs = [
+        ToolMessage(
+            content="Reply sent." if tc is respond_call else "Not executed: the turn was already answered.",
+            name=tc["name"],
+            tool_call_id=tc["id"],
+        )
+        for tc in tool_calls
+    ]
+    outputs.append(AIMessage(content=json_codec.dumps(reply).decode("utf-8"), response_metadata={"reply": reply}))
+    return {"messages": outputs}
 
 # Define the conditional edge that determines whether to continue or not
 def should_continue(state: AgentState):
     messages = state["messages"]
     last_message = messages[-1]
     
-    # Debug: show what type of message we're evaluating
-    print(f"🔍 Evaluating message type: {getattr(last_message, 'type', 'unknown')}")
-    
     # If called after LLM node and the last message has tool_calls, continue to tools
+    # (or finish through the respond node when the model sent its final answer)
     if hasattr(last_message, 'tool_calls') and last_message.tool_calls:
-        print("🔄 AI made tool calls - continuing to tool execution...")
+        if any(tc["name"] == RESPOND_TOOL for tc in last_message.tool_calls):
+            tracing.event("route", decision="respond")
+            return "respond"
+        if state.get("number_of_steps", 0) >= LLM_HOP_LIMIT:
+            # No LLM call would be left to read the results
+            tracing.event("route", decision="end", reason="hop_limit")
+            return "end"
+        tracing.event("route", decision="tools")
         return "continue"
     
     # If called after tools node and the last message is a tool result, continue back to LLM
     # for intelligent processing of the tool results
     if hasattr(last_message, 'type') and last_message.type == 'tool':
-        print("🔄 Tool execution complete - continuing to LLM for intelligent response")
+        tracing.event("route", decision="llm")
         return "continue"
-        
-    # If the last message is an AI message without tool calls, end
-    if hasattr(last_message, 'type') and last_message.type == 'ai' and not hasattr(last_message, 'tool_calls'):
-        print("🏁 AI response without tools - ending conversation")
-        return "end"
     
-    # Default fallback - end conversation
-    print("🏁 Default case - ending conversation")
+    # An AI message without tool calls (or anything else) ends the conversation
+    tracing.event("route", decision="end")
     return "end"
 
 
 from langgraph.graph import StateGraph, END
 
-# Define a new graph with our state
-workflow = StateGraph(AgentState)
-
-# 1. Add our nodes 
-workflow.add_node("llm", call_model)
-workflow.add_node("tools",  call_tool)
-# 2. Set the entrypoint as `agent`, this is the first node called
-workflow.set_entry_point("llm")
-# 3. Add a conditional edge after the `llm` node is called.
-workflow.add_conditional_edges(
-    # Edge is used after the `llm` node is called.
-    "llm",
-    # The function that will determine which node is called next.
-    should_continue,
-    # Mapping for where to go next, keys are strings from the function return, and the values are other nodes.
-    # END is a special node marking that the graph is finish.
-    {
-        # If `tools`, then we call the tool node.
-        "continue": "tools",
-        # Otherwise we finish.
-        "end": END,
-    },
-)
-# 4. Add a conditional edge after `tools` is called to continue back to LLM for processing
-workflow.add_conditional_edges(
-    # Edge is used after the `tools` node is called.
-    "tools",
-    # The function that will determine what happens after tool execution
-    should_continue,
-    # Tools now return data to LLM for intelligent processing
-    {
-        # Continue back to LLM for intelligent response creation
-        "continue": "llm",
-        # End only when LLM creates final response
-        "end": END,
-    },
-)
+# No checkpointer: each turn's state is rebuilt from the condensed Redis history,
+# so a per-thread MemorySaver would only replay every earlier tool payload a second time.
+
+def build_graph(llm_node, tool_node):
+    """Compile the llm <-> tools loop; the sync and async graphs share this shape."""
+    # Define a new graph with our state
+    workflow = StateGraph(AgentState)
 
-# Add checkpointing for better state management and recovery
-from langgraph.checkpoint.memory import MemorySaver
-checkpointer = MemorySaver()
+    # 1. Add our nodes 
+    workflow.add_node("llm", llm_node)
+    workflow.add_node("tools", tool_node)
+    workflow.add_node("respond", respond)
+    # 2. Set the entrypoint as `agent`, this is the first node called
+    workflow.set_entry_point("llm")
+    # 3. Add a conditional edge after the `llm` node is called.
+    workflow.add_conditional_edges(
+        # Edge is used after the `llm` node is called.
+        "llm",
+        # The function that will determine which node is called next.
+        should_continue,
+        # Mapping for where to go next, keys are strings from the function return, and the values are other nodes.
+        # END is a special node marking that the graph is finish.
+        {
+            # If `tools`, then we call the tool node.
+            "continue": "tools",
+            # The model called AgentResponse - build the reply and finish.
+            "respond": "respond",
+            # Otherwise we finish.
+            "end": END,
+        },
+    )
+    workflow.add_edge("respond", END)
+    # 4. Add a conditional edge after `tools` is called to continue back to LLM for processing
+    workflow.add_conditional_edges(
+        # Edge is used after the `tools` node is called.
+        "tools",
+        # The function that will determine what happens after tool execution
+        should_continue,
+        # Tools now return data to LLM for intelligent processing
+        {
+            # Continue back to LLM for intelligent response creation
+            "continue": "llm",
+            # End only when LLM creates final response
+            "end": END,
+        },
+    )
 
-# Now we can compile and visualize our graph with checkpointing
-graph = workflow.compile(checkpointer=checkpointer)
+    # Now we can compile and visualize our graph
+    return workflow.compile()
+
+graph = build_graph(call_model, call_tool)
+# Same graph with async nodes, driven by astream() from chat_with_agent_async
+async_graph = build_graph(acall_model, acall_tool)
 
 from datetime import datetime
 
@@ -554,250 +734,433 @@ def display_user_stats(user_id: str):
     print(f"Active users: {len(redis_memory.get_active_users())}")
     print("-" * 30)
 
-def chat_with_agent(message: str, session_id: str = "default_session") -> str:
+class ChatReply(TypedDict, total=False):
+    """Reply of one chat turn, as returned by chat_with_agent and sent to clients."""
+    answer: str
+    products: list
+    product_details: dict
+    stores: list
+    policy_info: dict
+    end: str
+
+def format_agent_response(final_response, message: str) -> ChatReply:
+    """
+    Clean the final LLM output into the reply dict, unwrapping the nested
+    structures Gemini sometimes produces and falling back to canned replies.
+    """
+    if final_response:
+        # Single pass: first balanced JSON object, fences/trailing text ignored, known nesting unwrapped
+        parsed_json = parse_agent_response(final_response)
+        if parsed_json is not None:
+            RESPONSE_PARSE_TOTAL.labels(outcome='extracted').inc()
+            return parsed_json
+
+        RESPONSE_PARSE_TOTAL.labels(outcome='fallback').inc()
+        tracing.event("response_not_json", chars=len(final_response))
+        clean_response = strip_code_fences(final_response)
+
+        # Wrap non-JSON response in JSON format with contextual handling
+        # Provide contextual responses based on user message
+        user_msg_lower = message.lower() if message else ""
+
+        if any(greeting in user_msg_lower for greeting in ['hello', 'hi', 'hey', 'helo']):
+            fallback_response = {
+                "answer": "Hello! Welcome to Lotus Electronics! I'm here to help you find the perfect electronics products. What are you looking for today?",
+                "products": [],
+                "product_details": {},
+                "stores": [],
+                "policy_info": {},
+                "end": "I can help you find TVs, smartphones, laptops, home appliances, and more. What interests you?"
+            }
+        elif any(help_word in user_msg_lower for help_word in ['help', 'assist', 'support']):
+            fallback_response = {
+                "answer": "I'd be happy to help! I can assist you with finding products, getting detailed specifications, locating nearby stores, and checking availability.",
+                "products": [],
+                "product_details": {},
+                "stores": [],
+                "policy_info": {},
+                "end": "What would you like to explore - TVs, smartphones, laptops, or something else?"
+            }
+        elif any(thanks in user_msg_lower for thanks in ['thanks', 'thank you', 'thx']):
+            fallback_response = {
+                "answer": "You're welcome! I'm glad I could help.",
+                "products": [],
+                "product_details": {},
+                "stores": [],
+                "policy_info": {},
+                "end": "Is there anything else you'd like to know about our electronics collection?"
+            }
+        else:
+            # Generic fallback with the original response
+            fallback_response = {
+                "answer": clean_response if clean_response else "I understand. How can I help you with Lotus Electronics products?",
+                "products": [],
+                "product_details": {},
+                "stores": [],
+                "policy_info": {},
+                "end": "Are you looking for any specific electronics or need help finding a store?"
+            }
+
+        return fallback_response
+    else:
+        # Default response if no content
+        RESPONSE_PARSE_TOTAL.labels(outcome='empty').inc()
+        error_response = {
+            "answer": "I apologize, but I couldn't process your request at the moment. Please try again or contact our support team.",
+            "products": [],
+            "product_details": {},
+            "stores": [],
+            "policy_info": {},
+            "end": "How else can I assist you with Lotus Electronics products today?"
+        }
+        return error_response
+
+def chat_with_agent(message: str, session_id: str = "default_session", cancel_token: CancelToken = None) -> ChatReply:
     """
     Chat with the Lotus Electronics agent for Flask integration.
     
     Args:
         message: User's message
         session_id: Unique session identifier for conversation memory
+        cancel_token: Stops the turn early when cancelled; defaults to a
+            CHAT_DEADLINE_SECONDS deadline
         
     Returns:
-        JSON string response from the agent
+        Reply dict (answer, products, product_details, stores, policy_info, end);
+        serialize it at the HTTP edge with json_codec
+    """
+    if cancel_token is None:
+        cancel_token = CancelToken(cancellation.CHAT_DEADLINE_SECONDS)
+    with tracing.start_trace("chat_request", session_id=session_id, message_chars=len(message or "")):
+        # A duplicate of a turn that is still running waits for that turn's reply
+        message_digest = hashlib.sha256((message or "").encode("utf-8")).hexdigest()
+        try:
+            return chat_flight.do(
+                f"{session_id}:{message_digest}",
+                lambda: _run_chat(message, session_id, cancel_token),
+                serialize=json_codec.dumps,
+                deserialize=json_codec.loads,
+            )
+        except TurnCancelled as e:
+            return _cancelled_response(e)
+
+def _turn_error_response(e: Exception) -> ChatReply:
+    """Error reply for an exception raised while running a turn."""
+    print(f"❌ Error in chat_with_agent: {type(e).__name__}: {str(e)}")
+
+    # Specific handling for different error types
+    if "Input/output error" in str(e) or "Errno 5" in str(e):
+        error_message = "I'm experiencing connectivity issues. Please check if Redis server is running and try again."
+    elif "Redis" in str(e):
+        error_message = "Database connection issue. Please ensure Redis server is running on localhost:6379."
+    else:
+        error_message = f"Technical issue occurred: {str(e)}. Please try again in a moment."
+
+    # Error response in JSON format
+    error_response = {
+        "answer": f"I'm sorry, there was a technical issue. {error_message}",
+        "products": [],
+        "product_details": {},
+        "stores": [],
+        "policy_info": {},
+        "end": "Is there anything else I can help you with from our electronics collection?"
+    }
+    return error_response
+
+# Human/AI messages replayed per turn; stated preferences come from slot memory
+# and shown products from session context, so only the last two exchanges are needed
+HISTORY_WINDOW = 4
+
+def _prepare_turn(message: str, session_id: str, cancel_token: CancelToken = None):
+    """Load conversation context, persist the user message and build the graph inputs/config."""
+    # Use session_id as user_id for Redis memory
+    user_id = session_id
+    
+    # Check Redis connection health
+    redis_available = hasattr(redis_memory, 'test_connection') and redis_memory.test_connection()
+    if not redis_available:
+        tracing.event("redis_unavailable")
+    
+    # Create user message
+    from langchain_core.messages import HumanMessage
+    user_msg = HumanMessage(content=message)
+    
+    # Load previous conversation context (limited for Gemini compatibility)
+    previous_messages = []
+    if redis_available:
+        previous_messages = redis_memory.get_user_messages(user_id)
+    
+    # Filter and limit conversation history for better Gemini compatibility
+    context_messages = []
+    for msg in previous_messages[-HISTORY_WINDOW:]:
+        if hasattr(msg, 'type') and msg.type in ['human', 'ai']:
+            context_messages.append(msg)
+    
+    # Save user message to Redis memory if available
+    if redis_available:
+        redis_memory.add_message_to_user(user_id, user_msg)
+    
+    # Prepare inputs for the graph with conversation context
+    all_messages = context_messages + [user_msg]
+    slots = slot_memory.update(user_id, message)
+    context = session_context.prompt_line(user_id, message)
+    if slots:
+        context = f"Known preferences: {format_slots(slots)}" + ("\n" + context if context else "")
+    inputs = {
+        "messages": all_messages,
+        "user_id": user_id,
+        "number_of_steps": 0,
+        "context": context,
+        "slots": slots,
+    }
+    
+    # thread_id only labels the run; conversation state comes from Redis
+    config = {"configurable": {"thread_id": session_id, "cancel_token": cancel_token}}
+    return inputs, config
+
+# Prevent infinite llm <-> tools loops
+MAX_GRAPH_ITERATIONS = 15
+
+def _final_ai_message(state: dict):
+    """The state's last message if it is a non-empty AI response, else None."""
+    # Get the last message from the final state
+    if "messages" in state and state["messages"]:
+        last_message = state["messages"][-1]
+        # Accept AI responses as final (tools now feed data to LLM for processing)
+        if getattr(last_message, 'type', None) == 'ai' and getattr(last_message, 'content', None):
+            return last_message
+    return None
+
+def _finish_turn(final_message, response_count: int, llm_hops: int, message: str) -> ChatReply:
+    GRAPH_ITERATIONS.observe(response_count)
+    LLM_HOPS.labels(mode='plan' if AGENT_PLAN_MODE else 'loop').observe(llm_hops)
+    tracing.event("graph_complete", steps=response_count, llm_hops=llm_hops, has_response=final_message is not None)
+    # Replies built by the respond node are already validated
+    reply = final_message.response_metadata.get("reply") if final_message is not None else None
+    if reply is not None:
+        return reply
+    # Free-text answer (model error, or a model that ignored the respond tool) - clean it up
+    with timed(POSTPROCESS_SECONDS):
+        return format_agent_response(final_message.content if final_message is not None else None, message)
+
+def _condense_reply(reply: ChatReply) -> str:
+    """History form of a reply: answer, follow-up and the ids/names of what was shown."""
+    compact = {"answer": reply.get("answer", "")}
+    products = [
+        {"id": p.get("product_id"), "name": p.get("product_name")}
+        for p in reply.get("products") or [] if isinstance(p, dict)
+    ]
+    if products:
+        compact["products"] = products
+    details = reply.get("product_details")
+    if isinstance(details, dict) and details.get("product_id"):
+        compact["product_details"] = {"id": details.get("product_id"), "name": details.get("product_name")}
+    stores = [s.get("store_name") for s in reply.get("stores") or [] if isinstance(s, dict)]
+    if stores:
+        compact["stores"] = stores
+    if reply.get("end"):
+        compact["end"] = reply["end"]
+    return json_codec.dumps(compact).decode("utf-8")
+
+def _save_reply(session_id: str, reply: ChatReply):
+    """
+    Persist the turn's reply: a condensed plain AIMessage (no tool calls or metadata)
+    for the next turns' context, the full payload under last_response:{session_id},
+    and the products it lists for resolving references to them (session_context.py).
     """
+    from langchain_core.messages import AIMessage
+    redis_memory.add_message_to_user(session_id, AIMessage(content=_condense_reply(reply)))
+    redis_memory.save_last_response(session_id, reply)
+    session_context.record_reply(session_id, reply)
+
+def _run_chat(message: str, session_id: str, cancel_token: CancelToken) -> ChatReply:
+    """Run one chat turn through the graph; see chat_with_agent."""
+    # Tools read the token from the context to bound their HTTP timeouts
+    context_token = cancellation.set_current(cancel_token)
     try:
-        # Use session_id as user_id for Redis memory
-        user_id = session_id
-        
-        # Check Redis connection health
-        redis_available = hasattr(redis_memory, 'test_connection') and redis_memory.test_connection()
-        if not redis_available:
-            print("⚠️  Redis not available - running without conversation memory")
-        
-        # Create user message
-        from langchain_core.messages import HumanMessage
-        user_msg = HumanMessage(content=message)
-        
-        # Load previous conversation context (limited for Gemini compatibility)
-        previous_messages = []
-        if redis_available:
-            previous_messages = redis_memory.get_user_messages(user_id)
-        
-        # Filter and limit conversation history for better Gemini compatibility
-        context_messages = []
-        for msg in previous_messages[-6:]:  # Only last 6 messages for context
-            if hasattr(msg, 'type') and msg.type in ['human', 'ai']:
-                context_messages.append(msg)
-        
-        # Save user message to Redis memory if available
-        if redis_available:
-            redis_memory.add_message_to_user(user_id, user_msg)
-        
-        # Prepare inputs for the graph with conversation context
-        all_messages = context_messages + [user_msg]
-        inputs = {
-            "messages": all_messages,
-            "user_id": user_id,
-            "number_of_steps": 0
-        }
-        
-        # Configure checkpointing with thread ID based on session
-        config = {"configurable": {"thread_id": session_id}}
+        inputs, config = _prepare_turn(message, session_id, cancel_token)
         
         # Process through the graph
-        final_response = None
+        final_message = None
         response_count = 0
-        max_iterations = 15  # Prevent infinite loops
-        
+        llm_hops = 0
         for state in graph.stream(inputs, config=config, stream_mode="values"):
+            # Leaving the loop closes the stream, so no further node is started
+            cancel_token.check("graph")
             response_count += 1
-            if response_count > max_iterations:
+            if response_count > MAX_GRAPH_ITERATIONS:
                 break
-                
-            # Get the last message from the final state
-            if "messages" in state and state["messages"]:
-                last_message = state["messages"][-1]
-                if hasattr(last_message, 'content') and hasattr(last_message, 'type'):
-                    # Accept AI responses as final (tools now feed data to LLM for processing)
-                    if last_message.type == 'ai' and last_message.content:
-                        print(f"🤖 Got AI response: {len(last_message.content)} chars")
-                        final_response = last_message.content
-                        # Don't break here - let the conversation continue if there are more tool calls
+            llm_hops = state.get("number_of_steps", llm_hops)
+            # Don't break on an AI response - let the conversation continue if there are more tool calls
+            final_message = _final_ai_message(state) or final_message
         
-        # Clean and validate the response
-        if final_response:
-            # Clean the response from any markdown formatting
-            clean_response = final_response.strip()
-            if clean_response.startswith('```json'):
-                clean_response = clean_response.replace('```json', '').replace('```', '').strip()
-            
-            try:
-                # Check if it's already valid JSON
-                parsed_json = json.loads(clean_response)
-                print(f"🔧 Initial parsing successful. Keys: {list(parsed_json.keys()) if isinstance(parsed_json, dict) else 'Not a dict'}")
-                
-                # Handle deeply nested JSON structure from data.answer field
-                def parse_nested_structure(data_dict):
-                    """Recursively parse nested JSON structures and product details output"""
-                    if isinstance(data_dict, dict):
-                        # Check for data.answer structure first (most complex nesting)
-                        if 'data' in data_dict and isinstance(data_dict['data'], dict):
-                            data_content = data_dict['data']
-                            if 'answer' in data_content and isinstance(data_content['answer'], str):
-                                try:
-                                    # Parse the nested JSON in data.answer
-                                    nested_json = json.loads(data_content['answer'])
-                                    if isinstance(nested_json, dict):
-                                        # Recursively process any further nesting
-                                        nested_json = parse_nested_structure(nested_json)
-                                        return nested_json
-                                except (json.JSONDecodeError, TypeError) as e:
-                                    print(f"🔧 Failed to parse data.answer as JSON: {e}")
-                            # If data.answer parsing fails, return the data content
-                            return data_content
-                        
-                        # Check for direct answer field with nested JSON
-                        if 'answer' in data_dict and isinstance(data_dict['answer'], str):
-                            try:
-                                # Try to parse answer as JSON first
-                                nested_json = json.loads(data_dict['answer'])
-                                if isinstance(nested_json, dict):
-                                    # Recursively process the nested JSON
-                                    nested_json = parse_nested_structure(nested_json)
-                                    return nested_json
-                            except (json.JSONDecodeError, TypeError) as e:
-                                print(f"🔧 Failed to parse direct answer as JSON: {e}")
-                        
-                        # Process product_details output field if present at any level
-                        if 'product_details' in data_dict and isinstance(data_dict['product_details'], dict):
-                            if 'output' in data_dict['product_details']:
-                                try:
-                                    import ast
-                                    output_str = data_dict['product_details']['output']
-                                    print(f"🔧 Parsing product_details output: {output_str[:100]}...")
-                                    product_details_obj = ast.literal_eval(output_str)
-                                    data_dict['product_details'] = product_details_obj
-                                    print(f"✅ Successfully parsed product details")
-                                except (ValueError, SyntaxError) as e:
-                                    print(f"❌ Error parsing product details output: {e}")
-                                    # If parsing fails, keep the original structure
-                                    pass
-                    
-                    return data_dict
-                
-                # Apply nested structure parsing
-                print(f"🔧 Original response structure: {list(parsed_json.keys()) if isinstance(parsed_json, dict) else type(parsed_json)}")
-                parsed_json = parse_nested_structure(parsed_json)
-                print(f"🔧 Final response structure: {list(parsed_json.keys()) if isinstance(parsed_json, dict) else type(parsed_json)}")
-                
-                # Ensure we have the expected structure - if it's missing top-level fields, try to extract them
-                if isinstance(parsed_json, dict):
-                    # If we don't have expected keys, the LLM might have wrapped everything in a data field
-                    expected_keys = {'answer', 'products', 'product_details', 'stores', 'end'}
-                    current_keys = set(parsed_json.keys())
-                    
-                    if not any(key in current_keys for key in expected_keys):
-                        print("⚠️  Response doesn't have expected structure. Trying to extract from nested fields...")
-                        # Try to find the actual response structure in nested fields
-                        if 'data' in parsed_json:
-                            parsed_json = parsed_json['data']
-                            print(f"🔧 Extracted from data field. New keys: {list(parsed_json.keys())}")
-                
-                # Return properly formatted JSON
-                return json.dumps(parsed_json, ensure_ascii=False, indent=2)
-                
-            except json.JSONDecodeError:
-                # Try to extract JSON from the response
-                import re
-                json_match = re.search(r'\{.*\}', clean_response, re.DOTALL)
-                if json_match:
-                    try:
-                        extracted_json = json_match.group(0)
-                        parsed_json = json.loads(extracted_json)
-                        
-                        # Apply the same nested structure parsing to extracted JSON
-                        parsed_json = parse_nested_structure(parsed_json)
-                        
-                        return json.dumps(parsed_json, ensure_ascii=False, indent=2)
-                    except:
-                        pass
-                
-                # Wrap non-JSON response in JSON format with contextual handling
-                # Provide contextual responses based on user message
-                user_msg_lower = message.lower() if message else ""
-                
-                if any(greeting in user_msg_lower for greeting in ['hello', 'hi', 'hey', 'helo']):
-                    fallback_response = {
-                        "answer": "Hello! Welcome to Lotus Electronics! I'm here to help you find the perfect electronics products. What are you looking for today?",
-                        "products": [],
-                        "product_details": {},
-                        "stores": [],
-                        "policy_info": {},
-                        "end": "I can help you find TVs, smartphones, laptops, home appliances, and more. What interests you?"
-                    }
-                elif any(help_word in user_msg_lower for help_word in ['help', 'assist', 'support']):
-                    fallback_response = {
-                        "answer": "I'd be happy to help! I can assist you with finding products, getting detailed specifications, locating nearby stores, and checking availability.",
-                        "products": [],
-                        "product_details": {},
-                        "stores": [],
-                        "policy_info": {},
-                        "end": "What would you like to explore - TVs, smartphones, laptops, or something else?"
-                    }
-                elif any(thanks in user_msg_lower for thanks in ['thanks', 'thank you', 'thx']):
-                    fallback_response = {
-                        "answer": "You're welcome! I'm glad I could help.",
-                        "products": [],
-                        "product_details": {},
-                        "stores": [],
-                        "policy_info": {},
-                        "end": "Is there anything else you'd like to know about our electronics collection?"
-                    }
-                else:
-                    # Generic fallback with the original response
-                    fallback_response = {
-                        "answer": clean_response if clean_response else "I understand. How can I help you with Lotus Electronics products?",
-                        "products": [],
-                        "product_details": {},
-                        "stores": [],
-                        "policy_info": {},
-                        "end": "Are you looking for any specific electronics or need help finding a store?"
-                    }
-                
-                return json.dumps(fallback_response, ensure_ascii=False, indent=2)
-        else:
-            # Default response if no content
-            error_response = {
-                "answer": "I apologize, but I couldn't process your request at the moment. Please try again or contact our support team.",
-                "products": [],
-                "product_details": {},
-                "stores": [],
-                "policy_info": {},
-                "end": "How else can I assist you with Lotus Electronics products today?"
-            }
-            return json.dumps(error_response, ensure_ascii=False, indent=2)
-            
+        reply = _finish_turn(final_message, response_count, llm_hops, message)
+        _save_reply(session_id, reply)
+        return reply
+    except TurnCancelled:
+        # Not a reply to share or save - chat_with_agent answers the caller
+        raise
     except Exception as e:
-        print(f"❌ Error in chat_with_agent: {type(e).__name__}: {str(e)}")
+        return _turn_error_response(e)
+    finally:
+        cancellation.reset_current(context_token)
+
+async def _astream_turn(inputs: dict, config: dict, cancel_token: CancelToken):
+    """Drive async_graph for one turn; returns (final_message, response_count, llm_hops)."""
+    final_message = None
+    response_count = 0
+    llm_hops = 0
+    async for state in async_graph.astream(inputs, config=config, stream_mode="values"):
+        cancel_token.check("graph")
+        response_count += 1
+        if response_count > MAX_GRAPH_ITERATIONS:
+            break
+        llm_hops = state.get("number_of_steps", llm_hops)
+        final_message = _final_ai_message(state) or final_message
+    return final_message, response_count, llm_hops
+
+async def _arun_chat(message: str, session_id: str, cancel_token: CancelToken) -> ChatReply:
+    """Async _run_chat on async_graph.astream; Redis context loading runs in a worker thread."""
+    context_token = cancellation.set_current(cancel_token)
+    try:
+        inputs, config = await asyncio.to_thread(_prepare_turn, message, session_id, cancel_token)
         
-        # Specific handling for different error types
-        if "Input/output error" in str(e) or "Errno 5" in str(e):
-            error_message = "I'm experiencing connectivity issues. Please check if Redis server is running and try again."
-        elif "Redis" in str(e):
-            error_message = "Database connection issue. Please ensure Redis server is running on localhost:6379."
-        else:
-            error_message = f"Technical issue occurred: {str(e)}. Please try again in a moment."
+        # The deadline also interrupts an LLM or tool call that is still being awaited
+        try:
+            final_message, response_count, llm_hops = await asyncio.wait_for(
+                _astream_turn(inputs, config, cancel_token), cancel_token.remaining()
+            )
+        except asyncio.TimeoutError:
+            raise TurnCancelled(cancellation.DEADLINE, "graph") from None
         
-        # Error response in JSON format
-        error_response = {
-            "answer": f"I'm sorry, there was a technical issue. {error_message}",
-            "products": [],
-            "product_details": {},
-            "stores": [],
-            "policy_info": {},
-            "end": "Is there anything else I can help you with from our electronics collection?"
-        }
-        return json.dumps(error_response, ensure_ascii=False, indent=2)
+        reply = _finish_turn(final_message, response_count, llm_hops, message)
+        await asyncio.to_thread(_save_reply, session_id, reply)
+        return reply
+    except TurnCancelled:
+        raise
+    except Exception as e:
+        return _turn_error_response(e)
+    finally:
+        cancellation.reset_current(context_token)
+
+def _cancelled_response(e: TurnCancelled) -> ChatReply:
+    """Reply for a turn stopped by its cancel token (only seen when the caller is still there)."""
+    CHAT_CANCELLED_TOTAL.labels(reason=e.reason, stage=e.stage or 'unknown').inc()
+    tracing.event("turn_cancelled", reason=e.reason, stage=e.stage)
+    return {
+        "answer": "Sorry, this is taking longer than expected. Please try again in a moment.",
+        "products": [],
+        "product_details": {},
+        "stores": [],
+        "policy_info": {},
+        "end": "Is there anything else I can help you with from our electronics collection?"
+    }
+
+async def chat_with_agent_async(message: str, session_id: str = "default_session",
+                                cancel_token: CancelToken = None) -> ChatReply:
+    """
+    Async chat_with_agent for the FastAPI app (main.py): LLM calls, tool calls and
+    Redis access never block the event loop, so one process serves many chats.
+    
+    Cancelling the calling task (main.py does on client disconnect) stops the
+    turn too, unless a duplicate request is still waiting for the same reply.
+    
+    Args:
+        message: User's message
+        session_id: Unique session identifier for conversation memory
+        cancel_token: Deadline of the turn; defaults to CHAT_DEADLINE_SECONDS
+        
+    Returns:
+        Reply dict, as for chat_with_agent
+    """
+    if cancel_token is None:
+        cancel_token = CancelToken(cancellation.CHAT_DEADLINE_SECONDS)
+    with tracing.start_trace("chat_request", session_id=session_id, message_chars=len(message or "")):
+        message_digest = hashlib.sha256((message or "").encode("utf-8")).hexdigest()
+        try:
+            return await chat_flight.do_async(
+                f"{session_id}:{message_digest}",
+                lambda: _arun_chat(message, session_id, cancel_token),
+                serialize=json_codec.dumps,
+                deserialize=json_codec.loads,
+            )
+        except TurnCancelled as e:
+            return _cancelled_response(e)
+        except asyncio.CancelledError:
+            CHAT_CANCELLED_TOTAL.labels(reason=cancel_token.reason or cancellation.CLIENT_DISCONNECT, stage='await').inc()
+            tracing.event("turn_cancelled", reason=cancel_token.reason or cancellation.CLIENT_DISCONNECT)
+            raise
+
+import queue
+import threading
+
+# Upper bound on sessions processed concurrently by chat_with_agent_batch
+CHAT_BATCH_MAX_CONCURRENCY = int(os.getenv("CHAT_BATCH_MAX_CONCURRENCY", "4"))
+# Maximum number of turns the /chat/batch endpoints accept in one request
+CHAT_BATCH_MAX_ITEMS = int(os.getenv("CHAT_BATCH_MAX_ITEMS", "5000"))
+
+def chat_with_agent_batch(turns, max_concurrency: int = None):
+    """
+    Run many chat turns, e.g. QA replays or WhatsApp backlog, in one call.
+    
+    Turns for different sessions run concurrently (at most `max_concurrency`
+    sessions at once); turns that share a session_id run in the order given,
+    so the conversation memory sees them as a normal dialogue.
+    
+    Args:
+        turns: Iterable of dicts with "message", "session_id" and an optional "id"
+        max_concurrency: Parallel sessions, capped at CHAT_BATCH_MAX_CONCURRENCY
+        
+    Yields:
+        One result dict per turn as soon as it completes:
+        {"index", "id", "session_id", "status", "data" | "error"}
+    """
+    limit = CHAT_BATCH_MAX_CONCURRENCY if not max_concurrency else min(max_concurrency, CHAT_BATCH_MAX_CONCURRENCY)
+    limit = max(1, limit)
+    
+    # Group turns by session, keeping their original order and index
+    sessions = {}
+    total = 0
+    for index, turn in enumerate(turns):
+        if not isinstance(turn, dict):
+            turn = {}
+        session_id = turn.get("session_id") or "default_session"
+        sessions.setdefault(session_id, []).append((index, turn))
+        total += 1
+    
+    results = queue.Queue()
+    stopped = threading.Event()
+    # Parent of every turn's token: closing the stream stops the turns in flight too
+    batch_token = CancelToken()
+    
+    def run_session(session_id, items):
+        for index, turn in items:
+            result = {"index": index, "id": turn.get("id"), "session_id": session_id}
+            message = (turn.get("message") or "").strip()
+            if stopped.is_set():
+                result.update(status="cancelled")
+            elif not message:
+                result.update(status="error", error="Missing 'message'")
+            else:
+                try:
+                    turn_token = CancelToken(cancellation.CHAT_DEADLINE_SECONDS, parent=batch_token)
+                    result.update(status="success", data=chat_with_agent(message, session_id, turn_token))
+                except Exception as e:
+                    result.update(status="error", error=f"{type(e).__name__}: {e}")
+            results.put(result)
+    
+    executor = ThreadPoolExecutor(max_workers=min(limit, len(sessions) or 1), thread_name_prefix="chat-batch")
+    try:
+        for session_id, items in sessions.items():
+            executor.submit(run_session, session_id, items)
+        for _ in range(total):
+            yield results.get()
+    finally:
+        # Consumer went away (e.g. client disconnected): skip the remaining turns
+        # and stop the running ones at their next step
+        stopped.set()
+        batch_token.cancel(cancellation.CLIENT_DISCONNECT)
+        executor.shutdown(wait=False, cancel_futures=True)
 
 # Main execution - only run when script is executed directly
 if __name__ == "__main__":
@@ -848,141 +1211,80 @@ if __name__ == "__main__":
                 continue
             
             # Use the chat_with_agent function
-            response = chat_with_agent(input_message, user_id)
+            parsed_json = chat_with_agent(input_message, user_id)
             
-            # Parse and display the response
-            try:
-                # Clean the response if it contains markdown formatting
-                clean_response = response.strip()
-                if clean_response.startswith('```json'):
-                    # Remove markdown json formatting
-                    clean_response = clean_response.replace('```json', '').replace('```', '').strip()
-                
-                parsed_json = json.loads(clean_response)
-                
-                # Display formatted response
-                print(f"\n🤖 Lotus Electronics Assistant:")
-                print(f"💬 {parsed_json.get('answer', '')}")
-                
-                if 'products' in parsed_json and parsed_json['products']:
-                    print(f"\n📦 Products Found ({len(parsed_json['products'])}):")
-                    for i, product in enumerate(parsed_json['products'], 1):
-                        print(f"\n{i}. 🏷️ {product.get('product_name', 'N/A')}")
-                        print(f"   💰 Price: {product.get('product_mrp', 'N/A')}")
-                        if product.get('features'):
-                            print(f"   ✨ Features: {', '.join(product['features'][:2])}")
-                        if product.get('product_url'):
-                            print(f"   🔗 URL: {product['product_url']}")
+            # Display formatted response
+            print(f"\n🤖 Lotus Electronics Assistant:")
+            print(f"💬 {parsed_json.get('answer', '')}")
+            
+            if 'products' in parsed_json and parsed_json['products']:
+                print(f"\n📦 Products Found ({len(parsed_json['products'])}):")
+                for i, product in enumerate(parsed_json['products'], 1):
+                    print(f"\n{i}. 🏷️ {product.get('product_name', 'N/A')}")
+                    print(f"   💰 Price: {product.get('product_mrp', 'N/A')}")
+                    if product.get('features'):
+                        print(f"   ✨ Features: {', '.join(product['features'][:2])}")
+                    if product.get('product_url'):
+                        print(f"   🔗 URL: {product['product_url']}")
+            
+            if 'product_details' in parsed_json and parsed_json['product_details']:
+                details = parsed_json['product_details']
+                print(f"\n🔍 Product Details:")
+                print(f"📱 {details.get('product_name', 'N/A')}")
+                print(f"💰 Price: ₹{details.get('product_mrp', 'N/A')}")
+                print(f"📦 SKU: {details.get('product_sku', 'N/A')}")
+                if details.get('instock'):
+                    stock_status = "✅ In Stock" if details['instock'].lower() == 'yes' else "❌ Out of Stock"
+                    print(f"📦 Stock: {stock_status}")
                 
-                if 'product_details' in parsed_json and parsed_json['product_details']:
-                    details = parsed_json['product_details']
-                    print(f"\n🔍 Product Details:")
-                    print(f"📱 {details.get('product_name', 'N/A')}")
-                    print(f"💰 Price: ₹{details.get('product_mrp', 'N/A')}")
-                    print(f"📦 SKU: {details.get('product_sku', 'N/A')}")
-                    if details.get('instock'):
-                        stock_status = "✅ In Stock" if details['instock'].lower() == 'yes' else "❌ Out of Stock"
-                        print(f"📦 Stock: {stock_status}")
+                # Display top 5 specifications with priority for warranty
+                if details.get('product_specification') and isinstance(details['product_specification'], list):
+                    specs = details['product_specification']
                     
-                    # Display top 5 specifications with priority for warranty
-                    if details.get('product_specification') and isinstance(details['product_specification'], list):
-                        specs = details['product_specification']
-                        
-                        # Look for warranty and move to front
-                        warranty_spec = None
-                        filtered_specs = []
-                        for spec in specs:
-                            if isinstance(spec, dict) and spec.get('fkey') and 'warranty' in spec['fkey'].lower():
-                                warranty_spec = spec
-                            else:
-                                filtered_specs.append(spec)
-                        
-                        # Create final specs list with warranty first
-                        final_specs = []
-                        if warranty_spec:
-                            final_specs.append(warranty_spec)
-                        final_specs.extend(filtered_specs[:4] if warranty_spec else filtered_specs[:5])
-                        
-                        print(f"📋 Key Specifications:")
-                        for spec in final_specs:
-                            if isinstance(spec, dict) and spec.get('fkey') and spec.get('fvalue'):
-                                print(f"   • {spec['fkey']}: {spec['fvalue']}")
+                    # Look for warranty and move to front
+                    warranty_spec = None
+                    filtered_specs = []
+                    for spec in specs:
+                        if isinstance(spec, dict) and spec.get('fkey') and 'warranty' in spec['fkey'].lower():
+                            warranty_spec = spec
+                        else:
+                            filtered_specs.append(spec)
                     
-                    if details.get('meta_desc'):
-                        desc = details['meta_desc'][:150] + "..." if len(details['meta_desc']) > 150 else details['meta_desc']
-                        print(f"📝 Description: {desc}")
+                    # Create final specs list with warranty first
+                    final_specs = []
+                    if warranty_spec:
+                        final_specs.append(warranty_spec)
+                    final_specs.extend(filtered_specs[:4] if warranty_spec else filtered_specs[:5])
                     
-                    if details.get('del'):
-                        delivery = details['del']
-                        print(f"🚚 Delivery Options:")
-                        if delivery.get('std'):
-                            print(f"   • Standard: {delivery['std']}")
-                        if delivery.get('t3h'):
-                            print(f"   • Express: {delivery['t3h']}")
-                        if delivery.get('stp'):
-                            print(f"   • Store Pickup: {delivery['stp']}")
-                
-                if 'stores' in parsed_json and parsed_json['stores']:
-                    print(f"\n🏪 Stores Found ({len(parsed_json['stores'])}):")
-                    for i, store in enumerate(parsed_json['stores'], 1):
-                        print(f"\n{i}. 🏬 {store.get('store_name', 'N/A')}")
-                        print(f"   📍 {store.get('address', 'N/A')}, {store.get('city', 'N/A')} - {store.get('zipcode', 'N/A')}, {store.get('state', 'N/A')}")
-                        print(f"   🕒 {store.get('timing', 'N/A')}")
+                    print(f"📋 Key Specifications:")
+                    for spec in final_specs:
+                        if isinstance(spec, dict) and spec.get('fkey') and spec.get('fvalue'):
+                            print(f"   • {spec['fkey']}: {spec['fvalue']}")
                 
-                if 'end' in parsed_json and parsed_json['end']:
-                    print(f"\n❓ {parsed_json['end']}")
-                    
-            except json.JSONDecodeError as e:
-                print(f"\n🤖 Lotus Electronics Assistant:")
-                # Try to extract JSON from the response if it's wrapped in other text
-                try:
-                    # Look for JSON pattern in the response
-                    import re
-                    json_match = re.search(r'\{.*\}', response, re.DOTALL)
-                    if json_match:
-                        json_str = json_match.group(0)
-                        parsed_json = json.loads(json_str)
-                        print(f"💬 {parsed_json.get('answer', '')}")
-                        
-                        if 'products' in parsed_json and parsed_json['products']:
-                            print(f"\n📦 Products Found ({len(parsed_json['products'])}):")
-                            for i, product in enumerate(parsed_json['products'], 1):
-                                print(f"\n{i}. 🏷️ {product.get('product_name', 'N/A')}")
-                                print(f"   💰 Price: {product.get('product_mrp', 'N/A')}")
-                                if product.get('features'):
-                                    print(f"   ✨ Features: {', '.join(product['features'][:2])}")
-                        
-                        if 'product_details' in parsed_json and parsed_json['product_details']:
-                            details = parsed_json['product_details']
-                            print(f"\n🔍 Product Details:")
-                            print(f"📱 {details.get('product_name', 'N/A')}")
-                            print(f"💰 Price: ₹{details.get('product_mrp', 'N/A')}")
-                            if details.get('instock'):
-                                stock_status = "✅ In Stock" if details['instock'].lower() == 'yes' else "❌ Out of Stock"
-                                print(f"📦 Stock: {stock_status}")
-                            
-                            # Display key specifications
-                            if details.get('product_specification') and isinstance(details['product_specification'], list):
-                                specs = details['product_specification'][:5]  # Top 5 specs
-                                print(f"📋 Key Specifications:")
-                                for spec in specs:
-                                    if isinstance(spec, dict) and spec.get('fkey') and spec.get('fvalue'):
-                                        print(f"   • {spec['fkey']}: {spec['fvalue']}")
-                        
-                        if 'stores' in parsed_json and parsed_json['stores']:
-                            print(f"\n🏪 Stores Found ({len(parsed_json['stores'])}):")
-                            for i, store in enumerate(parsed_json['stores'], 1):
-                                print(f"\n{i}. 🏬 {store.get('store_name', 'N/A')}")
-                                print(f"   📍 {store.get('address', 'N/A')}")
-                        
-                        if 'end' in parsed_json and parsed_json['end']:
-                            print(f"\n❓ {parsed_json['end']}")
-                    else:
-                        # Fallback: display raw response
-                        print(response)
-                except:
-                    print(response)
+                if details.get('meta_desc'):
+                    desc = details['meta_desc'][:150] + "..." if len(details['meta_desc']) > 150 else details['meta_desc']
+                    print(f"📝 Description: {desc}")
                 
+                if details.get('del'):
+                    delivery = details['del']
+                    print(f"🚚 Delivery Options:")
+                    if delivery.get('std'):
+                        print(f"   • Standard: {delivery['std']}")
+                    if delivery.get('t3h'):
+                        print(f"   • Express: {delivery['t3h']}")
+                    if delivery.get('stp'):
+                        print(f"   • Store Pickup: {delivery['stp']}")
+            
+            if 'stores' in parsed_json and parsed_json['stores']:
+                print(f"\n🏪 Stores Found ({len(parsed_json['stores'])}):")
+                for i, store in enumerate(parsed_json['stores'], 1):
+                    print(f"\n{i}. 🏬 {store.get('store_name', 'N/A')}")
+                    print(f"   📍 {store.get('address', 'N/A')}, {store.get('city', 'N/A')} - {store.get('zipcode', 'N/A')}, {store.get('state', 'N/A')}")
+                    print(f"   🕒 {store.get('timing', 'N/A')}")
+            
+            if 'end' in parsed_json and parsed_json['end']:
+                print(f"\n❓ {parsed_json['end']}")
+
         except KeyboardInterrupt:
             print("\nThank you for visiting Lotus Electronics! Have a great day! 🙏")
             break
@@ -0,0 +1,167 @@
+"""
+Stage-level Prometheus metrics for the Lotus Electronics chatbot.
+Histograms and counters recorded from chat.py and the tools modules, exposed
+through the PrometheusMetrics instance of app_production.py (default registry).
+
+Under gunicorn set PROMETHEUS_MULTIPROC_DIR (gunicorn.conf.py does this) before
+the app is imported so every worker writes its samples to that directory and
+/metrics aggregates them.
+"""
+
+import time
+from contextlib import contextmanager
+
+try:
+    from prometheus_client import Counter, Histogram
+    PROMETHEUS_AVAILABLE = True
+except ImportError:
+    PROMETHEUS_AVAILABLE = False
+
+
+class _NoopMetric:
+    """Stand-in used when prometheus_client is not installed (e.g. main.py under uvicorn)."""
+
+    def labels(self, *args, **kwargs):
+        return self
+
+    def observe(self, amount):
+        pass
+
+    def inc(self, amount=1):
+        pass
+
+
+def _histogram(name, documentation, labelnames=(), buckets=None):
+    if not PROMETHEUS_AVAILABLE:
+        return _NoopMetric()
+    if buckets is None:
+        return Histogram(name, documentation, labelnames)
+    return Histogram(name, documentation, labelnames, buckets=buckets)
+
+
+def _counter(name, documentation, labelnames=()):
+    if not PROMETHEUS_AVAILABLE:
+        return _NoopMetric()
+    return Counter(name, documentation, labelnames)
+
+
+# Buckets tuned for network-bound stages (LLM, portal API) vs. in-process work
+SLOW_BUCKETS = (0.1, 0.25, 0.5, 1, 2, 3, 5, 8, 13, 20, 30, 60)
+FAST_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1)
+
+LLM_CALL_SECONDS = _histogram(
+    'lotus_llm_call_seconds', 'Latency of a single LLM call',
+    ['model', 'outcome'], buckets=SLOW_BUCKETS
+)
+LLM_TOKENS_TOTAL = _counter(
+    'lotus_llm_tokens_total', 'Tokens reported by the LLM usage metadata',
+    ['model', 'kind']
+)
+TOOL_CALL_SECONDS = _histogram(
+    'lotus_tool_call_seconds', 'Latency of an agent tool call',
+    ['tool', 'outcome'], buckets=SLOW_BUCKETS
+)
+EMBEDDING_SECONDS = _histogram(
+    'lotus_embedding_seconds', 'Time spent encoding a query embedding',
+    ['component'], buckets=FAST_BUCKETS
+)
+EMBEDDING_BATCH_SIZE = _histogram(
+    'lotus_embedding_batch_size', 'Distinct texts per micro-batched embedding encode',
+    buckets=(1, 2, 4, 8, 16, 32, 64)
+)
+# result: hit_local (worker LRU), hit_redis, miss (model ran), error (Redis failed)
+EMBEDDING_CACHE_TOTAL = _counter(
+    'lotus_embedding_cache_total', 'Query embedding cache lookups',
+    ['component', 'result']
+)
+PINECONE_QUERY_SECONDS = _histogram(
+    'lotus_pinecone_query_seconds', 'Latency of a vector index query (Pinecone, or index="local-*" for the in-process snapshot)',
+    ['index'], buckets=SLOW_BUCKETS
+)
+# path: exact (SKU/model number hit, no embedding or index query), hybrid (vector + BM25
+# fused), vector (no lexical index loaded)
+PRODUCT_SEARCH_TOTAL = _counter(
+    'lotus_product_search_total', 'Product searches by retrieval path',
+    ['path']
+)
+# result: hit, stale (served while refreshing in the background), miss, invalidated
+# (entries dropped because the catalog version changed)
+SEARCH_CACHE_TOTAL = _counter(
+    'lotus_search_cache_total', 'Product search result cache lookups',
+    ['result']
+)
+REDIS_OP_SECONDS = _histogram(
+    'lotus_redis_op_seconds', 'Latency of conversation memory Redis operations',
+    ['op'], buckets=FAST_BUCKETS
+)
+POSTPROCESS_SECONDS = _histogram(
+    'lotus_postprocess_seconds', 'Time spent parsing/repairing the final LLM response',
+    buckets=FAST_BUCKETS
+)
+GRAPH_ITERATIONS = _histogram(
+    'lotus_graph_iterations', 'Graph steps executed per chat request',
+    buckets=(1, 2, 3, 4, 5, 6, 8, 10, 15)
+)
+
+LLM_HOPS = _histogram(
+    'lotus_llm_hops', 'LLM calls per chat turn, by agent mode (plan-then-execute or tool loop)',
+    ['mode'], buckets=(1, 2, 3, 4, 5, 6, 8)
+)
+
+CHAT_CANCELLED_TOTAL = _counter(
+    'lotus_chat_cancelled_total', 'Chat turns stopped before completion (client gone or deadline passed)',
+    ['reason', 'stage']
+)
+
+SINGLEFLIGHT_TOTAL = _counter(
+    'lotus_singleflight_total', 'Single-flight outcomes: leader ran the work, followers shared it',
+    ['scope', 'role']
+)
+
+LLM_CACHE_TOTAL = _counter(
+    'lotus_llm_cache_total', 'Exact-match LLM response cache lookups',
+    ['result']
+)
+
+# outcome: structured (schema-valid AgentResponse call), schema_invalid (call args
+# failed validation and were coerced), extracted (JSON found in free text),
+# fallback (canned reply - the LLM round trip was wasted), empty (no final message)
+RESPONSE_PARSE_TOTAL = _counter(
+    'lotus_response_parse_total', 'How the final reply of a chat turn was obtained',
+    ['outcome']
+)
+
+
+@contextmanager
+def timed(histogram, **labels):
+    """
+    Observe the duration of the wrapped block on `histogram`, even if it raises.
+    An `outcome` label, when given, is switched to "error" on exception.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        if 'outcome' in labels:
+            labels['outcome'] = 'error'
+        raise
+    finally:
+        metric = histogram.labels(**labels) if labels else histogram
+        metric.observe(time.perf_counter() - start)
+
+
+def record_llm_usage(model_name: str, response) -> None:
+    """Count input/output tokens from an AIMessage's usage_metadata, if present."""
+    usage = getattr(response, 'usage_metadata', None) or {}
+    for kind in ('input_tokens', 'output_tokens'):
+        count = usage.get(kind)
+        if count:
+            LLM_TOKENS_TOTAL.labels(model=model_name, kind=kind.replace('_tokens', '')).inc(count)
+
+
+__all__ = [
+    'LLM_CALL_SECONDS', 'LLM_TOKENS_TOTAL', 'TOOL_CALL_SECONDS', 'EMBEDDING_SECONDS', 'EMBEDDING_CACHE_TOTAL',
+    'EMBEDDING_BATCH_SIZE',
+    'PINECONE_QUERY_SECONDS', 'PRODUCT_SEARCH_TOTAL', 'SEARCH_CACHE_TOTAL', 'REDIS_OP_SECONDS', 'POSTPROCESS_SECONDS', 'GRAPH_ITERATIONS',
+    'LLM_HOPS', 'CHAT_CANCELLED_TOTAL', 'SINGLEFLIGHT_TOTAL', 'RESPONSE_PARSE_TOTAL', 'LLM_CACHE_TOTAL', 'timed', 'record_llm_usage',
+]
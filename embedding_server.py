@@ -0,0 +1,79 @@
+"""
+Embedding sidecar: one all-MiniLM-L6-v2 per box instead of one per worker.
+The gunicorn/uvicorn workers set EMBEDDING_SIDECAR_URL and send their query
+embedding batches here (tools/embeddings.py SidecarEncoder), so only this
+process imports torch and holds the model. Requests from all workers land in
+one MicroBatcher, and its LRU of recent queries is shared by all of them too
+(the workers still check their own LRU and Redis first).
+
+Run (one process; the model is not fork-safe to share):
+    uvicorn embedding_server:app --uds /run/lotus/embed.sock --workers 1
+    python embedding_server.py --port 8090
+Workers:
+    export EMBEDDING_SIDECAR_URL="unix:/run/lotus/embed.sock"   # or http://127.0.0.1:8090
+
+API:
+    GET  /health  {"status", "model", "version", "variant", "dim"}
+    POST /embed   {"texts": [...]} -> raw little-endian float32 rows,
+                  header X-Embedding-Dim
+"""
+
+from typing import List
+
+from fastapi import FastAPI, HTTPException, Response
+from pydantic import BaseModel
+
+from tools.embeddings import (EMBEDDING_MODEL_NAME, EMBEDDING_MODEL_VERSION, Embedder, EmbeddingCache, cache_key,
+                              local_encoder)
+
+# Workers send micro-batches; anything far larger is a misbehaving client
+MAX_TEXTS_PER_REQUEST = 256
+
+# Always in-process here (never a client of itself; EMBEDDING_BACKEND picks torch or ONNX), no Redis
+# tier: the workers check Redis before calling
+encoder = local_encoder()
+embedder = Embedder(encoder=encoder,
+                    cache=EmbeddingCache(cache_key(EMBEDDING_MODEL_NAME, EMBEDDING_MODEL_VERSION, encoder.variant), None))
+EMBEDDING_DIM = int(embedder.encode_batch(["warm-up"]).shape[1])
+print(f"✅ Embedding sidecar ready: {EMBEDDING_MODEL_NAME}@{EMBEDDING_MODEL_VERSION} "
+      f"({encoder.variant}, {EMBEDDING_DIM} dims)")
+
+app = FastAPI(title="Lotus Embedding Sidecar", version="1.0.0")
+
+
+class EmbedRequest(BaseModel):
+    texts: List[str]
+
+
+@app.get("/health")
+def health():
+    return {"status": "healthy", "model": EMBEDDING_MODEL_NAME, "version": EMBEDDING_MODEL_VERSION,
+            "variant": embedder.encoder.variant, "dim": EMBEDDING_DIM}
+
+
+@app.post("/embed")
+def embed(request: EmbedRequest):
+    # Sync endpoint: runs in the threadpool, so concurrent requests meet in the batcher
+    if len(request.texts) > MAX_TEXTS_PER_REQUEST:
+        raise HTTPException(status_code=413, detail=f"at most {MAX_TEXTS_PER_REQUEST} texts per request")
+    if not request.texts:
+        return Response(content=b"", media_type="application/octet-stream",
+                        headers={"X-Embedding-Dim": str(EMBEDDING_DIM)})
+    vectors = embedder.encode_many(request.texts, component="sidecar")
+    return Response(content=vectors.astype("<f4").tobytes(), media_type="application/octet-stream",
+                    headers={"X-Embedding-Dim": str(vectors.shape[1])})
+
+
+if __name__ == "__main__":
+    import argparse
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Lotus embedding sidecar")
+    parser.add_argument("--uds", help="Unix socket path to listen on")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    args = parser.parse_args()
+    if args.uds:
+        uvicorn.run(app, uds=args.uds)
+    else:
+        uvicorn.run(app, host=args.host, port=args.port)
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Export the query embedding model to ONNX for EMBEDDING_BACKEND=onnx
+(see tools/onnx_encoder.py).
+
+Exports the transformer of the SentenceTransformer to model.onnx (dynamic batch
+and sequence axes), writes a dynamically int8-quantized model.int8.onnx, saves
+the fast tokenizer, and validates both graphs against the torch model: every
+validation query must reach a cosine similarity of at least --min-cosine
+(fp32) / --min-cosine-int8 with the torch embedding. The results go into
+manifest.json; OnnxEncoder refuses a variant that did not pass.
+
+Needs torch, sentence-transformers and onnxruntime. The workers that run the
+exported graph only need onnxruntime and tokenizers.
+
+Usage:
+    python export_onnx_embedding.py
+    python export_onnx_embedding.py --output /srv/lotus/onnx --min-cosine-int8 0.985
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+from tools.embeddings import EMBEDDING_MODEL_NAME, EMBEDDING_MODEL_VERSION
+from tools.onnx_encoder import FP32_FILE, INT8_FILE, MANIFEST_FILE, OnnxEncoder, default_onnx_path
+
+# Shopper and policy queries of the kind both search tools embed
+VALIDATION_QUERIES = [
+    "samsung smartphone", "samsung galaxy a36 5g 8gb ram 128gb", "iphone 15 pro max", "oneplus nord ce4 lite",
+    "5g phone with good camera under 20000", "gaming laptop with rtx graphics", "hp laptop for students",
+    "55 inch 4k smart tv", "oled television", "lg 1.5 ton 5 star split inverter air conditioner",
+    "double door refrigerator 253 litre", "front load washing machine 8 kg", "convection microwave oven",
+    "noise cancelling headphones", "bluetooth earbuds with long battery", "soundbar with subwoofer",
+    "smartwatch with heart rate monitor", "android tablet", "ro water purifier", "air cooler for large room",
+    "what is the return policy", "warranty terms for televisions", "how is my personal data used",
+    "refund conditions for damaged products", "delivery charges", "emi options on credit card",
+    "exchange offer on old phone", "store near me in indore", "a", "best value for money fridge",
+]
+
+
+def cosines(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    a = a / np.linalg.norm(a, axis=1, keepdims=True)
+    b = b / np.linalg.norm(b, axis=1, keepdims=True)
+    return (a * b).sum(axis=1)
+
+
+def export(model, output: str, opset: int) -> None:
+    import torch
+
+    transformer = model[0].auto_model.eval()
+    tokenizer = model.tokenizer
+    sample = tokenizer(["export sample", "a longer export sample sentence"], padding=True, return_tensors="pt")
+    input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample]
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+    with torch.no_grad():
+        torch.onnx.export(
+            transformer, tuple(sample[name] for name in input_names), os.path.join(output, FP32_FILE),
+            input_names=input_names, output_names=["last_hidden_state"], dynamic_axes=dynamic_axes,
+            opset_version=opset, do_constant_folding=True,
+        )
+    tokenizer.save_pretrained(output)
+
+
+def quantize(output: str) -> None:
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    quantize_dynamic(os.path.join(output, FP32_FILE), os.path.join(output, INT8_FILE), weight_type=QuantType.QInt8)
+
+
+def validate(output: str, reference: np.ndarray, variant: str, threshold: float, max_seq_length: int) -> dict:
+    encoder = OnnxEncoder(output, quantized=(variant == "int8"), max_seq_length=max_seq_length)
+    agreement = cosines(encoder.encode_batch(VALIDATION_QUERIES), reference)
+    graph = INT8_FILE if variant == "int8" else FP32_FILE
+    result = {
+        "threshold": threshold,
+        "min_cosine": round(float(agreement.min()), 6),
+        "mean_cosine": round(float(agreement.mean()), 6),
+        "worst_query": VALIDATION_QUERIES[int(agreement.argmin())],
+        "queries": len(VALIDATION_QUERIES),
+        "size_mb": round(os.path.getsize(os.path.join(output, graph)) / 1e6, 1),
+    }
+    result["passed"] = result["min_cosine"] >= threshold
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--output', default=default_onnx_path(EMBEDDING_MODEL_NAME), help='Model directory to write')
+    parser.add_argument('--opset', type=int, default=14, help='ONNX opset')
+    parser.add_argument('--min-cosine', type=float, default=0.9999, help='fp32 agreement threshold')
+    parser.add_argument('--min-cosine-int8', type=float, default=0.98, help='int8 agreement threshold')
+    args = parser.parse_args()
+
+    from sentence_transformers import SentenceTransformer
+
+    os.makedirs(args.output, exist_ok=True)
+    # A half-finished re-export must not keep the old "passed" results
+    manifest_path = os.path.join(args.output, MANIFEST_FILE)
+    if os.path.exists(manifest_path):
+        os.remove(manifest_path)
+    start = time.perf_counter()
+    model = SentenceTransformer(EMBEDDING_MODEL_NAME)
+    max_seq_length = int(model.max_seq_length)
+    reference = np.asarray(model.encode(VALIDATION_QUERIES), dtype=np.float32)
+
+    print(f"📦 Exporting {EMBEDDING_MODEL_NAME} to {args.output} ...")
+    export(model, args.output, args.opset)
+    quantize(args.output)
+
+    validation = {
+        "fp32": validate(args.output, reference, "fp32", args.min_cosine, max_seq_length),
+        "int8": validate(args.output, reference, "int8", args.min_cosine_int8, max_seq_length),
+    }
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump({"model": EMBEDDING_MODEL_NAME, "version": EMBEDDING_MODEL_VERSION,
+                   "max_seq_length": max_seq_length, "validation": validation}, f, indent=2)
+
+    for variant, result in validation.items():
+        status = "✅" if result["passed"] else "❌"
+        print(f"{status} {variant}: min cosine {result['min_cosine']} (threshold {result['threshold']}), "
+              f"mean {result['mean_cosine']}, {result['size_mb']} MB, worst: {result['worst_query']!r}")
+    print(f"⏱️  Done in {time.perf_counter() - start:.1f}s")
+    return 0 if all(result["passed"] for result in validation.values()) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
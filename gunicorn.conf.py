@@ -1,21 +1,38 @@
 # Gunicorn Configuration for Flask Application (WSGI)
 import multiprocessing
+import glob
 import os
 
+# Prometheus multiprocess mode - must be set before prometheus_client is imported. This file is
+# read by the master before any worker loads the app, and workers inherit the environment.
+# Samples left over from a previous run are dropped here: only the *.db sample files, so a
+# directory the operator pointed PROMETHEUS_MULTIPROC_DIR at is never wiped.
+prometheus_multiproc_dir = os.environ.setdefault(
+    "PROMETHEUS_MULTIPROC_DIR",
+    os.path.join("/dev/shm" if os.path.exists("/dev/shm") else "logs", "lotus-prometheus")
+)
+os.makedirs(prometheus_multiproc_dir, exist_ok=True)
+for stale_samples in glob.glob(os.path.join(prometheus_multiproc_dir, "*.db")):
+    os.remove(stale_samples)
+
 # Server socket
 bind = "0.0.0.0:8001"
 backlog = 2048
 
 # Worker processes - optimized for Flask
 workers = multiprocessing.cpu_count() * 2 + 1
-worker_class = "sync"  # Use sync workers for Flask (WSGI)
-worker_connections = 1000
+# gthread, not sync: a sync worker serving one request for longer than `timeout` is killed,
+# which cuts off every /chat/batch stream that runs past it. A gthread worker's heartbeat is
+# kept by its main loop, so only a wedged process is killed, and each worker still serves
+# other requests on its remaining threads while a batch streams.
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS", "4"))
 max_requests = 1000
 max_requests_jitter = 50
-preload = True  # Correct parameter name
 
 # Timeouts
-timeout = 30
+# Exported so the workers derive the chat turn deadline from it (cancellation.py)
+timeout = int(os.environ.setdefault("GUNICORN_TIMEOUT", "30"))
 keepalive = 5
 graceful_timeout = 30
 
@@ -44,6 +61,10 @@ worker_tmp_dir = "/dev/shm" if os.path.exists("/dev/shm") else None
 forwarded_allow_ips = "*"
 
 # Monitoring hooks
+def child_exit(server, worker):
+    from prometheus_flask_exporter.multiprocess import GunicornInternalPrometheusMetrics
+    GunicornInternalPrometheusMetrics.mark_process_dead_on_child_exit(worker.pid)
+
 def when_ready(server):
     server.log.info("Flask server is ready. Spawning workers")
 
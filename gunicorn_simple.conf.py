@@ -8,14 +8,16 @@ backlog = 2048
 
 # Worker processes
 workers = multiprocessing.cpu_count() * 2 + 1  # Dynamic based on CPU cores
-worker_class = "sync"  # Use sync if gevent not available, change to "gevent" if installed
-worker_connections = 1000
+# gthread keeps long streaming responses (/chat/batch) from tripping the worker timeout
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS", "4"))
 max_requests = 1000
 max_requests_jitter = 50
 preload_app = True
 
 # Worker timeout and keep-alive
-timeout = 30
+# Exported so the workers derive the chat turn deadline from it (cancellation.py)
+timeout = int(os.environ.setdefault("GUNICORN_TIMEOUT", "30"))
 keepalive = 5
 
 # Logging
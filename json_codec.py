@@ -0,0 +1,73 @@
+"""
+Compact JSON encoding for the HTTP edge.
+The chat core passes plain dicts around; only the web layers (app.py,
+app_production.py, main.py) turn them into bytes, once, through dumps() here.
+orjson is used when installed (encodes straight to UTF-8 bytes, several times
+faster than the stdlib); otherwise the stdlib encoder with compact separators.
+"""
+
+import json
+from typing import Any
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+if ORJSON_AVAILABLE:
+    _ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+    def dumps(obj: Any) -> bytes:
+        """Serialize to compact UTF-8 JSON bytes."""
+        return orjson.dumps(obj, default=str, option=_ORJSON_OPTIONS)
+
+    def loads(data) -> Any:
+        return orjson.loads(data)
+else:
+    _encoder = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'), default=str)
+
+    def dumps(obj: Any) -> bytes:
+        """Serialize to compact UTF-8 JSON bytes."""
+        return _encoder.encode(obj).encode('utf-8')
+
+    def loads(data) -> Any:
+        return json.loads(data)
+
+
+def dumps_line(obj: Any) -> bytes:
+    """One NDJSON line."""
+    return dumps(obj) + b'\n'
+
+
+try:
+    from flask.json.provider import JSONProvider
+
+    class CompactJSONProvider(JSONProvider):
+        """Flask JSON provider: jsonify() and request.get_json() go through this module."""
+
+        def dumps(self, obj: Any, **kwargs: Any) -> str:
+            return dumps(obj).decode('utf-8')
+
+        def loads(self, s, **kwargs: Any) -> Any:
+            return loads(s)
+
+        def response(self, *args: Any, **kwargs: Any):
+            obj = self._prepare_response_obj(args, kwargs)
+            return self._app.response_class(dumps(obj), mimetype='application/json')
+except ImportError:
+    CompactJSONProvider = None
+
+try:
+    from starlette.responses import JSONResponse
+
+    class CompactJSONResponse(JSONResponse):
+        """FastAPI/Starlette response class rendering with dumps()."""
+
+        def render(self, content: Any) -> bytes:
+            return dumps(content)
+except ImportError:
+    CompactJSONResponse = None
+
+
+__all__ = ['dumps', 'loads', 'dumps_line', 'CompactJSONProvider', 'CompactJSONResponse', 'ORJSON_AVAILABLE']
@@ -0,0 +1,88 @@
+"""
+Exact-match cache for LLM responses, for deterministic workloads such as
+regression replays and load tests. The key is a SHA-256 over the model name,
+the bound tool schemas and the serialized prompt messages; the value is the
+AIMessage serialized with messages_to_dict, so tool_calls replay unchanged.
+
+Opt-in (environment):
+    LLM_CACHE_ENABLED   "true" to enable (default: disabled)
+    LLM_CACHE_TTL       seconds a cached response lives (default: 86400)
+"""
+
+import hashlib
+import json
+import os
+from typing import Optional, Sequence
+
+import redis
+from langchain_core.messages import BaseMessage, messages_from_dict, messages_to_dict
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+import tracing
+from chat_metrics import LLM_CACHE_TOTAL, REDIS_OP_SECONDS, timed
+
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "false").lower() in ("1", "true", "yes")
+LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL", "86400"))
+
+# Per-message fields that differ between otherwise identical prompts
+# (LangGraph assigns fresh ids; usage and provider metadata vary per call)
+_VOLATILE_FIELDS = ("id", "usage_metadata", "response_metadata")
+
+
+def _stable_messages(messages: Sequence[BaseMessage]) -> list:
+    stable = []
+    for message in messages_to_dict(list(messages)):
+        data = {k: v for k, v in message["data"].items() if k not in _VOLATILE_FIELDS}
+        stable.append({"type": message["type"], "data": data})
+    return stable
+
+
+class LLMResponseCache:
+    """Redis-backed exact-match response cache; a disabled cache never hits and never stores."""
+
+    def __init__(self, redis_client: Optional[redis.Redis], model_name: str, tools: Sequence = (),
+                 ttl: int = LLM_CACHE_TTL, enabled: bool = LLM_CACHE_ENABLED):
+        self.redis_client = redis_client
+        self.ttl = ttl
+        self.enabled = enabled and redis_client is not None
+        # The tool schema is part of every key: changing a tool invalidates old entries
+        schema = json.dumps([convert_to_openai_tool(t) for t in tools], sort_keys=True, default=str)
+        self._prefix = f"{model_name}\n{hashlib.sha256(schema.encode('utf-8')).hexdigest()}\n"
+
+    def key(self, messages: Sequence[BaseMessage]) -> str:
+        payload = json.dumps(_stable_messages(messages), sort_keys=True, ensure_ascii=False, default=str)
+        digest = hashlib.sha256((self._prefix + payload).encode("utf-8")).hexdigest()
+        return f"llm_cache:{digest}"
+
+    def get(self, messages: Sequence[BaseMessage]) -> Optional[BaseMessage]:
+        """The cached response for this exact prompt, or None."""
+        if not self.enabled:
+            return None
+        try:
+            with timed(REDIS_OP_SECONDS, op='llm_cache_get'):
+                data = self.redis_client.get(self.key(messages))
+        except redis.RedisError as e:
+            LLM_CACHE_TOTAL.labels(result='error').inc()
+            tracing.event("llm_cache_error", error=str(e))
+            return None
+        if data is None:
+            LLM_CACHE_TOTAL.labels(result='miss').inc()
+            return None
+        LLM_CACHE_TOTAL.labels(result='hit').inc()
+        return messages_from_dict([json.loads(data)])[0]
+
+    def put(self, messages: Sequence[BaseMessage], response: BaseMessage) -> None:
+        """Store a response; token usage is dropped so replays don't count as spend."""
+        if not self.enabled:
+            return
+        stored = messages_to_dict([response])[0]
+        stored["data"].pop("usage_metadata", None)
+        try:
+            with timed(REDIS_OP_SECONDS, op='llm_cache_put'):
+                self.redis_client.setex(self.key(messages), self.ttl, json.dumps(stored, ensure_ascii=False))
+        except (redis.RedisError, TypeError, ValueError) as e:
+            LLM_CACHE_TOTAL.labels(result='error').inc()
+            tracing.event("llm_cache_error", error=str(e))
+
+
+__all__ = ['LLMResponseCache', 'LLM_CACHE_ENABLED', 'LLM_CACHE_TTL']
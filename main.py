@@ -1,16 +1,22 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from typing import Optional
-import json
+import asyncio
 import uuid
-from chat import chat_with_agent
+from chat import chat_with_agent_async
+from cancellation import CancelToken, CHAT_DEADLINE_SECONDS
+from json_codec import CompactJSONResponse
+
+# How often a running chat turn checks whether its client is still connected
+DISCONNECT_POLL_SECONDS = 0.5
 
 # Create FastAPI app
 app = FastAPI(
     title="Lotus Electronics Chatbot API",
     description="Official Lotus Electronics chatbot API for customer support and product search",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=CompactJSONResponse
 )
 
 # Add CORS middleware
@@ -54,8 +60,16 @@ async def health_check():
         version="1.0.0"
     )
 
+async def _cancel_on_disconnect(http_request: Request, task: asyncio.Task):
+    """Cancel the chat task when the client goes away (widget closed, nginx timeout)."""
+    while not task.done():
+        if await http_request.is_disconnected():
+            task.cancel()
+            return
+        await asyncio.sleep(DISCONNECT_POLL_SECONDS)
+
 @app.post("/chat", response_model=ChatResponse)
-async def chat_endpoint(request: ChatRequest):
+async def chat_endpoint(request: ChatRequest, http_request: Request):
     """
     Main chat endpoint for Lotus Electronics chatbot
     
@@ -73,18 +87,21 @@ async def chat_endpoint(request: ChatRequest):
         if not request.message or not request.message.strip():
             raise HTTPException(status_code=400, detail="Message cannot be empty")
         
-        # Get response from chatbot
-        bot_response = chat_with_agent(request.message.strip(), session_id)
-        
-        # Parse the JSON response
+        # Get response from chatbot (async graph - doesn't block the event loop);
+        # the turn is cancelled if the client disconnects or the deadline passes
+        task = asyncio.ensure_future(chat_with_agent_async(
+            request.message.strip(), session_id, CancelToken(CHAT_DEADLINE_SECONDS)
+        ))
+        watcher = asyncio.ensure_future(_cancel_on_disconnect(http_request, task))
         try:
-            response_data = json.loads(bot_response)
-        except json.JSONDecodeError:
-            # Fallback if response isn't valid JSON
-            response_data = {
-                "answer": bot_response,
-                "end": "How else can I help you with Lotus Electronics products?"
-            }
+            response_data = await task
+        except asyncio.CancelledError:
+            if not task.cancelled():
+                raise
+            # Nobody is left to read a response (nginx logs 499 for this)
+            return Response(status_code=499)
+        finally:
+            watcher.cancel()
         
         return ChatResponse(
             response=response_data,
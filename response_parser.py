@@ -0,0 +1,112 @@
+"""
+Tolerant single-pass parser for the agent's final LLM output.
+Finds the first balanced top-level JSON object in the text (ignoring code fences,
+leading prose and trailing text) with the C-accelerated json scanner, then unwraps
+the nesting patterns Gemini is known to produce:
+
+    {"data": {"answer": "{...json...}"}}      -> inner object
+    {"answer": "```json {...} ```"}           -> inner object
+    {"data": {...}} without response keys     -> data
+    {"product_details": {"output": "{'product_id': ...}"}} -> parsed dict
+"""
+
+import ast
+import json
+from typing import Any, Optional
+
+_decoder = json.JSONDecoder()
+
+# Guards against pathological self-nesting
+MAX_UNWRAP_DEPTH = 5
+
+
+def extract_json_object(text: str) -> Optional[dict]:
+    """
+    Return the first JSON object embedded in `text`, or None.
+    Decoding stops at the end of the balanced object, so fences and trailing
+    text cost nothing extra. After a failed decode the scan resumes past the
+    error position, so objects nested inside a broken (e.g. truncated) response
+    are never mistaken for the response itself.
+    """
+    if not text:
+        return None
+    start = text.find('{')
+    while start != -1:
+        try:
+            obj, _ = _decoder.raw_decode(text, start)
+            if isinstance(obj, dict):
+                return obj
+        except json.JSONDecodeError as e:
+            start = text.find('{', max(start + 1, e.pos))
+            continue
+        start = text.find('{', start + 1)
+    return None
+
+
+def _nested_object(value: Any) -> Optional[dict]:
+    """Parse a string field that itself holds a (possibly fenced) JSON object."""
+    if not isinstance(value, str):
+        return None
+    stripped = value.lstrip()
+    if not stripped.startswith(('{', '`')):
+        return None
+    return extract_json_object(stripped)
+
+
+def _parse_product_details_output(details: dict) -> dict:
+    """product_details.output is sometimes the tool's dict repr instead of an object."""
+    output = details.get('output')
+    if not isinstance(output, str):
+        return details
+    parsed = extract_json_object(output)
+    if parsed is not None:
+        return parsed
+    try:
+        parsed = ast.literal_eval(output)
+    except (ValueError, SyntaxError):
+        return details
+    return parsed if isinstance(parsed, dict) else details
+
+
+def unwrap_response(obj: dict) -> dict:
+    """Peel known wrapper layers off a parsed response object."""
+    for _ in range(MAX_UNWRAP_DEPTH):
+        data = obj.get('data')
+        if isinstance(data, dict):
+            inner = _nested_object(data.get('answer'))
+            obj = inner if inner is not None else data
+            continue
+
+        inner = _nested_object(obj.get('answer'))
+        if inner is not None:
+            obj = inner
+            continue
+        break
+
+    details = obj.get('product_details')
+    if isinstance(details, dict) and 'output' in details:
+        obj['product_details'] = _parse_product_details_output(details)
+    return obj
+
+
+def parse_agent_response(text: str) -> Optional[dict]:
+    """Extract and unwrap the response object from raw model output; None if there is none."""
+    obj = extract_json_object(text)
+    if obj is None:
+        return None
+    return unwrap_response(obj)
+
+
+def strip_code_fences(text: str) -> str:
+    """Model output without a surrounding ```json fence, for use as plain answer text."""
+    clean = text.strip()
+    if clean.startswith('```'):
+        clean = clean[3:]
+        if clean.startswith('json'):
+            clean = clean[4:]
+        if clean.rstrip().endswith('```'):
+            clean = clean.rstrip()[:-3]
+    return clean.strip()
+
+
+__all__ = ['extract_json_object', 'unwrap_response', 'parse_agent_response', 'strip_code_fences']
@@ -0,0 +1,91 @@
+"""
+Response schema for the agent's final answer.
+AgentResponse is bound to Gemini as a tool alongside the real tools (with
+tool_choice="any"), so the final step is a function call whose arguments are
+validated against this schema instead of free text that has to be repaired.
+The field layout mirrors the reply JSON the web clients render.
+"""
+
+from typing import List, Optional
+from pydantic import BaseModel, ConfigDict, Field
+
+
+class _Schema(BaseModel):
+    # Gemini sends ids, prices and zipcodes as numbers as often as strings
+    model_config = ConfigDict(coerce_numbers_to_str=True)
+
+
+class ProductCard(_Schema):
+    """A product from search_products results."""
+    product_id: str = Field(description="product_id from the search_products result")
+    product_name: str
+    product_mrp: str = Field(description="Price exactly as returned by search_products, e.g. '₹30,999'")
+    product_url: str = ""
+    product_image: str = ""
+    features: List[str] = Field(default_factory=list, description="Up to 4 short feature strings")
+
+
+class ProductSpec(_Schema):
+    fkey: str
+    fvalue: str
+
+
+class DeliveryOptions(_Schema):
+    std: Optional[str] = Field(default=None, description="Standard delivery")
+    t3h: Optional[str] = Field(default=None, description="Express delivery")
+    stp: Optional[str] = Field(default=None, description="Store pickup")
+
+
+class ProductDetails(_Schema):
+    """A single product from get_filtered_product_details results."""
+    product_id: str
+    product_name: str = ""
+    product_sku: str = ""
+    product_mrp: str = ""
+    product_url: str = ""
+    product_image: str = ""
+    instock: str = ""
+    product_specification: List[ProductSpec] = Field(default_factory=list)
+    meta_desc: str = ""
+    delivery: Optional[DeliveryOptions] = Field(default=None, description="The 'del' field of the tool result")
+
+
+class StoreInfo(_Schema):
+    """A store from get_near_store results."""
+    store_name: str
+    address: str = ""
+    city: str = ""
+    state: str = ""
+    zipcode: str = ""
+    timing: str = ""
+
+
+class AgentResponse(_Schema):
+    """Send the final reply to the customer. Call this exactly once, after any other tools, to finish the turn."""
+    answer: str = Field(description="Conversational reply only - no product, store or policy listings")
+    products: List[ProductCard] = Field(default_factory=list, description="Products to show, if search_products was used")
+    product_details: Optional[ProductDetails] = Field(default=None, description="The product, if get_filtered_product_details was used")
+    stores: List[StoreInfo] = Field(default_factory=list, description="Stores to show, if get_near_store was used")
+    end: str = Field(description="Follow-up question to continue the conversation")
+
+    def to_reply(self) -> dict:
+        """The reply dict in the shape the clients expect (see chat.ChatReply)."""
+        details = {}
+        if self.product_details is not None:
+            details = self.product_details.model_dump(exclude={"delivery"})
+            details["del"] = self.product_details.delivery.model_dump() if self.product_details.delivery else {}
+        return {
+            "answer": self.answer,
+            "products": [product.model_dump() for product in self.products],
+            "product_details": details,
+            "stores": [store.model_dump() for store in self.stores],
+            # Policy content is summarized in "answer" (see SYSTEM_PROMPT)
+            "policy_info": {},
+            "end": self.end,
+        }
+
+
+# Tool name the model calls to finish a turn
+RESPOND_TOOL = AgentResponse.__name__
+
+__all__ = ['AgentResponse', 'ProductCard', 'ProductDetails', 'StoreInfo', 'RESPOND_TOOL']
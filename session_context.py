@@ -0,0 +1,250 @@
+"""
+Per-session store of the products and stores shown so far.
+The products are the ones in the final reply, in the order the user saw them
+(recorded by chat._save_reply; the raw search_products output can hold more,
+or be ranked differently). call_tool records get_near_store and product-details
+results (id, name, city, position). Follow-up references such as
+"the second one", "that Samsung" or "the A36" are resolved locally - ordinals
+exactly, brands and model names with difflib fuzzy matching - and the result is
+handed to the LLM as one compact SESSION CONTEXT line, so it can call
+get_filtered_product_details with the right product_id without digging through
+earlier replies in the history.
+"""
+
+import difflib
+import json
+import re
+from typing import List, Optional
+
+import redis
+
+from chat_metrics import REDIS_OP_SECONDS, timed
+
+# Products kept from the latest reply that listed any (the ones the user can refer to)
+MAX_PRODUCTS = 10
+MAX_STORES = 10
+
+ORDINALS = {
+    "first": 1, "1st": 1, "second": 2, "2nd": 2, "third": 3, "3rd": 3,
+    "fourth": 4, "4th": 4, "fifth": 5, "5th": 5, "sixth": 6, "6th": 6,
+    "seventh": 7, "7th": 7, "eighth": 8, "8th": 8, "ninth": 9, "9th": 9,
+    "tenth": 10, "10th": 10, "last": -1,
+}
+_ORDINAL_RE = re.compile(r"\b(" + "|".join(ORDINALS) + r")\b")
+_NUMBERED_RE = re.compile(r"(?:\b(?:number|no\.?|option|product|item)\s*|#)(\d{1,2})\b")
+# Words that signal the user means something already shown rather than a new search
+_REFERENCE_RE = re.compile(
+    r"\b(that|this|it|those|these|the one|one|ones|more about|details?|specs?|specifications?|"
+    r"compare|warranty of|price of|stock|available|availability|buy)\b"
+)
+_WORD_RE = re.compile(r"[a-z0-9]+")
+# Name tokens too generic to identify a product
+_GENERIC_WORDS = {
+    "smartphone", "android", "mobile", "phone", "ram", "storage", "storagerom", "rom", "gb", "tb",
+    "inch", "cm", "led", "smart", "tv", "with", "and", "the", "for", "black", "white", "blue",
+    "laptop", "refrigerator", "door", "star", "split", "inverter", "ton", "litre", "litres",
+}
+_STORE_RE = re.compile(r"🏬 \*\*(?P<name>.+?)\*\*\n📍 (?P<location>.+?)\n🕒 (?P<timing>.*)")
+
+
+def _brand(product_name: str) -> str:
+    words = product_name.split()
+    return words[0].lower() if words else ""
+
+
+class SessionContext:
+    """Redis-backed product/store context per session (no-op without Redis)."""
+
+    def __init__(self, redis_client: Optional[redis.Redis], ttl_seconds: int = 1800):
+        self.redis_client = redis_client
+        self.ttl_seconds = ttl_seconds
+
+    def _key(self, session_id: str) -> str:
+        return f"session_context:{session_id}"
+
+    def get(self, session_id: str) -> dict:
+        if self.redis_client is None:
+            return {}
+        try:
+            with timed(REDIS_OP_SECONDS, op='context_get'):
+                data = self.redis_client.get(self._key(session_id))
+            return json.loads(data) if data else {}
+        except (redis.RedisError, ValueError) as e:
+            print(f"❌ Error loading session context for {session_id}: {e}")
+            return {}
+
+    def _save(self, session_id: str, context: dict):
+        try:
+            with timed(REDIS_OP_SECONDS, op='context_save'):
+                self.redis_client.setex(self._key(session_id), self.ttl_seconds, json.dumps(context, ensure_ascii=False))
+        except redis.RedisError as e:
+            print(f"❌ Error saving session context for {session_id}: {e}")
+
+    def clear(self, session_id: str):
+        if self.redis_client is not None:
+            try:
+                self.redis_client.delete(self._key(session_id))
+            except redis.RedisError:
+                pass
+
+    def record_reply(self, session_id: str, reply: dict) -> None:
+        """Remember the products of a final reply, in display order (called by chat._save_reply)."""
+        if self.redis_client is None or not isinstance(reply, dict):
+            return
+        products = _listed_products(reply)
+        if not products:
+            # A reply without products (details, stores, policy) leaves the last list referable
+            return
+        context = self.get(session_id)
+        context["products"] = products
+        self._save(session_id, context)
+
+    def record_tool_result(self, session_id: str, tool_name: str, args: dict, result) -> None:
+        """Update the session's context from one tool result (called by call_tool)."""
+        if self.redis_client is None:
+            return
+        if tool_name == "get_near_store":
+            stores = _stores_from_text(result)
+            if not stores:
+                return
+            context = self.get(session_id)
+            context["stores"] = stores
+        elif tool_name == "get_filtered_product_details":
+            if not isinstance(result, dict) or not result.get("product_id"):
+                return
+            context = self.get(session_id)
+            context["focus"] = {
+                "id": str(result["product_id"]),
+                "name": result.get("product_name") or "",
+            }
+        else:
+            return
+        self._save(session_id, context)
+
+    def resolve(self, context: dict, message: str) -> List[dict]:
+        """Products of `context` the message refers to (empty when it doesn't look like a reference)."""
+        products = context.get("products") or []
+        text = (message or "").lower()
+        if not products or not text:
+            return []
+
+        position = None
+        match = _ORDINAL_RE.search(text)
+        if match:
+            position = ORDINALS[match.group(1)]
+        else:
+            match = _NUMBERED_RE.search(text)
+            if match:
+                position = int(match.group(1))
+
+        candidates = products
+        words = [w for w in _WORD_RE.findall(text) if len(w) >= 2]
+
+        # Brand references, tolerant of typos ("samsng", "one plus")
+        brands = sorted({p["brand"] for p in products if p.get("brand")})
+        mentioned = set()
+        for word in words + [a + b for a, b in zip(words, words[1:])]:
+            mentioned.update(difflib.get_close_matches(word, brands, n=1, cutoff=0.8))
+        if mentioned:
+            candidates = [p for p in candidates if p.get("brand") in mentioned]
+
+        # Model-name references ("the a36", "galaxy s24")
+        model_hits = [p for p in candidates if self._name_score(p, words) >= 0.85]
+        if model_hits:
+            candidates = model_hits
+
+        if position is not None:
+            if position == -1:
+                return candidates[-1:]
+            if 1 <= position <= len(candidates):
+                return [candidates[position - 1]]
+            return []
+        if model_hits:
+            return model_hits
+        if not _REFERENCE_RE.search(text):
+            # "show me samsung tvs" is a new search, not a reference
+            return []
+        if mentioned:
+            return candidates
+        # A bare "it" / "that one": the product last looked at, if any
+        focus = context.get("focus")
+        return [p for p in products if focus and p["id"] == focus["id"]]
+
+    @staticmethod
+    def _name_score(product: dict, words: List[str]) -> float:
+        """Best fuzzy match between a message word and a distinctive word of the product name."""
+        name_tokens = [t for t in _WORD_RE.findall(product.get("name", "").lower())
+                       if t not in _GENERIC_WORDS and t != product.get("brand") and len(t) >= 2]
+        best = 0.0
+        for word in words:
+            # Short words only count when they look like a model number ("a36", "s24")
+            if word in _GENERIC_WORDS or (len(word) < 4 and not any(c.isdigit() for c in word)):
+                continue
+            for token in name_tokens:
+                best = max(best, difflib.SequenceMatcher(None, word, token).ratio())
+        return best
+
+    def prompt_line(self, session_id: str, message: str) -> str:
+        """Compact SESSION CONTEXT text for this turn's prompt ("" when nothing was shown yet)."""
+        context = self.get(session_id)
+        parts = []
+        products = context.get("products") or []
+        if products:
+            listed = "; ".join(f"{p['position']}. {p['name']} (id {p['id']}, {p['price']})" for p in products)
+            parts.append(f"Products shown: {listed}")
+        stores = context.get("stores") or []
+        if stores:
+            listed = "; ".join(f"{s['position']}. {s['name']} ({s['city']} {s['zipcode']})".rstrip() for s in stores)
+            parts.append(f"Stores shown: {listed}")
+        focus = context.get("focus")
+        if focus:
+            parts.append(f"Last product detailed: {focus['name']} (id {focus['id']})")
+        resolved = self.resolve(context, message)
+        if len(resolved) == 1:
+            p = resolved[0]
+            parts.append(f"The user is referring to #{p['position']} {p['name']} (product_id {p['id']})")
+        elif resolved:
+            listed = ", ".join(f"#{p['position']} {p['name']} (product_id {p['id']})" for p in resolved)
+            parts.append(f"The user may be referring to: {listed}")
+        return "\n".join(parts)
+
+
+def _listed_products(reply: dict) -> List[dict]:
+    products = []
+    for position, product in enumerate(reply.get("products") or [], 1):
+        if not isinstance(product, dict) or not product.get("product_id"):
+            continue
+        name = product.get("product_name") or ""
+        products.append({
+            "position": position,
+            "id": str(product["product_id"]),
+            "name": name,
+            "brand": _brand(name),
+            "price": product.get("product_mrp") or "",
+        })
+        if len(products) >= MAX_PRODUCTS:
+            break
+    return products
+
+
+def _stores_from_text(result) -> List[dict]:
+    """Parse get_near_store's formatted text ("🏬 **name**\\n📍 address, city - zip, state\\n🕒 timing")."""
+    if not isinstance(result, str):
+        return []
+    stores = []
+    for position, match in enumerate(_STORE_RE.finditer(result), 1):
+        location = match.group("location")
+        place, _, zip_state = location.rpartition(" - ")
+        city = place.rpartition(", ")[2] if place else ""
+        stores.append({
+            "position": position,
+            "name": match.group("name"),
+            "city": city,
+            "zipcode": zip_state.partition(", ")[0],
+        })
+        if len(stores) >= MAX_STORES:
+            break
+    return stores
+
+
+__all__ = ['SessionContext']
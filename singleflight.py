@@ -0,0 +1,275 @@
+"""
+Single-flight coalescing of duplicate in-flight work.
+A call made while an identical call (same key) is still running waits for that
+call's result instead of doing the work again. Within a process this is a shared
+future; across gunicorn workers the first caller takes a short-lived Redis lock
+and publishes its result to a Redis slot named after its lock token, which only
+the callers that found the lock held poll. A call made after the work finished
+runs it again: nothing is cached beyond the flight.
+"""
+
+import asyncio
+import json
+import threading
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Optional
+
+import redis
+
+import tracing
+from chat_metrics import SINGLEFLIGHT_TOTAL
+
+# set-if-absent attempts before giving up on coordination (the lock keeps being released
+# between our SET NX and GET)
+LOCK_ATTEMPTS = 3
+
+# Deletes the lock only if we still own it (it may have expired and been re-taken)
+_RELEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+class _Call:
+    """An in-process in-flight call that followers wait on."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Coalesce concurrent identical calls, in-process and across workers through Redis."""
+
+    def __init__(self, namespace: str, redis_client: Optional[redis.Redis] = None,
+                 lock_ttl: float = 60.0, result_ttl: float = 5.0, poll_interval: float = 0.05):
+        """
+        Args:
+            namespace: Key prefix and metric label, e.g. "chat" or "tool"
+            redis_client: Shared Redis client; None limits coalescing to this process
+            lock_ttl: Seconds a leader may hold the cross-worker lock (upper bound on the call)
+            result_ttl: Seconds a leader's published result stays readable for the followers
+                that were already waiting on it (calls arriving later run fn() themselves)
+            poll_interval: Seconds between result-slot polls by cross-worker followers
+        """
+        self.namespace = namespace
+        self.redis_client = redis_client
+        self.lock_ttl = lock_ttl
+        self.result_ttl = result_ttl
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._async_calls = {}
+        self._async_waiters = {}
+        self._release = redis_client.register_script(_RELEASE_SCRIPT) if redis_client is not None else None
+
+    def do(self, key: str, fn: Callable[[], Any],
+           serialize: Callable[[Any], Any] = json.dumps,
+           deserialize: Callable[[bytes], Any] = json.loads) -> Any:
+        """
+        Return fn(), sharing the result with identical calls running at the same time.
+
+        Args:
+            key: Identity of the call; equal keys are coalesced
+            fn: The work to run when this caller is the leader
+            serialize/deserialize: Encoding of the result for the Redis slot
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.done.wait()
+            SINGLEFLIGHT_TOTAL.labels(scope=self.namespace, role='local_follower').inc()
+            tracing.event("singleflight_shared", scope=self.namespace, source="local")
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = self._do_shared(key, fn, serialize, deserialize)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+    async def do_async(self, key: str, afn: Callable[[], Awaitable[Any]],
+                       serialize: Callable[[Any], Any] = json.dumps,
+                       deserialize: Callable[[bytes], Any] = json.loads) -> Any:
+        """
+        Async counterpart of do() for the event-loop front end: followers await
+        the leader's task, and Redis round trips run in the default executor.
+        """
+        task = self._async_calls.get(key)
+        if task is not None:
+            SINGLEFLIGHT_TOTAL.labels(scope=self.namespace, role='local_follower').inc()
+            tracing.event("singleflight_shared", scope=self.namespace, source="local")
+            return await self._await_shared(key, task)
+
+        task = asyncio.ensure_future(self._ado_shared(key, afn, serialize, deserialize))
+        self._async_calls[key] = task
+        task.add_done_callback(lambda done: self._forget_async(key, done))
+        return await self._await_shared(key, task)
+
+    def _forget_async(self, key: str, task: asyncio.Future) -> None:
+        # A newer call may already be registered under the key
+        if self._async_calls.get(key) is task:
+            del self._async_calls[key]
+
+    async def _await_shared(self, key: str, task: asyncio.Future) -> Any:
+        """
+        Await the shared task. A cancelled caller (e.g. its client disconnected)
+        doesn't cancel the work the other callers still wait for; once the last
+        caller is gone, the task is cancelled too.
+        """
+        self._async_waiters[key] = self._async_waiters.get(key, 0) + 1
+        try:
+            return await asyncio.shield(task)
+        finally:
+            waiters = self._async_waiters.pop(key) - 1
+            if waiters:
+                self._async_waiters[key] = waiters
+            elif not task.done():
+                # New callers start a fresh call instead of joining the cancelled one
+                self._forget_async(key, task)
+                task.cancel()
+
+    def _keys(self, key: str):
+        return f"singleflight:{self.namespace}:lock:{key}", f"singleflight:{self.namespace}:result:{key}:"
+
+    @staticmethod
+    def _token(value) -> str:
+        return value.decode() if isinstance(value, bytes) else value
+
+    def _acquire(self, lock_key: str, token: str):
+        """(True, token) if this caller now leads, else (False, token of the flight in progress)."""
+        for _ in range(LOCK_ATTEMPTS):
+            if self.redis_client.set(lock_key, token, nx=True, px=int(self.lock_ttl * 1000)):
+                return True, token
+            leader = self.redis_client.get(lock_key)
+            if leader is not None:
+                return False, self._token(leader)
+            # Released between the two calls: try to take it again
+        return False, None
+
+    async def _ado_shared(self, key, afn, serialize, deserialize):
+        """Leader path of do_async; same Redis protocol as _do_shared."""
+        if self.redis_client is None:
+            SINGLEFLIGHT_TOTAL.labels(scope=self.namespace, role='leader').inc()
+            return await afn()
+
+        lock_key, result_prefix = self._keys(key)
+        token = uuid.uuid4().hex
+        try:
+            acquired, leader = await asyncio.to_thread(self._acquire, lock_key, token)
+        except redis.RedisError:
+            acquired, leader = False, None
+
+        if acquired:
+            SINGLEFLIGHT_TOTAL.labels(scope=self.namespace, role='leader').inc()
+            try:
+                result = await afn()
+                try:
+                    await asyncio.to_thread(
+                        self.redis_client.set, result_prefix + token, serialize(result), px=int(self.result_ttl * 1000)
+                    )
+                except (redis.RedisError, TypeError, ValueError):
+                    pass
+                return result
+            finally:
+                try:
+                    await asyncio.to_thread(self._release, keys=[lock_key], args=[token])
+                except redis.RedisError:
+                    pass
+
+        deadline = time.monotonic() + self.lock_ttl
+        try:
+            while leader is not None and time.monotonic() < deadline:
+                cached = await asyncio.to_thread(self.redis_client.get, result_prefix + leader)
+                if cached is not None:
+                    SINGLEFLIGHT_TOTAL.labels(scope=self.namespace, role='remote_follower').inc()
+                    tracing.event("singleflight_shared", scope=self.namespace, source="redis")
+                    return deserialize(cached)
+                current = await asyncio.to_thread(self.redis_client.get, lock_key)
+                if current is None or self._token(current) != leader:
+                    cached = await asyncio.to_thread(self.redis_client.get, result_prefix + leader)
+                    if cached is not None:
+                        SINGLEFLIGHT_TOTAL.labels(scope=self.namespace, role='remote_follower').inc()
+                        return deserialize(cached)
+                    break
+                await asyncio.sleep(self.poll_interval)
+        except redis.RedisError:
+            pass
+        SINGLEFLIGHT_TOTAL.labels(scope=self.namespace, role='fallback').inc()
+        return await afn()
+
+    def _do_shared(self, key, fn, serialize, deserialize):
+        """
+        Leader path: coordinate with other workers through Redis when available.
+        The leader publishes its result under its own lock token, and only callers
+        that found that lock held read it: a call arriving after the flight ended
+        becomes a new leader and runs fn() (this is coalescing, not a result cache).
+        """
+        if self.redis_client is None:
+            SINGLEFLIGHT_TOTAL.labels(scope=self.namespace, role='leader').inc()
+            return fn()
+
+        lock_key, result_prefix = self._keys(key)
+        token = uuid.uuid4().hex
+        try:
+            acquired, leader = self._acquire(lock_key, token)
+        except redis.RedisError:
+            acquired, leader = False, None
+
+        if acquired:
+            SINGLEFLIGHT_TOTAL.labels(scope=self.namespace, role='leader').inc()
+            try:
+                result = fn()
+                try:
+                    # Readable just long enough for the followers already polling
+                    self.redis_client.set(result_prefix + token, serialize(result), px=int(self.result_ttl * 1000))
+                except (redis.RedisError, TypeError, ValueError):
+                    pass
+                return result
+            finally:
+                try:
+                    self._release(keys=[lock_key], args=[token])
+                except redis.RedisError:
+                    pass
+
+        # Another worker is running it - wait for that flight's result slot
+        deadline = time.monotonic() + self.lock_ttl
+        try:
+            while leader is not None and time.monotonic() < deadline:
+                cached = self.redis_client.get(result_prefix + leader)
+                if cached is not None:
+                    SINGLEFLIGHT_TOTAL.labels(scope=self.namespace, role='remote_follower').inc()
+                    tracing.event("singleflight_shared", scope=self.namespace, source="redis")
+                    return deserialize(cached)
+                current = self.redis_client.get(lock_key)
+                if current is None or self._token(current) != leader:
+                    # Leader is done; it publishes before releasing, so look once more
+                    cached = self.redis_client.get(result_prefix + leader)
+                    if cached is not None:
+                        SINGLEFLIGHT_TOTAL.labels(scope=self.namespace, role='remote_follower').inc()
+                        return deserialize(cached)
+                    # Finished without publishing (error or unserializable result)
+                    break
+                time.sleep(self.poll_interval)
+        except redis.RedisError:
+            pass
+        SINGLEFLIGHT_TOTAL.labels(scope=self.namespace, role='fallback').inc()
+        return fn()
+
+
+__all__ = ['SingleFlight']
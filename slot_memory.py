@@ -0,0 +1,181 @@
+"""
+Deterministic slot memory: budget, brand, category and city per session.
+Each user message is run through a rule-based extractor (no LLM): budgets like
+"25k", "1.5 lakh", "under 40000" or "between 20k and 30k", brands and categories
+(parsed by tools/query_normalizer.py), and cities from the store database.
+Only messages about shopping fill slots: "I want to return my ac" or "what is
+your return policy in pune" are about an order or a policy, not a wish for an
+air conditioner or stock in Pune, unless they also ask to buy something. The
+merged slots live in Redis, are shown to the LLM as one short line and fill in
+missing tool arguments (price_min / price_max / city), so the preference
+survives turns that have scrolled out of the replayed history.
+"""
+
+import json
+import os
+import re
+import sqlite3
+from typing import Dict, Optional
+
+import redis
+
+from chat_metrics import REDIS_OP_SECONDS, timed
+from tools.query_normalizer import find_brand, find_category, parse_budget
+
+# Major cities beyond the store cities (product stock/delivery is checked per city)
+_EXTRA_CITIES = [
+    "Delhi", "New Delhi", "Mumbai", "Pune", "Bangalore", "Bengaluru", "Hyderabad", "Chennai", "Kolkata",
+    "Ahmedabad", "Surat", "Lucknow", "Kanpur", "Gwalior", "Sagar", "Ratlam", "Dewas", "Khandwa", "Korba",
+]
+
+
+def _load_cities() -> Dict[str, str]:
+    cities = {}
+    try:
+        conn = sqlite3.connect(os.path.join(os.path.dirname(os.path.abspath(__file__)), "tools", "lotus_stores.db"))
+        try:
+            for (city,) in conn.execute("SELECT DISTINCT city FROM stores"):
+                if city:
+                    cities[city.strip().lower()] = city.strip()
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        print(f"⚠️  Store cities unavailable for slot extraction: {e}")
+    for city in _EXTRA_CITIES:
+        cities.setdefault(city.lower(), city)
+    return cities
+
+
+CITIES = _load_cities()
+_CITY_RE = re.compile(r"\b(" + "|".join(re.escape(c) for c in sorted(CITIES, key=len, reverse=True)) + r")\b")
+
+# After-sales and policy questions name products and cities without wanting to buy them
+_SERVICE_RE = re.compile(
+    r"\b(?:return(?:s|ed|ing)?|refund(?:s|ed)?|replace(?:ment|d)?|exchange|repair(?:s|ed)?|servic(?:e|ing)|"
+    r"complaint|policy|policies|cancel(?:led|lation)?|invoice|my order|not working|not cooling|broken|defective)\b"
+)
+# ...unless the message also asks to buy or see products
+_SHOPPING_RE = re.compile(
+    r"\b(?:buy|purchase|looking for|show|suggest|recommend|compare|price|cost|budget|under|below|best|"
+    r"new one|latest|deals?|offers?|emi|in stock|available|availability)\b"
+)
+
+
+def has_product_intent(text: str) -> bool:
+    """Whether a lower-cased message is about buying, not an order, a repair or a policy."""
+    return not _SERVICE_RE.search(text) or bool(_SHOPPING_RE.search(text))
+
+
+def extract_slots(message: str) -> dict:
+    """Slots stated in one message: price_min, price_max, brand, category, city ({} without product intent)."""
+    text = (message or "").lower()
+    if not has_product_intent(text):
+        return {}
+    slots = dict(parse_budget(text))
+    brand = find_brand(text)
+    if brand:
+        slots["brand"] = brand
+    category = find_category(text)
+    if category:
+        slots["category"] = category
+    match = _CITY_RE.search(text)
+    if match:
+        slots["city"] = CITIES[match.group(1)]
+    return slots
+
+
+def merge_slots(current: dict, update: dict) -> dict:
+    """New values win; switching category drops the budget and brand that belonged to the old one."""
+    merged = dict(current)
+    if update.get("category") and current.get("category") and update["category"] != current["category"]:
+        for key in ("price_min", "price_max", "brand"):
+            merged.pop(key, None)
+    if "price_min" in update or "price_max" in update:
+        # A newly stated budget replaces the whole range
+        merged.pop("price_min", None)
+        merged.pop("price_max", None)
+    merged.update(update)
+    return merged
+
+
+def format_slots(slots: dict) -> str:
+    """One-line summary for the prompt, e.g. 'category=smartphone; brand=Samsung; budget=₹20,000-₹30,000'."""
+    parts = []
+    for key in ("category", "brand"):
+        if slots.get(key):
+            parts.append(f"{key}={slots[key]}")
+    low, high = slots.get("price_min"), slots.get("price_max")
+    if low is not None and high is not None:
+        parts.append(f"budget=₹{low:,.0f}-₹{high:,.0f}")
+    elif high is not None:
+        parts.append(f"budget=up to ₹{high:,.0f}")
+    elif low is not None:
+        parts.append(f"budget=from ₹{low:,.0f}")
+    if slots.get("city"):
+        parts.append(f"city={slots['city']}")
+    return "; ".join(parts)
+
+
+def apply_slot_defaults(tool_call: dict, slots: dict) -> dict:
+    """Copy of `tool_call` with arguments the LLM left out filled in from the slots."""
+    if not slots:
+        return tool_call
+    args = dict(tool_call.get("args") or {})
+    name = tool_call.get("name")
+    if name == "search_products":
+        # Only a budget the LLM didn't state itself; a partial range from the LLM is kept as is
+        if args.get("price_min") is None and args.get("price_max") is None:
+            for key in ("price_min", "price_max"):
+                if slots.get(key) is not None:
+                    args[key] = slots[key]
+    elif name == "get_near_store":
+        if not args.get("city") and not args.get("zipcode") and slots.get("city"):
+            args["city"] = slots["city"]
+    elif name == "get_filtered_product_details":
+        if not args.get("city") and slots.get("city"):
+            args["city"] = slots["city"].upper()
+    else:
+        return tool_call
+    if args == tool_call.get("args"):
+        return tool_call
+    return {**tool_call, "args": args}
+
+
+class SlotMemory:
+    """Per-session slot record in Redis (no-op without Redis)."""
+
+    def __init__(self, redis_client: Optional[redis.Redis], ttl_seconds: int = 1800):
+        self.redis_client = redis_client
+        self.ttl_seconds = ttl_seconds
+
+    def _key(self, session_id: str) -> str:
+        return f"slots:{session_id}"
+
+    def get(self, session_id: str) -> dict:
+        if self.redis_client is None:
+            return {}
+        try:
+            with timed(REDIS_OP_SECONDS, op='slots_get'):
+                data = self.redis_client.get(self._key(session_id))
+            return json.loads(data) if data else {}
+        except (redis.RedisError, ValueError) as e:
+            print(f"❌ Error loading slots for {session_id}: {e}")
+            return {}
+
+    def update(self, session_id: str, message: str) -> dict:
+        """Extract slots from the user's message, merge them into the record and return the result."""
+        current = self.get(session_id)
+        extracted = extract_slots(message)
+        if not extracted:
+            return current
+        merged = merge_slots(current, extracted)
+        if self.redis_client is not None and merged != current:
+            try:
+                with timed(REDIS_OP_SECONDS, op='slots_save'):
+                    self.redis_client.setex(self._key(session_id), self.ttl_seconds, json.dumps(merged, ensure_ascii=False))
+            except redis.RedisError as e:
+                print(f"❌ Error saving slots for {session_id}: {e}")
+        return merged
+
+
+__all__ = ['SlotMemory', 'extract_slots', 'has_product_intent', 'merge_slots', 'format_slots', 'apply_slot_defaults']
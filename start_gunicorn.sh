@@ -25,7 +25,8 @@ lsof -ti:8001 | xargs kill -9 2>/dev/null || true
 gunicorn app:app \
   --bind 0.0.0.0:8001 \
   --workers $WORKERS \
-  --worker-class sync \
+  --worker-class gthread \
+  --threads ${GUNICORN_THREADS:-4} \
   --max-requests 1000 \
   --max-requests-jitter 100 \
   --timeout 30 \
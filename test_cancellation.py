@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Test turn cancellation for Lotus Electronics Chatbot
+A turn whose deadline passes during the Gemini call, or whose client
+disconnects, ends with the cancelled reply instead of an error reply.
+"""
+
+import asyncio
+import os
+import sys
+import time
+import uuid
+
+import pytest
+
+# Add the current directory to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import cancellation
+from cancellation import CancelToken
+
+chat = pytest.importorskip("chat", reason="chat dependencies (Gemini, Pinecone) not installed")
+
+CANCELLED_ANSWER = "Sorry, this is taking longer than expected. Please try again in a moment."
+
+
+class FakeModel:
+    """Stands in for the bound Gemini model; on_call decides how the request ends."""
+
+    def __init__(self, on_call):
+        self.on_call = on_call
+        self.timeouts = []
+
+    def invoke(self, messages, config=None, **kwargs):
+        self.timeouts.append(kwargs.get("timeout"))
+        return self.on_call(config, kwargs.get("timeout"))
+
+    async def ainvoke(self, messages, config=None, **kwargs):
+        return await asyncio.to_thread(self.invoke, messages, config, **kwargs)
+
+
+def _times_out(config, timeout):
+    """The HTTP client gives up when the request timeout (the turn's deadline) passes."""
+    time.sleep(timeout)
+    raise TimeoutError("Gemini request timed out")
+
+
+def _client_disconnects(config, timeout):
+    cancellation.from_config(config).cancel(cancellation.CLIENT_DISCONNECT)
+    raise ConnectionError("request aborted")
+
+
+def _with_model(fake, run):
+    """Run a turn against fake; returns the reply and the stages cancelled turns stopped at."""
+    saved = chat.model, chat.final_model, chat._cancelled_response
+    stages = []
+
+    def cancelled_response(e):
+        stages.append(e.stage)
+        return saved[2](e)
+
+    chat.model = chat.final_model = fake
+    chat._cancelled_response = cancelled_response
+    try:
+        return run(), stages
+    finally:
+        chat.model, chat.final_model, chat._cancelled_response = saved
+
+
+def _session():
+    return f"test-cancel-{uuid.uuid4().hex}"
+
+
+def test_deadline_during_llm_call():
+    """The Gemini call is bounded by the deadline and the turn ends cancelled"""
+    fake = FakeModel(_times_out)
+    reply, stages = _with_model(fake, lambda: chat.chat_with_agent(
+        "show me samsung phones", _session(), CancelToken(0.3)))
+    assert reply["answer"] == CANCELLED_ANSWER
+    assert stages == ["llm"]
+    assert fake.timeouts and 0 < fake.timeouts[0] <= 0.3
+    print("✅ Deadline during the LLM call cancels the turn")
+
+
+def test_client_disconnect_during_llm_call():
+    """An LLM error after the client disconnected ends the turn cancelled"""
+    reply, stages = _with_model(FakeModel(_client_disconnects), lambda: chat.chat_with_agent(
+        "show me samsung phones", _session(), CancelToken(30)))
+    assert reply["answer"] == CANCELLED_ANSWER
+    assert stages == ["llm"]
+    print("✅ Client disconnect during the LLM call cancels the turn")
+
+
+def test_llm_error_without_cancellation():
+    """An LLM error of a live turn is still answered with the error reply"""
+    def fails(config, timeout):
+        raise ConnectionError("Gemini unavailable")
+
+    reply, stages = _with_model(FakeModel(fails), lambda: chat.chat_with_agent(
+        "show me samsung phones", _session(), CancelToken(30)))
+    assert reply["answer"] != CANCELLED_ANSWER and stages == []
+    print("✅ LLM errors of live turns are not reported as cancelled")
+
+
+def test_async_client_disconnect_during_llm_call():
+    """chat_with_agent_async ends cancelled when the client disconnects during the Gemini call"""
+    reply, stages = _with_model(FakeModel(_client_disconnects), lambda: asyncio.run(chat.chat_with_agent_async(
+        "show me samsung phones", _session(), CancelToken(30))))
+    assert reply["answer"] == CANCELLED_ANSWER
+    assert stages == ["llm"]
+    print("✅ Async client disconnect during the LLM call cancels the turn")
+
+
+if __name__ == "__main__":
+    print("🏪 Lotus Electronics - Cancellation Test Suite")
+    print("=" * 60)
+
+    test_deadline_during_llm_call()
+    test_client_disconnect_during_llm_call()
+    test_llm_error_without_cancellation()
+    test_async_client_disconnect_during_llm_call()
+
+    print("\n🎉 Cancellation tests completed!")
@@ -46,12 +46,14 @@ def test_chat_with_agent():
             
             try:
                 # Call the function
-                response = chat_with_agent(test_case['message'], test_case['session_id'])
+                parsed_response = chat_with_agent(test_case['message'], test_case['session_id'])
                 
-                # Validate JSON response
-                parsed_response = json.loads(response)
+                # Validate response structure
+                if not isinstance(parsed_response, dict):
+                    print(f"❌ Expected a dict, got {type(parsed_response).__name__}")
+                    continue
                 
-                print("✅ JSON Response Valid!")
+                print("✅ Response Valid!")
                 print(f"📄 Answer: {parsed_response.get('answer', 'N/A')[:100]}...")
                 
                 if 'products' in parsed_response:
@@ -63,10 +65,6 @@ def test_chat_with_agent():
                 
                 print("✅ Test passed!")
                 
-            except json.JSONDecodeError as e:
-                print(f"❌ JSON Parse Error: {e}")
-                print(f"Raw response: {response[:200]}...")
-                
             except Exception as e:
                 print(f"❌ Function Error: {e}")
         
@@ -100,8 +98,7 @@ def test_flask_endpoint_simulation():
         print(f"   Session ID: {payload['session_id']}")
         
         # Process the request
-        ai_reply = chat_with_agent(payload["message"], payload["session_id"])
-        data = json.loads(ai_reply)
+        data = chat_with_agent(payload["message"], payload["session_id"])
         
         # Format Flask response
         response = {
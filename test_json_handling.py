@@ -7,11 +7,12 @@ This script tests different response formats and JSON parsing.
 import json
 import sys
 import os
-import re
 
 # Add the current directory to Python path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
+from response_parser import parse_agent_response, strip_code_fences
+
 def test_json_cleaning():
     """Test JSON cleaning functionality"""
     print("🧪 Testing JSON Cleaning and Parsing")
@@ -40,37 +41,20 @@ def test_json_cleaning():
         print(f"Input: {response[:50]}...")
         
         try:
-            # Clean the response
-            clean_response = response.strip()
-            if clean_response.startswith('```json'):
-                clean_response = clean_response.replace('```json', '').replace('```', '').strip()
-            
-            # Try to parse directly
-            try:
-                parsed_json = json.loads(clean_response)
-                print("✅ Direct JSON parse successful")
+            parsed_json = parse_agent_response(response)
+            if parsed_json is not None:
+                print("✅ JSON extraction successful")
                 print(f"Answer: {parsed_json.get('answer', 'N/A')}")
-            except json.JSONDecodeError:
-                # Try regex extraction
-                json_match = re.search(r'\{.*\}', clean_response, re.DOTALL)
-                if json_match:
-                    try:
-                        extracted_json = json_match.group(0)
-                        parsed_json = json.loads(extracted_json)
-                        print("✅ Regex extraction successful")
-                        print(f"Answer: {parsed_json.get('answer', 'N/A')}")
-                    except:
-                        print("❌ Regex extraction failed")
-                        # Fallback
-                        fallback_response = {
-                            "answer": clean_response,
-                            "end": "Is there anything else I can help you with?"
-                        }
-                        print("✅ Fallback JSON created")
-                        print(f"Answer: {fallback_response['answer'][:50]}...")
-                else:
-                    print("❌ No JSON pattern found")
-                    
+            else:
+                print("❌ No JSON object found")
+                # Fallback
+                fallback_response = {
+                    "answer": strip_code_fences(response),
+                    "end": "Is there anything else I can help you with?"
+                }
+                print("✅ Fallback JSON created")
+                print(f"Answer: {fallback_response['answer'][:50]}...")
+
         except Exception as e:
             print(f"❌ Error: {e}")
 
@@ -83,17 +67,16 @@ def test_chat_function():
         from chat import chat_with_agent
         
         # Test simple greeting
-        response = chat_with_agent("Hello", "test_json_session")
-        print(f"Raw response: {response[:100]}...")
+        parsed = chat_with_agent("Hello", "test_json_session")
+        print(f"Raw response: {json.dumps(parsed, ensure_ascii=False)[:100]}...")
         
-        # Parse and display
-        try:
-            parsed = json.loads(response)
-            print("✅ JSON parsing successful")
+        # Display
+        if isinstance(parsed, dict):
+            print("✅ Structured reply received")
             print(f"Answer: {parsed.get('answer', 'N/A')}")
             print(f"End: {parsed.get('end', 'N/A')}")
-        except json.JSONDecodeError as e:
-            print(f"❌ JSON parsing failed: {e}")
+        else:
+            print(f"❌ Expected a dict, got {type(parsed).__name__}")
             
     except Exception as e:
         print(f"❌ Function test failed: {e}")
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Test the lexical product index for Lotus Electronics Chatbot
+Tokenization of model numbers, exact SKU/model lookup, BM25 ranking with
+price bounds, and reciprocal-rank fusion ordering.
+"""
+
+import os
+import sys
+
+import numpy as np
+
+# Add the current directory to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from tools.lexical_index import LexicalIndex, is_model_token, reciprocal_rank_fusion, tokenize
+
+NAMES = [
+    "Samsung Galaxy A36 5G 8GB RAM 128GB Awesome Lavender",
+    "Samsung Galaxy A36 5G 8GB RAM 256GB Awesome Black",
+    "Sony WH-CH720N Wireless Noise Cancelling Headphones",
+    "Sony WH-1000XM5 Wireless Headphones",
+    "LG 55 inch 4K Smart TV 55UR7500",
+]
+SKUS = ["A366EJ", "A366EK", "", "WH1000XM5", ""]
+PRICES = np.array([30999.0, 33999.0, 9990.0, 29990.0, float("nan")])
+
+
+def _index():
+    texts = [f"{name} {sku}" if sku else name for name, sku in zip(NAMES, SKUS)]
+    return LexicalIndex(texts, SKUS, PRICES)
+
+
+def test_tokenize():
+    """Punctuated model numbers also yield their joined form"""
+    assert tokenize("Sony WH-CH720N") == ["sony", "wh", "ch720n", "whch720n"]
+    assert tokenize("1.5 Ton") == ["1", "5", "ton"]
+    assert is_model_token("a366ej") and is_model_token("ch720n")
+    for token in ("8gb", "55inch", "samsung", "12345", "4k"):
+        assert not is_model_token(token), token
+    print("✅ Tokens and model numbers")
+
+
+def test_exact_lookup():
+    """A SKU or model number finds its product however it is punctuated"""
+    index = _index()
+    assert index.exact("A366EJ") == [0]
+    assert index.exact("a366-ek price") == [1]
+    assert index.exact("sony wh ch720n") == [2]
+    assert index.exact("whch720n") == [2]
+    assert index.exact("WH-1000XM5") == [3]
+    assert index.exact("55UR7500 tv") == [4]
+    # A family name or a size is not an exact match
+    assert index.exact("galaxy a36") == []
+    assert index.exact("8gb ram phone") == []
+    print("✅ Exact SKU/model lookup")
+
+
+def test_bm25_search():
+    """BM25 ranks rarer matching tokens higher and honours price bounds"""
+    index = _index()
+    rows = [row for row, _ in index.search("sony wireless headphones", top_k=5)]
+    assert set(rows[:2]) == {2, 3}
+    assert all(score > 0 for _, score in index.search("samsung", top_k=5))
+    assert [row for row, _ in index.search("awesome black", top_k=5)][0] == 1
+
+    rows = [row for row, _ in index.search("samsung galaxy", top_k=5, price_max=32000)]
+    assert rows == [0]
+    # Unpriced products drop out of any price-bounded search
+    assert 4 not in [row for row, _ in index.search("lg smart tv", top_k=5, price_min=1)]
+    assert index.search("nothing matches this", top_k=5) == []
+    assert index.search("samsung", top_k=0) == []
+    print("✅ BM25 search with price bounds")
+
+
+def test_reciprocal_rank_fusion():
+    """Keys ranked in both lists beat keys ranked in one; equal scores keep first-seen order"""
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["c", "b", "d"]], k=60)
+    scores = dict(fused)
+    assert scores["b"] == 2 / 62
+    assert scores["a"] == 1 / 61 and scores["d"] == 1 / 63
+    assert scores["c"] == 1 / 63 + 1 / 61
+    assert [key for key, _ in fused] == ["c", "b", "a", "d"]
+    assert [key for key, _ in reciprocal_rank_fusion([["x", "y"], ["y", "x"]])] == ["x", "y"]
+    print("✅ Reciprocal-rank fusion ordering")
+
+
+if __name__ == "__main__":
+    print("🏪 Lotus Electronics - Lexical Index Test Suite")
+    print("=" * 60)
+
+    test_tokenize()
+    test_exact_lookup()
+    test_bm25_search()
+    test_reciprocal_rank_fusion()
+
+    print("\n🎉 Lexical index tests completed!")
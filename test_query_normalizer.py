@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Test query normalization and slot extraction for Lotus Electronics Chatbot
+Budget parsing (cues, ranges, bare amounts, sizes that are not prices) and the
+brand/category/city slots, including messages with no product intent.
+"""
+
+import os
+import sys
+
+# Add the current directory to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from tools.query_normalizer import add_catalog_brands, find_brand, normalize_query, parse_budget, parse_price
+from slot_memory import extract_slots, merge_slots
+
+
+def test_amounts():
+    """Amount spellings in rupees"""
+    cases = {
+        "25000": 25000, "25,000": 25000, "₹25k": 25000, "25 thousand": 25000,
+        "1.5 lakh": 150000, "2 lac": 200000, "1.2L": 120000, "1 crore": 10_000_000,
+        "s24": None, "55": None, "250l": None,
+    }
+    for text, expected in cases.items():
+        assert parse_price(text) == expected, (text, parse_price(text))
+    print("✅ Amounts parsed")
+
+
+def test_budget_cues():
+    """Maximum, minimum, range and around budgets"""
+    assert parse_budget("tv under 40k") == {"price_max": 40000}
+    assert parse_budget("30000 or less") == {"price_max": 30000}
+    assert parse_budget("laptop above 50k") == {"price_min": 50000}
+    assert parse_budget("phone between 20k and 30k") == {"price_min": 20000, "price_max": 30000}
+    assert parse_budget("20 to 30k") == {"price_min": 20000, "price_max": 30000}
+    assert parse_budget("around 30k") == {"price_min": 25500, "price_max": 34500}
+    print("✅ Budget cues parsed")
+
+
+def test_bare_amounts():
+    """An amount without a cue is a budget only when it is clearly money"""
+    assert parse_budget("1.5 lakh laptop") == {"price_max": 150000}
+    assert parse_budget("samsung 25k phone") == {"price_max": 25000}
+    assert parse_budget("₹30,000 tv") == {"price_max": 30000}
+    assert parse_budget("rs 25000 fridge") == {"price_max": 25000}
+    for text in ("4k tv", "8k tv samsung", "5000 mah phone", "55 inch tv", "250l fridge", "s24 ultra"):
+        assert parse_budget(text) == {}, text
+    print("✅ Bare amounts parsed, sizes ignored")
+
+
+def test_normalize_query():
+    """Semantic text and filters of a search query"""
+    normalized = normalize_query("show me samsung fridge under 30k")
+    assert normalized["query"] == "samsung refrigerator"
+    assert normalized["price_max"] == 30000 and normalized["price_min"] is None
+    assert normalized["brand"] == "Samsung"
+    assert normalized["category"] == "refrigerator"
+
+    normalized = normalize_query("1.5 lakh laptop")
+    assert normalized["query"] == "laptop"
+    assert normalized["price_max"] == 150000
+    print("✅ Queries normalized")
+
+
+def test_catalog_brands():
+    """Brands learned from catalog product names"""
+    names = ["Zorvex 1.5 Ton Split AC"] * 3 + ["Qwikly Kettle"] * 2 + ["Smart LED TV 43 inch"] * 5
+    assert add_catalog_brands(names) == 1
+    assert find_brand("zorvex ac under 40k") == "Zorvex"
+    # Too few products, or a word that is not a brand
+    assert find_brand("qwikly kettle") is None
+    assert find_brand("smart tv") is None
+    # Curated aliases are kept
+    assert find_brand("redmi note 13") == "Xiaomi"
+    print("✅ Catalog brands learned")
+
+
+def test_slots():
+    """Slots of a shopping message"""
+    slots = extract_slots("samsung ac under 40k in pune")
+    assert slots == {"price_max": 40000, "brand": "Samsung", "category": "air conditioner", "city": "Pune"}
+    assert extract_slots("1.5 lakh laptop") == {"price_max": 150000, "category": "laptop"}
+    print("✅ Slots extracted")
+
+
+def test_slots_need_product_intent():
+    """Returns, repairs and policy questions fill no slots"""
+    assert extract_slots("I want to return my ac") == {}
+    assert extract_slots("what is your return policy in pune") == {}
+    assert extract_slots("my fridge is not cooling") == {}
+    # ...unless the message also asks to buy something
+    assert extract_slots("I want to return my ac and buy a new one under 40k") == {
+        "price_max": 40000, "category": "air conditioner"}
+    print("✅ Slots need product intent")
+
+
+def test_merge_slots():
+    """A new category drops the old budget and brand"""
+    current = {"category": "smartphone", "brand": "Samsung", "price_max": 30000, "city": "Pune"}
+    assert merge_slots(current, {"category": "laptop"}) == {"category": "laptop", "city": "Pune"}
+    assert merge_slots(current, {"price_min": 20000}) == {
+        "category": "smartphone", "brand": "Samsung", "price_min": 20000, "city": "Pune"}
+    print("✅ Slots merged")
+
+
+if __name__ == "__main__":
+    print("🏪 Lotus Electronics - Query Normalizer Test Suite")
+    print("=" * 60)
+
+    test_amounts()
+    test_budget_cues()
+    test_bare_amounts()
+    test_normalize_query()
+    test_catalog_brands()
+    test_slots()
+    test_slots_need_product_intent()
+    test_merge_slots()
+
+    print("\n🎉 Query normalizer tests completed!")
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Test the product search result cache for Lotus Electronics Chatbot
+Cache keys, fresh hits, stale-while-revalidate refreshes, expiry, LRU
+eviction and invalidation when the catalog version changes.
+"""
+
+import os
+import sys
+import threading
+import time
+
+# Add the current directory to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from tools.search_cache import SearchResultCache, search_key
+
+
+class Counter:
+    """compute() for the cache that counts its calls."""
+
+    def __init__(self, cacheable=True, delay=0.0):
+        self.calls = 0
+        self.cacheable = cacheable
+        self.delay = delay
+        self.finished = threading.Event()
+
+    def __call__(self):
+        self.calls += 1
+        time.sleep(self.delay)
+        self.finished.set()
+        return f"result {self.calls}", self.cacheable
+
+
+def test_search_key():
+    """Wording, case and rupee fractions don't split entries; filters do"""
+    assert search_key("Samsung  AC", 5, None, 50000.4) == search_key("samsung ac", 5, None, 50000)
+    assert search_key("samsung ac", 5, None, 50000) != search_key("samsung ac", 5, None, 40000)
+    assert search_key("samsung ac", 5, None, None, "Samsung") != search_key("samsung ac", 5, None, None)
+    assert search_key("samsung ac", 5, None, None) != search_key("samsung ac", 10, None, None)
+    print("✅ Cache keys")
+
+
+def test_fresh_hit_and_expiry():
+    """Fresh entries are served; entries past the stale window are recomputed in the request"""
+    cache = SearchResultCache(max_entries=10, ttl=0.1, stale_seconds=0)
+    compute = Counter()
+    assert cache.get_or_compute("k", compute, "v1") == "result 1"
+    assert cache.get_or_compute("k", compute, "v1") == "result 1"
+    assert compute.calls == 1
+    time.sleep(0.15)
+    assert cache.get_or_compute("k", compute, "v1") == "result 2"
+    print("✅ Fresh hits and expiry")
+
+
+def test_stale_while_revalidate():
+    """A stale entry is returned at once and refreshed in the background, once"""
+    cache = SearchResultCache(max_entries=10, ttl=0.05, stale_seconds=5)
+    compute = Counter()
+    cache.get_or_compute("k", compute, "v1")
+    time.sleep(0.1)
+
+    slow = Counter(delay=0.1)
+    slow.calls = 1
+    assert cache.get_or_compute("k", slow, "v1") == "result 1"
+    assert cache.get_or_compute("k", slow, "v1") == "result 1"   # refresh already running
+    assert slow.finished.wait(1)
+    time.sleep(0.05)
+    assert slow.calls == 2
+    assert cache.get_or_compute("k", slow, "v1") == "result 2"
+    print("✅ Stale-while-revalidate")
+
+
+def test_not_cacheable_and_disabled():
+    """Empty results are not stored; a zero-size cache always computes"""
+    cache = SearchResultCache(max_entries=10, ttl=60, stale_seconds=0)
+    compute = Counter(cacheable=False)
+    cache.get_or_compute("k", compute, "v1")
+    cache.get_or_compute("k", compute, "v1")
+    assert compute.calls == 2 and len(cache) == 0
+
+    disabled = SearchResultCache(max_entries=0)
+    compute = Counter()
+    disabled.get_or_compute("k", compute, "v1")
+    disabled.get_or_compute("k", compute, "v1")
+    assert compute.calls == 2
+    print("✅ Uncacheable results and disabled cache")
+
+
+def test_lru_eviction():
+    """The least recently used entry goes first"""
+    cache = SearchResultCache(max_entries=2, ttl=60, stale_seconds=0)
+    for key in ("a", "b"):
+        cache.get_or_compute(key, Counter(), "v1")
+    cache.get_or_compute("a", Counter(), "v1")   # a is now the most recent
+    cache.get_or_compute("c", Counter(), "v1")
+    compute = Counter()
+    cache.get_or_compute("a", compute, "v1")
+    assert compute.calls == 0
+    cache.get_or_compute("b", compute, "v1")
+    assert compute.calls == 1
+    print("✅ LRU eviction")
+
+
+def test_version_invalidation():
+    """A new catalog version drops every entry"""
+    cache = SearchResultCache(max_entries=10, ttl=60, stale_seconds=0)
+    compute = Counter()
+    cache.get_or_compute("a", compute, "v1")
+    cache.get_or_compute("b", compute, "v1")
+    assert len(cache) == 2
+    assert cache.get_or_compute("a", compute, "v2") == "result 3"
+    assert len(cache) == 1 and cache.version == "v2"
+    print("✅ Version invalidation")
+
+
+def test_stale_refresh_after_version_change():
+    """A refresh that finishes after the catalog changed does not store old-catalog results"""
+    cache = SearchResultCache(max_entries=10, ttl=0.05, stale_seconds=5)
+    cache.get_or_compute("k", Counter(), "v1")
+    time.sleep(0.1)
+
+    slow = Counter(delay=0.1)
+    assert cache.get_or_compute("k", slow, "v1") == "result 1"   # starts the refresh
+    cache.set_version("v2")
+    assert slow.finished.wait(1)
+    time.sleep(0.05)
+    assert len(cache) == 0
+    compute = Counter()
+    assert cache.get_or_compute("k", compute, "v2") == "result 1" and compute.calls == 1
+    print("✅ Stale refresh dropped after a version change")
+
+
+if __name__ == "__main__":
+    print("🏪 Lotus Electronics - Search Cache Test Suite")
+    print("=" * 60)
+
+    test_search_key()
+    test_fresh_hit_and_expiry()
+    test_stale_while_revalidate()
+    test_not_cacheable_and_disabled()
+    test_lru_eviction()
+    test_version_invalidation()
+    test_stale_refresh_after_version_change()
+
+    print("\n🎉 Search cache tests completed!")
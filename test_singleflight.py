@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Test single-flight coalescing for Lotus Electronics Chatbot
+Leader/follower sharing in-process and across workers (two SingleFlight
+instances on one fakeredis server), and that nothing outlives the flight.
+"""
+
+import asyncio
+import os
+import sys
+import threading
+import time
+
+import fakeredis
+
+# Add the current directory to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from singleflight import SingleFlight
+
+
+def _workers(result_ttl=5.0):
+    """Two flights sharing one Redis, as two gunicorn workers would."""
+    server = fakeredis.FakeServer()
+    return (SingleFlight("test", fakeredis.FakeRedis(server=server), result_ttl=result_ttl, poll_interval=0.01),
+            SingleFlight("test", fakeredis.FakeRedis(server=server), result_ttl=result_ttl, poll_interval=0.01))
+
+
+def _slow(calls, seconds=0.2):
+    def fn():
+        calls.append(1)
+        time.sleep(seconds)
+        return {"run": len(calls)}
+    return fn
+
+
+def _run_concurrently(flights, key, fn):
+    results = [None] * len(flights)
+
+    def call(i):
+        results[i] = flights[i].do(key, fn)
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(len(flights))]
+    for i, thread in enumerate(threads):
+        thread.start()
+        if i == 0:
+            time.sleep(0.05)   # let the first caller become the leader
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_local_followers_share_result():
+    """Concurrent calls in one process run fn once"""
+    flight = SingleFlight("test")
+    calls = []
+    results = _run_concurrently([flight] * 4, "k", _slow(calls))
+    assert len(calls) == 1
+    assert results == [{"run": 1}] * 4
+    print("✅ Local followers share the leader's result")
+
+
+def test_remote_follower_shares_result():
+    """A second worker calling while the first runs shares its result through Redis"""
+    first, second = _workers()
+    calls = []
+    results = _run_concurrently([first, second], "k", _slow(calls))
+    assert len(calls) == 1
+    assert results == [{"run": 1}, {"run": 1}]
+    print("✅ Remote follower shares the leader's result")
+
+
+def test_sequential_calls_rerun():
+    """A call after the flight finished runs fn again, even within result_ttl"""
+    first, second = _workers(result_ttl=60)
+    calls = []
+    fn = _slow(calls, 0)
+    assert first.do("k", fn) == {"run": 1}
+    assert first.do("k", fn) == {"run": 2}
+    assert second.do("k", fn) == {"run": 3}
+    print("✅ Finished flights are not reused")
+
+
+def test_lock_released_and_slot_expires():
+    """The leader releases its lock and its result slot expires after result_ttl"""
+    first, _ = _workers(result_ttl=0.1)
+    first.do("k", lambda: 1)
+    client = first.redis_client
+    assert client.get("singleflight:test:lock:k") is None
+    assert client.keys("singleflight:test:result:k:*")
+    time.sleep(0.2)
+    assert not client.keys("singleflight:test:result:k:*")
+    print("✅ Lock released, result slot expires")
+
+
+def _capture(flight, fn):
+    try:
+        flight.do("k", fn)
+    except Exception as e:
+        return e
+
+
+def test_follower_falls_back_when_leader_fails():
+    """A follower whose leader failed without publishing runs fn itself"""
+    first, second = _workers()
+
+    def failing():
+        time.sleep(0.1)
+        raise RuntimeError("boom")
+
+    errors = []
+    thread = threading.Thread(target=lambda: errors.append(_capture(first, failing)))
+    thread.start()
+    time.sleep(0.05)
+    assert second.do("k", lambda: "fallback") == "fallback"
+    thread.join()
+    assert isinstance(errors[0], RuntimeError)
+    print("✅ Follower falls back when the leader fails")
+
+
+def test_async_remote_follower_and_rerun():
+    """do_async: a concurrent caller on another worker shares, a later one reruns"""
+    first, second = _workers()
+    calls = []
+
+    async def afn():
+        calls.append(1)
+        await asyncio.sleep(0.1)
+        return len(calls)
+
+    async def main():
+        leader = asyncio.create_task(first.do_async("k", afn))
+        await asyncio.sleep(0.03)
+        follower = await second.do_async("k", afn)
+        return await leader, follower, await second.do_async("k", afn)
+
+    assert asyncio.run(main()) == (1, 1, 2)
+    print("✅ Async follower shares, later call reruns")
+
+
+if __name__ == "__main__":
+    print("🏪 Lotus Electronics - Single-Flight Test Suite")
+    print("=" * 60)
+
+    test_local_followers_share_result()
+    test_remote_follower_shares_result()
+    test_sequential_calls_rerun()
+    test_lock_released_and_slot_expires()
+    test_follower_falls_back_when_leader_fails()
+    test_async_remote_follower_and_rerun()
+
+    print("\n🎉 Single-flight tests completed!")
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Test the catalog snapshot and local vector index for Lotus Electronics Chatbot
+Snapshot round trip (vectors, prices, string and display columns), checksum
+rejection of a corrupted file, and exact search with Pinecone price filters.
+"""
+
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+# Add the current directory to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from tools.vector_index import CatalogSnapshot, LocalVectorIndex, save_snapshot
+
+PRODUCTS = [
+    {"product_id": "39721", "product_name": "Samsung Galaxy A36 5G", "price": "30999", "sku": "A366EJ",
+     "url": "smartphones/samsung-galaxy-a36", "image_url": "https://img/a36.jpg",
+     "text": "Samsung Galaxy A36 | Display: 6.7 inch | Battery: 5000 mAh"},
+    {"product_id": "40110", "product_name": "Sony WH-CH720N Wireless Headphones", "price": 9990,
+     "url": "headphones/sony-wh-ch720n", "image_url": "", "text": "Noise Cancelling | 35 Hours Battery"},
+    {"product_id": "41002", "product_name": "LG 55 inch 4K Smart TV", "price_num": 54990.0, "price": "₹54,990",
+     "url": "tv/lg-55", "image_url": "", "text": ""},
+    {"product_id": "41003", "product_name": "Demo unit", "price": "", "url": "", "image_url": "", "text": ""},
+]
+
+
+def _write(dtype="float16"):
+    path = os.path.join(tempfile.mkdtemp(), "catalog.snap")
+    vectors = np.random.default_rng(0).standard_normal((len(PRODUCTS), 16)).astype(np.float32)
+    checksum = save_snapshot(path, [f"p{i}" for i in range(len(PRODUCTS))], vectors, PRODUCTS, dtype=dtype)
+    return path, vectors, checksum
+
+
+def test_round_trip():
+    """Columns, prices and display fields read back as written"""
+    for dtype in ("float16", "int8"):
+        path, vectors, checksum = _write(dtype)
+        snapshot = CatalogSnapshot(path)
+        assert snapshot.checksum == checksum
+        assert len(snapshot) == len(PRODUCTS) and snapshot.dims == 16 and snapshot.dtype == dtype
+        assert snapshot.string("id", 1) == "p1"
+        assert snapshot.string("product_name", 0) == "Samsung Galaxy A36 5G"
+
+        metadata = snapshot.metadata(0)
+        assert metadata["sku"] == "A366EJ" and metadata["price"] == 30999.0
+        assert metadata["product_mrp"] == "₹30,999"
+        assert metadata["product_url"].endswith("/smartphones/samsung-galaxy-a36/39721")
+        assert "sku" not in snapshot.metadata(1)
+        # price_num wins over the display string; no price is NaN and left out of the metadata
+        assert snapshot.prices[2] == 54990.0
+        assert np.isnan(snapshot.prices[3]) and "price" not in snapshot.metadata(3)
+
+        # Stored vectors are normalized and close to the originals
+        expected = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+        assert np.allclose(snapshot.dense_vectors(), expected, atol=0.02)
+        snapshot.close()
+    print("✅ Snapshot round trip (float16 and int8)")
+
+
+def test_checksum_rejection():
+    """A corrupted or truncated file is refused"""
+    path, _, _ = _write()
+    # Flip one byte of the last section (the file still parses, only the checksum tells)
+    with open(path, "r+b") as f:
+        f.seek(-1, os.SEEK_END)
+        byte = f.read(1)
+        f.seek(-1, os.SEEK_END)
+        f.write(bytes([byte[0] ^ 0xFF]))
+    for verify, should_fail in ((True, True), (False, False)):
+        try:
+            CatalogSnapshot(path, verify=verify).close()
+            failed = False
+        except ValueError as e:
+            assert "checksum mismatch" in str(e)
+            failed = True
+        assert failed == should_fail
+
+    with open(path, "r+b") as f:
+        f.truncate(10)
+    try:
+        CatalogSnapshot(path)
+        assert False, "truncated snapshot accepted"
+    except ValueError as e:
+        assert "truncated" in str(e)
+    print("✅ Corrupted and truncated snapshots rejected")
+
+
+def test_exact_query_and_price_filter():
+    """Nearest product first; price filters restrict the candidates before ranking"""
+    path, vectors, _ = _write()
+    index = LocalVectorIndex.load(path, use_hnsw=False)
+    assert index.backend == "exact" and index.supports_filter
+    assert index.version == index.snapshot.checksum
+
+    response = index.query(vectors[1], top_k=2, include_metadata=True)
+    assert response.matches[0].id == "p1"
+    assert response.matches[0].score > 0.99
+    assert response.matches[0].metadata["product_name"].startswith("Sony")
+    assert index.query(vectors[1], top_k=2).matches[0].metadata is None
+
+    in_range = index.query(vectors[1], top_k=10, filter={"price_num": {"$gte": 20000, "$lte": 60000}})
+    assert sorted(match.id for match in in_range.matches) == ["p0", "p2"]
+    # Unpriced products never match a filter
+    assert "p3" not in [m.id for m in index.query(vectors[3], top_k=10, filter={"price_num": {"$gt": 0}}).matches]
+    try:
+        index.query(vectors[0], filter={"price_num": {"$ne": 1}})
+        assert False, "unsupported operator accepted"
+    except ValueError:
+        pass
+    print("✅ Exact query with price filters")
+
+
+if __name__ == "__main__":
+    print("🏪 Lotus Electronics - Vector Index Test Suite")
+    print("=" * 60)
+
+    test_round_trip()
+    test_checksum_rejection()
+    test_exact_query_and_price_filter()
+
+    print("\n🎉 Vector index tests completed!")
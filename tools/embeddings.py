@@ -0,0 +1,429 @@
+"""
+Query embeddings for the search tools, with a two-tier cache and micro-batching.
+ProductSearchTool and TermsConditionsSearchTool share one SentenceTransformer
+per process (get_embedder) and encode search queries through it. Popular
+queries repeat a lot, so every encode first looks in a per-worker LRU, then in
+Redis (raw float32 bytes, shared by all workers), and only then runs the model.
+
+Cache misses go through a MicroBatcher: a background thread collects the texts
+concurrent requests (threaded workers, tool calls run in parallel, the async
+app's executor) submit within EMBED_BATCH_MAX_WAIT_MS, up to
+EMBED_BATCH_MAX_ITEMS, encodes them in one model call and resolves each
+caller's future. The window is only waited for while requests overlap (the
+previous batch had several texts, or more are already queued), so a lone
+request on an idle worker is encoded right away.
+
+With EMBEDDING_SIDECAR_URL set, the model runs once per box in
+embedding_server.py instead of in every worker: batches are sent to it over a
+Unix socket or local HTTP, and the workers never import torch. If the sidecar
+is down at startup, or serves a different model, or fails later, the worker
+loads the model in-process and carries on.
+
+Keys are the normalized query text (lower case, single spaces; the default
+model is uncased, so this is also the text it encodes) under a prefix
+with the model name, EMBEDDING_MODEL_VERSION and the backend (torch,
+onnx-fp32, onnx-int8), so switching or retraining the model never serves
+stale vectors. Redis errors fall through to the model; after
+one the Redis tier is skipped for REDIS_RETRY_SECONDS so a dead Redis doesn't
+add a timeout to every query.
+
+Configuration (environment):
+    EMBEDDING_MODEL_NAME     SentenceTransformer model (default: all-MiniLM-L6-v2)
+    EMBEDDING_MODEL_VERSION  bump when the model's weights change (default: 1)
+    EMBEDDING_BACKEND        "torch" (default) or "onnx" (tools/onnx_encoder.py, no torch import)
+    EMBED_CACHE_SIZE         entries in the per-worker LRU (default: 2048, 0 disables)
+    EMBED_CACHE_TTL          seconds an embedding lives in Redis (default: 604800, 0 disables Redis)
+    EMBED_BATCH_MAX_ITEMS    texts per batched encode (default: 32)
+    EMBED_BATCH_MAX_WAIT_MS  how long a batch waits for more texts (default: 2, 0 disables batching)
+    EMBEDDING_SIDECAR_URL    "unix:/run/lotus/embed.sock" or "http://127.0.0.1:8090" (default: none, in-process)
+    EMBEDDING_SIDECAR_TIMEOUT  seconds per sidecar request (default: 2)
+    REDIS_HOST / REDIS_PORT / REDIS_DB
+"""
+
+import hashlib
+import os
+import queue
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Callable, List, Optional
+
+import httpx
+import numpy as np
+import redis
+
+from chat_metrics import EMBEDDING_BATCH_SIZE, EMBEDDING_CACHE_TOTAL, EMBEDDING_SECONDS, REDIS_OP_SECONDS, timed
+
+EMBEDDING_MODEL_NAME = os.getenv("EMBEDDING_MODEL_NAME", "all-MiniLM-L6-v2")
+EMBEDDING_MODEL_VERSION = os.getenv("EMBEDDING_MODEL_VERSION", "1")
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch").lower()
+EMBED_CACHE_SIZE = int(os.getenv("EMBED_CACHE_SIZE", "2048"))
+EMBED_CACHE_TTL = int(os.getenv("EMBED_CACHE_TTL", "604800"))
+EMBED_BATCH_MAX_ITEMS = int(os.getenv("EMBED_BATCH_MAX_ITEMS", "32"))
+EMBED_BATCH_MAX_WAIT_MS = float(os.getenv("EMBED_BATCH_MAX_WAIT_MS", "2"))
+EMBEDDING_SIDECAR_URL = os.getenv("EMBEDDING_SIDECAR_URL", "")
+EMBEDDING_SIDECAR_TIMEOUT = float(os.getenv("EMBEDDING_SIDECAR_TIMEOUT", "2"))
+
+# A cache lookup must stay well below the ~10 ms an encode costs
+REDIS_TIMEOUT_SECONDS = 0.05
+REDIS_RETRY_SECONDS = 30
+
+_SPACE_RE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """Cache key text: queries differing only in case or spacing share an embedding."""
+    return _SPACE_RE.sub(" ", (text or "").strip().lower())
+
+
+class EmbeddingCache:
+    """Per-worker LRU in front of a shared Redis tier; values are float32 vectors."""
+
+    def __init__(self, model_key: str, redis_client: Optional[redis.Redis] = None,
+                 max_entries: int = EMBED_CACHE_SIZE, ttl: int = EMBED_CACHE_TTL):
+        self.prefix = f"emb:{model_key}:"
+        self.redis_client = redis_client if ttl > 0 else None
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._local = OrderedDict()
+        self._lock = threading.Lock()
+        self._redis_down_until = 0.0
+
+    def with_model_key(self, model_key: str) -> "EmbeddingCache":
+        """An empty cache with the same Redis tier and limits under another namespace."""
+        return EmbeddingCache(model_key, self.redis_client, self.max_entries, self.ttl)
+
+    def _redis_key(self, text: str) -> str:
+        return self.prefix + hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+    def _redis_usable(self) -> bool:
+        return self.redis_client is not None and time.monotonic() >= self._redis_down_until
+
+    def _redis_failed(self, component: str) -> None:
+        EMBEDDING_CACHE_TOTAL.labels(component=component, result='error').inc()
+        self._redis_down_until = time.monotonic() + REDIS_RETRY_SECONDS
+
+    def _remember(self, text: str, vector: np.ndarray) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._local[text] = vector
+            self._local.move_to_end(text)
+            while len(self._local) > self.max_entries:
+                self._local.popitem(last=False)
+
+    def get(self, text: str, component: str = "") -> Optional[np.ndarray]:
+        """Cached embedding of normalized `text`, or None."""
+        with self._lock:
+            vector = self._local.get(text)
+            if vector is not None:
+                self._local.move_to_end(text)
+        if vector is not None:
+            EMBEDDING_CACHE_TOTAL.labels(component=component, result='hit_local').inc()
+            return vector
+
+        if self._redis_usable():
+            try:
+                with timed(REDIS_OP_SECONDS, op='embedding_get'):
+                    data = self.redis_client.get(self._redis_key(text))
+            except redis.RedisError:
+                self._redis_failed(component)
+                data = None
+            if data:
+                vector = np.frombuffer(data, dtype=np.float32)
+                self._remember(text, vector)
+                EMBEDDING_CACHE_TOTAL.labels(component=component, result='hit_redis').inc()
+                return vector
+
+        EMBEDDING_CACHE_TOTAL.labels(component=component, result='miss').inc()
+        return None
+
+    def put(self, text: str, vector: np.ndarray, component: str = "") -> np.ndarray:
+        """Cache an embedding; returns it as the read-only float32 array callers share."""
+        vector = np.array(vector, dtype=np.float32)
+        # Shared between callers: nobody may modify a cached vector in place
+        vector.flags.writeable = False
+        self._remember(text, vector)
+        if self._redis_usable():
+            try:
+                with timed(REDIS_OP_SECONDS, op='embedding_put'):
+                    self.redis_client.setex(self._redis_key(text), self.ttl, vector.tobytes())
+            except redis.RedisError:
+                self._redis_failed(component)
+        return vector
+
+    def clear(self) -> None:
+        """Drop the per-worker entries (Redis entries expire on their own)."""
+        with self._lock:
+            self._local.clear()
+
+
+class MicroBatcher:
+    """Encodes texts submitted by concurrent callers in shared batches on a background thread."""
+
+    def __init__(self, encode_batch: Callable[[List[str]], np.ndarray],
+                 max_items: int = EMBED_BATCH_MAX_ITEMS, max_wait_ms: float = EMBED_BATCH_MAX_WAIT_MS):
+        self.encode_batch = encode_batch
+        self.max_items = max(1, max_items)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self._lock = threading.Lock()
+        self._pid = None
+        self._queue = None
+        self._last_batch_size = 0
+
+    def _ensure_worker(self) -> "queue.Queue":
+        # Started lazily and per process: a thread started before gunicorn forks doesn't exist in the workers
+        with self._lock:
+            if self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._queue = queue.Queue()
+                threading.Thread(target=self._run, args=(self._queue,), name="embedding-batcher", daemon=True).start()
+            return self._queue
+
+    def submit(self, text: str) -> Future:
+        future = Future()
+        self._ensure_worker().put((text, future))
+        return future
+
+    def encode(self, text: str) -> np.ndarray:
+        return self.submit(text).result()
+
+    def _collect(self, requests: "queue.Queue") -> list:
+        batch = [requests.get()]
+        # Idle worker: nobody to wait for
+        wait = self.max_wait if self._last_batch_size > 1 or not requests.empty() else 0.0
+        deadline = time.monotonic() + wait
+        while len(batch) < self.max_items:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(requests.get(timeout=remaining) if remaining > 0 else requests.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self, requests: "queue.Queue") -> None:
+        while True:
+            batch = self._collect(requests)
+            # Concurrent requests for the same popular query share one row
+            futures_by_text = {}
+            for text, future in batch:
+                futures_by_text.setdefault(text, []).append(future)
+            texts = list(futures_by_text)
+            self._last_batch_size = len(batch)
+            EMBEDDING_BATCH_SIZE.observe(len(texts))
+            try:
+                vectors = self.encode_batch(texts)
+            except Exception as e:
+                for futures in futures_by_text.values():
+                    for future in futures:
+                        future.set_exception(e)
+                continue
+            for text, vector in zip(texts, vectors):
+                for future in futures_by_text[text]:
+                    future.set_result(vector)
+
+
+class LocalEncoder:
+    """The SentenceTransformer loaded in this process."""
+
+    variant = "torch"
+
+    def __init__(self, model_name: str = EMBEDDING_MODEL_NAME, model=None):
+        if model is None:
+            from sentence_transformers import SentenceTransformer
+            model = SentenceTransformer(model_name)
+        self.model = model
+        self.model_name = model_name
+
+    def encode_batch(self, texts: List[str]) -> np.ndarray:
+        return np.asarray(self.model.encode(texts, batch_size=len(texts)), dtype=np.float32)
+
+
+class SidecarUnavailable(Exception):
+    """The embedding sidecar could not be reached or answered with an error."""
+
+
+class SidecarEncoder:
+    """Client of embedding_server.py over a Unix socket ("unix:/path.sock") or local HTTP."""
+
+    model = None
+    # Backend the sidecar runs, known after health()
+    variant = None
+
+    def __init__(self, url: str = EMBEDDING_SIDECAR_URL, timeout: float = EMBEDDING_SIDECAR_TIMEOUT,
+                 client: Optional[httpx.Client] = None):
+        self.url = url
+        if client is None:
+            if url.startswith("unix:"):
+                # "unix:/run/x.sock" or "unix:///run/x.sock"
+                path = url[len("unix:"):]
+                path = path[2:] if path.startswith("//") else path
+                transport = httpx.HTTPTransport(uds=path)
+                client = httpx.Client(transport=transport, base_url="http://embedding-sidecar", timeout=timeout)
+            else:
+                client = httpx.Client(base_url=url, timeout=timeout)
+        self._client = client
+
+    def health(self) -> dict:
+        try:
+            response = self._client.get("/health")
+            response.raise_for_status()
+            info = response.json()
+        except (httpx.HTTPError, ValueError) as e:
+            raise SidecarUnavailable(f"{self.url}: {e}") from e
+        self.variant = info.get("variant", "torch")
+        return info
+
+    def encode_batch(self, texts: List[str]) -> np.ndarray:
+        try:
+            response = self._client.post("/embed", json={"texts": texts})
+            response.raise_for_status()
+            dims = int(response.headers["x-embedding-dim"])
+        except (httpx.HTTPError, KeyError, ValueError) as e:
+            raise SidecarUnavailable(f"{self.url}: {e}") from e
+        return np.frombuffer(response.content, dtype=np.float32).reshape(len(texts), dims)
+
+
+def local_encoder(model_name: str = EMBEDDING_MODEL_NAME, model_version: str = EMBEDDING_MODEL_VERSION):
+    """The in-process encoder EMBEDDING_BACKEND selects; torch if the ONNX export can't be used."""
+    if EMBEDDING_BACKEND == "onnx":
+        from tools.onnx_encoder import OnnxEncoder
+        try:
+            encoder = OnnxEncoder.load(model_name, model_version)
+            print(f"✅ ONNX embedding backend loaded ({encoder.variant}, min cosine vs torch {encoder.min_cosine})")
+            return encoder
+        except (OSError, ValueError, RuntimeError) as e:
+            print(f"⚠️  ONNX embedding backend unavailable ({e}), loading the torch model")
+    return LocalEncoder(model_name)
+
+
+def cache_key(model_name: str, model_version: str, variant: str) -> str:
+    """Embedding cache namespace: vectors of different models, versions or backends never mix."""
+    return f"{model_name}@{model_version}/{variant}"
+
+
+class Embedder:
+    """Query encodes through an EmbeddingCache and a MicroBatcher, on a local model or the sidecar."""
+
+    def __init__(self, model_name: str = EMBEDDING_MODEL_NAME, model_version: str = EMBEDDING_MODEL_VERSION,
+                 cache: Optional[EmbeddingCache] = None, model=None, encoder=None,
+                 max_batch: int = EMBED_BATCH_MAX_ITEMS, max_wait_ms: float = EMBED_BATCH_MAX_WAIT_MS):
+        if encoder is None:
+            encoder = LocalEncoder(model_name, model) if model is not None else local_encoder(model_name, model_version)
+        self.encoder = encoder
+        self.model_name = model_name
+        self.model_version = model_version
+        self.cache = cache if cache is not None else EmbeddingCache(cache_key(model_name, model_version, encoder.variant))
+        batching = max_batch > 1 and max_wait_ms > 0
+        self.batcher = MicroBatcher(self.encode_batch, max_batch, max_wait_ms) if batching else None
+        self._fallback_lock = threading.Lock()
+
+    @property
+    def model(self):
+        """The in-process SentenceTransformer (None while the sidecar does the encoding)."""
+        return self.encoder.model
+
+    def encode_batch(self, texts: List[str]) -> np.ndarray:
+        """Uncached float32 embeddings of `texts`, one model call."""
+        encoder = self.encoder
+        try:
+            return encoder.encode_batch(texts)
+        except SidecarUnavailable as e:
+            with self._fallback_lock:
+                if self.encoder is encoder:
+                    print(f"⚠️  Embedding sidecar failed ({e}), loading the model in-process")
+                    fallback = local_encoder(self.model_name, self.model_version)
+                    # The local variant's vectors get their own namespace, never the sidecar's
+                    self.cache = self.cache.with_model_key(
+                        cache_key(self.model_name, self.model_version, fallback.variant))
+                    self.encoder = fallback
+            return self.encoder.encode_batch(texts)
+
+    def _put(self, cache: EmbeddingCache, encoder, key: str, vector: np.ndarray, component: str) -> np.ndarray:
+        """Cache a vector unless the encoder changed while it was computed (it may be either variant's)."""
+        if self.encoder is not encoder:
+            return np.asarray(vector, dtype=np.float32)
+        return cache.put(key, vector, component)
+
+    def encode(self, text: str, component: str = "") -> np.ndarray:
+        """float32 embedding of a search query (read-only; copy before modifying)."""
+        encoder, cache = self.encoder, self.cache
+        key = normalize_text(text)
+        vector = cache.get(key, component)
+        if vector is None:
+            # Includes the time spent waiting for the batch to fill
+            with timed(EMBEDDING_SECONDS, component=component):
+                vector = self.batcher.encode(key) if self.batcher else self.encode_batch([key])[0]
+            vector = self._put(cache, encoder, key, vector, component)
+        return vector
+
+    def encode_many(self, texts: List[str], component: str = "") -> np.ndarray:
+        """Embeddings of several texts: cached ones looked up, the rest encoded in shared batches."""
+        encoder, cache = self.encoder, self.cache
+        keys = [normalize_text(text) for text in texts]
+        vectors = [cache.get(key, component) for key in keys]
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        if missing:
+            with timed(EMBEDDING_SECONDS, component=component):
+                if self.batcher:
+                    futures = [self.batcher.submit(keys[i]) for i in missing]
+                    encoded = [future.result() for future in futures]
+                else:
+                    encoded = self.encode_batch([keys[i] for i in missing])
+            for i, vector in zip(missing, encoded):
+                vectors[i] = self._put(cache, encoder, keys[i], vector, component)
+        return np.stack(vectors) if vectors else np.empty((0, 0), dtype=np.float32)
+
+
+def _redis_client() -> Optional[redis.Redis]:
+    if EMBED_CACHE_TTL <= 0:
+        return None
+    return redis.Redis(
+        host=os.getenv("REDIS_HOST", "localhost"),
+        port=int(os.getenv("REDIS_PORT", "6379")),
+        db=int(os.getenv("REDIS_DB", "0")),
+        socket_connect_timeout=REDIS_TIMEOUT_SECONDS,
+        socket_timeout=REDIS_TIMEOUT_SECONDS,
+    )
+
+
+def _sidecar_encoder() -> Optional[SidecarEncoder]:
+    """A client of the configured sidecar if it is up and serves our model, else None (load in-process)."""
+    if not EMBEDDING_SIDECAR_URL:
+        return None
+    encoder = SidecarEncoder(EMBEDDING_SIDECAR_URL)
+    try:
+        info = encoder.health()
+    except SidecarUnavailable as e:
+        print(f"⚠️  Embedding sidecar unavailable ({e}), loading the model in-process")
+        return None
+    served = f"{info.get('model')}@{info.get('version')}"
+    if served != f"{EMBEDDING_MODEL_NAME}@{EMBEDDING_MODEL_VERSION}":
+        print(f"⚠️  Embedding sidecar serves {served}, expected {EMBEDDING_MODEL_NAME}@{EMBEDDING_MODEL_VERSION}; "
+              f"loading the model in-process")
+        return None
+    print(f"✅ Using embedding sidecar at {EMBEDDING_SIDECAR_URL} ({served}, {encoder.variant})")
+    return encoder
+
+
+_embedder: Optional[Embedder] = None
+_embedder_lock = threading.Lock()
+
+
+def get_embedder() -> Embedder:
+    """The process-wide Embedder (sidecar client or model loaded on first use, shared by all search tools)."""
+    global _embedder
+    if _embedder is None:
+        with _embedder_lock:
+            if _embedder is None:
+                encoder = _sidecar_encoder() or local_encoder()
+                key = cache_key(EMBEDDING_MODEL_NAME, EMBEDDING_MODEL_VERSION, encoder.variant)
+                _embedder = Embedder(cache=EmbeddingCache(key, _redis_client()), encoder=encoder)
+    return _embedder
+
+
+__all__ = ['Embedder', 'EmbeddingCache', 'MicroBatcher', 'LocalEncoder', 'SidecarEncoder', 'SidecarUnavailable',
+           'get_embedder', 'local_encoder', 'cache_key', 'normalize_text', 'EMBEDDING_BACKEND',
+           'EMBEDDING_MODEL_NAME', 'EMBEDDING_MODEL_VERSION']
@@ -0,0 +1,158 @@
+"""
+Lexical product index: BM25 over product names and SKUs, plus an exact lookup
+of SKUs and model numbers. MiniLM embeds strings like "A366EJ" or "WH-CH720N"
+as noise, so ProductSearchTool asks this index first: a query naming a SKU or
+a distinctive model number is answered from here without embedding it or
+querying Pinecone, and other queries get the BM25 ranking fused with the vector
+ranking (reciprocal_rank_fusion).
+
+Built in memory from the catalog snapshot (tools/vector_index.py) when each
+worker starts, whichever vector backend is in use: a few hundred milliseconds
+for a 20k-product catalog. Rows are snapshot row numbers.
+
+Tokens are lowercase alphanumeric runs. A hyphenated, dotted or slashed code
+also yields its joined form ("WH-CH720N" -> wh, ch720n, whch720n), so a model
+number matches however the shopper punctuates it. Model tokens mix letters
+and digits and are not sizes or capacities ("8gb", "55inch", "1.5ton").
+
+Configuration (environment):
+    LEXICAL_SEARCH  "false" to search with the vector index only (default: true)
+"""
+
+import math
+import os
+import re
+from collections import Counter
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+LEXICAL_SEARCH = os.getenv("LEXICAL_SEARCH", "true").lower() in ("1", "true", "yes")
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+# Reciprocal-rank fusion constant (the usual 60: damps the weight of the very top ranks)
+RRF_K = 60
+# Exact lookups use model tokens at least this long ("a36" is a family, "a366ej" a product)
+EXACT_MIN_CHARS = 5
+# A key naming more products than this is a series, not a model: leave it to ranking
+MAX_EXACT_ROWS = 8
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:[-/.][a-z0-9]+)*")
+_SEPARATOR_RE = re.compile(r"[-/.]")
+_NON_ALNUM_RE = re.compile(r"[^a-z0-9]")
+_UNIT_RE = re.compile(r"^\d+(?:g|gb|tb|mb|mp|mah|hz|w|kg|l|ltr|litre|inch|in|ton|t|star|k|cm|mm|v)$")
+
+
+def is_model_token(token: str) -> bool:
+    """Whether a token looks like a model number: letters and digits, not a size or capacity."""
+    return (len(token) >= 3 and not token.isdigit() and not token.isalpha()
+            and not _UNIT_RE.match(token))
+
+
+def tokenize(text: str) -> List[str]:
+    """BM25 tokens of a name, SKU or query, with the joined form of punctuated model numbers."""
+    tokens = []
+    for raw in _TOKEN_RE.findall(text.lower()):
+        parts = _SEPARATOR_RE.split(raw)
+        tokens.extend(parts)
+        joined = "".join(parts)
+        if len(parts) > 1 and is_model_token(joined):
+            tokens.append(joined)
+    return tokens
+
+
+def _sku_key(sku: str) -> str:
+    return _NON_ALNUM_RE.sub("", sku.lower())
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[str]], k: int = RRF_K) -> List[Tuple[str, float]]:
+    """(key, score) best first, scoring each key by the sum of 1 / (k + rank) over the rankings."""
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, key in enumerate(ranking, start=1):
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: -item[1])
+
+
+class LexicalIndex:
+    """Inverted index over one text per product (name + SKU) with BM25 ranking and exact model lookup."""
+
+    def __init__(self, texts: Sequence[str], skus: Sequence[str], prices: Optional[np.ndarray] = None):
+        self.rows = len(texts)
+        self.prices = prices
+        postings: Dict[str, Tuple[List[int], List[int]]] = {}
+        exact: Dict[str, set] = {}
+        lengths = np.zeros(self.rows, dtype=np.float32)
+        for row, (text, sku) in enumerate(zip(texts, skus)):
+            tokens = tokenize(text)
+            lengths[row] = len(tokens)
+            for token, count in Counter(tokens).items():
+                rows, counts = postings.setdefault(token, ([], []))
+                rows.append(row)
+                counts.append(count)
+                if len(token) >= EXACT_MIN_CHARS and is_model_token(token):
+                    exact.setdefault(token, set()).add(row)
+            if sku:
+                exact.setdefault(_sku_key(sku), set()).add(row)
+
+        self._postings = {
+            token: (np.array(rows, dtype=np.int32), np.array(counts, dtype=np.float32))
+            for token, (rows, counts) in postings.items()
+        }
+        self._idf = {
+            token: math.log(1.0 + (self.rows - len(rows) + 0.5) / (len(rows) + 0.5))
+            for token, (rows, _) in postings.items()
+        }
+        self._exact = {key: sorted(rows) for key, rows in exact.items() if len(rows) <= MAX_EXACT_ROWS}
+        average = float(lengths.mean()) if self.rows else 1.0
+        # Per-row BM25 length normalization, computed once
+        self._norms = BM25_K1 * (1.0 - BM25_B + BM25_B * lengths / max(average, 1e-9))
+
+    @classmethod
+    def from_snapshot(cls, snapshot) -> "LexicalIndex":
+        """Index the product names and SKUs of a CatalogSnapshot."""
+        names = [snapshot.string("product_name", row) for row in range(len(snapshot))]
+        skus = [snapshot.string("sku", row) for row in range(len(snapshot))]
+        texts = [f"{name} {sku}" if sku else name for name, sku in zip(names, skus)]
+        return cls(texts, skus, snapshot.prices)
+
+    def __len__(self) -> int:
+        return self.rows
+
+    def exact(self, query: str) -> List[int]:
+        """Rows whose SKU or model number appears in the query, most keys matched first."""
+        keys = {_sku_key(query)}
+        keys.update(token for token in tokenize(query) if len(token) >= EXACT_MIN_CHARS)
+        hits: Counter = Counter()
+        for key in keys:
+            for row in self._exact.get(key, ()):
+                hits[row] += 1
+        return sorted(hits, key=lambda row: (-hits[row], row))
+
+    def search(self, query: str, top_k: int = 10, price_min: Optional[float] = None,
+               price_max: Optional[float] = None) -> List[Tuple[int, float]]:
+        """(row, BM25 score) of the best top_k rows containing any query token, within the price bounds."""
+        if top_k <= 0:
+            return []
+        scores = np.zeros(self.rows, dtype=np.float32)
+        for token in set(tokenize(query)):
+            posting = self._postings.get(token)
+            if posting is None:
+                continue
+            rows, counts = posting
+            scores[rows] += self._idf[token] * counts * (BM25_K1 + 1.0) / (counts + self._norms[rows])
+        if self.prices is not None and (price_min is not None or price_max is not None):
+            with np.errstate(invalid="ignore"):
+                if price_min is not None:
+                    scores[~(self.prices >= price_min)] = 0.0
+                if price_max is not None:
+                    scores[~(self.prices <= price_max)] = 0.0
+        candidates = np.flatnonzero(scores)
+        if len(candidates) > top_k:
+            candidates = candidates[np.argpartition(-scores[candidates], top_k - 1)[:top_k]]
+        candidates = candidates[np.argsort(-scores[candidates], kind="stable")]
+        return [(int(row), float(scores[row])) for row in candidates]
+
+
+__all__ = ['LexicalIndex', 'LEXICAL_SEARCH', 'reciprocal_rank_fusion', 'tokenize', 'is_model_token', 'RRF_K']
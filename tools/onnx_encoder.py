@@ -0,0 +1,118 @@
+"""
+ONNX Runtime backend for the query embedding model (EMBEDDING_BACKEND=onnx).
+Runs an ONNX export of all-MiniLM-L6-v2's transformer, optionally dynamically
+quantized to int8, with the model's own fast tokenizer (tokenizer.json) and the
+same pooling as the sentence-transformers pipeline: mean over non-padding
+tokens, then L2 normalization. Needs onnxruntime and tokenizers, not torch.
+
+The model directory is produced by export_onnx_embedding.py, which also checks
+the ONNX outputs against the torch model and records the result in
+manifest.json; a directory whose validation failed, or that was exported from
+another model, is refused here.
+
+Model directory:
+    model.onnx        float32 graph
+    model.int8.onnx   dynamically quantized graph
+    tokenizer.json    fast tokenizer of the source model
+    manifest.json     {"model", "version", "max_seq_length", "validation": {...}}
+
+Configuration (environment):
+    EMBEDDING_ONNX_PATH       model directory (default: data/onnx/<model name>)
+    EMBEDDING_ONNX_QUANTIZED  "true" to run model.int8.onnx (default: true)
+    EMBEDDING_ONNX_THREADS    intra-op threads (default: 1, one per worker process)
+"""
+
+import json
+import os
+from typing import List
+
+import numpy as np
+
+try:
+    import onnxruntime
+    from tokenizers import Tokenizer
+    ONNX_AVAILABLE = True
+except ImportError:
+    ONNX_AVAILABLE = False
+
+EMBEDDING_ONNX_QUANTIZED = os.getenv("EMBEDDING_ONNX_QUANTIZED", "true").lower() in ("1", "true", "yes")
+EMBEDDING_ONNX_THREADS = int(os.getenv("EMBEDDING_ONNX_THREADS", "1"))
+
+FP32_FILE = "model.onnx"
+INT8_FILE = "model.int8.onnx"
+TOKENIZER_FILE = "tokenizer.json"
+MANIFEST_FILE = "manifest.json"
+
+
+def default_onnx_path(model_name: str) -> str:
+    return os.getenv(
+        "EMBEDDING_ONNX_PATH",
+        os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "onnx", model_name),
+    )
+
+
+def mean_pool(hidden: np.ndarray, attention_mask: np.ndarray) -> np.ndarray:
+    """sentence-transformers mean pooling + Normalize: average of the unmasked token states, unit length."""
+    mask = attention_mask[:, :, None].astype(np.float32)
+    pooled = (hidden * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+    norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+    return pooled / np.maximum(norms, 1e-12)
+
+
+class OnnxEncoder:
+    """Encoder with the LocalEncoder interface, backed by an ONNX Runtime session."""
+
+    model = None
+
+    def __init__(self, path: str, quantized: bool = EMBEDDING_ONNX_QUANTIZED, max_seq_length: int = 256,
+                 threads: int = EMBEDDING_ONNX_THREADS):
+        """Open a graph and tokenizer as they are; use load() to require a validated export."""
+        if not ONNX_AVAILABLE:
+            raise RuntimeError("onnxruntime and tokenizers are not installed")
+        self.variant = "onnx-int8" if quantized else "onnx-fp32"
+        self.min_cosine = None
+        self.tokenizer = Tokenizer.from_file(os.path.join(path, TOKENIZER_FILE))
+        self.tokenizer.enable_truncation(max_length=max_seq_length)
+        self.tokenizer.enable_padding()
+
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = threads
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = onnxruntime.InferenceSession(
+            os.path.join(path, INT8_FILE if quantized else FP32_FILE), options,
+            providers=["CPUExecutionProvider"],
+        )
+        self._input_names = {i.name for i in self.session.get_inputs()}
+
+    @classmethod
+    def load(cls, model_name: str, model_version: str, path: str = "",
+             quantized: bool = EMBEDDING_ONNX_QUANTIZED) -> "OnnxEncoder":
+        """The export of model_name@model_version in `path`, if its variant passed validation."""
+        path = path or default_onnx_path(model_name)
+        with open(os.path.join(path, MANIFEST_FILE), encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("model") != model_name or str(manifest.get("version")) != str(model_version):
+            raise ValueError(f"{path} holds {manifest.get('model')}@{manifest.get('version')}, "
+                             f"expected {model_name}@{model_version}")
+        variant = "int8" if quantized else "fp32"
+        validation = manifest.get("validation", {}).get(variant, {})
+        if not validation.get("passed"):
+            raise ValueError(f"{path}: {variant} export did not pass validation against torch")
+        encoder = cls(path, quantized, int(manifest.get("max_seq_length", 256)))
+        encoder.min_cosine = validation.get("min_cosine")
+        return encoder
+
+    def encode_batch(self, texts: List[str]) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(texts)
+        inputs = {
+            "input_ids": np.array([e.ids for e in encodings], dtype=np.int64),
+            "attention_mask": np.array([e.attention_mask for e in encodings], dtype=np.int64),
+            "token_type_ids": np.array([e.type_ids for e in encodings], dtype=np.int64),
+        }
+        inputs = {name: value for name, value in inputs.items() if name in self._input_names}
+        hidden = self.session.run(None, inputs)[0]
+        return mean_pool(hidden, inputs["attention_mask"]).astype(np.float32)
+
+
+__all__ = ['OnnxEncoder', 'ONNX_AVAILABLE', 'mean_pool', 'default_onnx_path',
+           'FP32_FILE', 'INT8_FILE', 'TOKENIZER_FILE', 'MANIFEST_FILE']
@@ -0,0 +1,131 @@
+"""
+Display fields of a product search result: up to three short features, a
+category guess, the formatted price and the canonical product page URL.
+Derived once per product when the catalog snapshot is written (save_snapshot
+stores them as columns), so ProductSearchTool.format_results only selects
+them; products without stored fields (an older snapshot, Pinecone matches with
+no snapshot loaded) get them computed here at query time, with the same result.
+
+Features come from the description (the first 200 characters, as shown in
+search results) split on "|", ":" and ",", skipping spec labels and junk;
+products with fewer than three get defaults for their kind.
+"""
+
+from typing import Any, Dict, List, Optional
+
+from tools.query_normalizer import CATEGORIES
+
+PRODUCT_URL_BASE = "https://www.lotuselectronics.com/product"
+# Joins the features in a snapshot column (features never contain it: it is a split character)
+FEATURE_SEPARATOR = "|"
+MAX_FEATURES = 3
+
+_SKIP_FRAGMENTS = ['processor:', 'operating system:', 'camera back:', 'internal memory:', 'network:']
+_INVALID_FRAGMENTS = ['undefined', 'null', 'n/a', '...']
+
+# (kind, name keywords, default features), first match wins
+_DEFAULT_FEATURES = [
+    ("smartphone", ['smartphone', 'phone', 'mobile', 'galaxy', 'redmi', 'oneplus'],
+     ["High Resolution Camera", "Fast Performance", "Long Battery Life"]),
+    ("headphones", ['earphone', 'headphone', 'buds', 'speaker'],
+     ["Premium Sound Quality", "Wireless Connectivity", "Comfortable Design"]),
+    ("television", ['tv', 'television', 'smart tv'],
+     ["Full HD Display", "Smart Features", "Energy Efficient"]),
+    ("laptop", ['laptop', 'computer'],
+     ["High Performance", "Portable Design", "Latest Technology"]),
+]
+_GENERIC_FEATURES = ["Latest Technology", "High Quality Build", "Great Value for Money"]
+
+# Longest first, so "smart watch" wins over "watch" and "led tv" over "tv"
+_CATEGORY_TERMS = sorted(CATEGORIES.items(), key=lambda item: -len(item[0]))
+
+
+def search_description(text: str) -> str:
+    """The description a search result carries: the first 200 characters of the catalog text."""
+    return text[:200] + "..." if text else ""
+
+
+def extract_features(description: str, product_name: str) -> List[str]:
+    """Up to three features from the description, padded with defaults for the product's kind."""
+    features = []
+    if description and len(description) > 20:
+        # Clean and extract meaningful features
+        clean_desc = description.replace('|', ',').replace(':', ',')
+        parts = [f.strip() for f in clean_desc.split(',') if f.strip()]
+
+        for feature in parts:
+            cleaned = feature.strip().rstrip('.,;:')
+            lowered = cleaned.lower()
+            if (5 <= len(cleaned) <= 40 and
+                    not any(skip in lowered for skip in _SKIP_FRAGMENTS) and
+                    not any(invalid in lowered for invalid in _INVALID_FRAGMENTS)):
+                features.append(cleaned)
+                if len(features) >= MAX_FEATURES:
+                    break
+
+    if len(features) < MAX_FEATURES:
+        product_name_lower = product_name.lower()
+        default_features = _GENERIC_FEATURES
+        for _, keywords, defaults in _DEFAULT_FEATURES:
+            if any(keyword in product_name_lower for keyword in keywords):
+                default_features = defaults
+                break
+        features.extend(default_features[:MAX_FEATURES - len(features)])
+    return features
+
+
+def guess_category(product_name: str) -> str:
+    """Category from the product name: query_normalizer's lexicon, then the default-feature kinds, else ""."""
+    name = product_name.lower()
+    words = f" {' '.join(name.replace('-', ' ').split())} "
+    for term, category in _CATEGORY_TERMS:
+        if f" {term} " in words:
+            return category
+    for kind, keywords, _ in _DEFAULT_FEATURES:
+        if any(keyword in name for keyword in keywords):
+            return kind
+    return ""
+
+
+def format_price(price: Optional[float]) -> str:
+    """"₹30,999", or "" without a price."""
+    if price is None or price != price:
+        return ""
+    return f"₹{price:,.0f}"
+
+
+def product_url(url: str, product_id: str) -> str:
+    """Product page URL from the catalog's url slug and product id, "" if either is missing."""
+    if url and product_id:
+        return f"{PRODUCT_URL_BASE}/{url}/{product_id}"
+    return ""
+
+
+def display_fields(product_name: str, description: str, price: Optional[float], url: str,
+                   product_id: str) -> Dict[str, Any]:
+    """All display fields of one product."""
+    return {
+        "features": extract_features(description, product_name),
+        "category": guess_category(product_name),
+        "product_mrp": format_price(price),
+        "product_url": product_url(url, product_id),
+    }
+
+
+def stored_display(metadata: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Display fields stored in catalog metadata, None if it has none."""
+    if "features" not in metadata or "product_url" not in metadata:
+        return None
+    features = metadata["features"]
+    if isinstance(features, str):
+        features = features.split(FEATURE_SEPARATOR) if features else []
+    return {
+        "features": features,
+        "category": metadata.get("category", ""),
+        "product_mrp": metadata.get("product_mrp", ""),
+        "product_url": metadata["product_url"],
+    }
+
+
+__all__ = ['display_fields', 'stored_display', 'extract_features', 'guess_category', 'format_price',
+           'product_url', 'search_description', 'FEATURE_SEPARATOR', 'PRODUCT_URL_BASE']
@@ -1,15 +1,82 @@
 """
 Product Search Tool using Pinecone Vector Database
 This tool provides semantic search functionality for products with price filtering.
+With PRODUCT_SEARCH_BACKEND=local the same search runs in-process on a catalog
+snapshot (tools/vector_index.py) instead of querying Pinecone.
+Queries go through tools/query_normalizer.py first, so "samsung ac under 50k"
+is embedded as "samsung air conditioner" with price_max=50000 even when the
+caller (the LLM or a direct /search client) didn't split out the filters.
+
+Price bounds are pushed into the index query as a metadata filter on the
+numeric price_num field when the backend can apply one (the exact local index,
+or Pinecone with PINECONE_PRICE_FILTER=true once backfill_price_num.py has
+added the field), so the index returns only matches in range and a tight
+budget still fills top_k. Other backends (the local HNSW graph, Pinecone by
+default) are queried unfiltered and the overfetch grows until top_k products
+in range are found or the index runs out.
+
+Queries naming a SKU or model number ("A366EJ", "WH-CH720N") are answered from
+the lexical index (tools/lexical_index.py) without embedding or an index query;
+for other queries its BM25 ranking is fused with the vector ranking. It is
+built from the catalog snapshot, so it needs CATALOG_SNAPSHOT_PATH to exist
+even with the Pinecone backend (vector search alone otherwise).
+
+search_formatted() (used by the search_products tool and the /search endpoint)
+serves repeat searches from a short-lived result cache (tools/search_cache.py).
+Its entries belong to the checksum of the loaded catalog snapshot: every
+CATALOG_CHECK_SECONDS a search looks at the snapshot file, and once
+build_catalog_snapshot.py has replaced it the snapshot (with the local index
+and the lexical index built on it) is reloaded in the background, which
+changes the checksum and drops the cache.
+
+Configuration (environment):
+    PINECONE_PRICE_FILTER  "true" to filter prices in Pinecone; only after running
+                           backfill_price_num.py, since a filtered query matches
+                           nothing without price_num (default: false)
+    CATALOG_CHECK_SECONDS  seconds between checks for a rebuilt catalog snapshot (default: 30)
 """
 
 import json
 import os
-from typing import Optional, List, Dict, Any
-from sentence_transformers import SentenceTransformer
+import threading
+import time
+from typing import Optional, List, Dict, Any, NamedTuple
 from pinecone import Pinecone
 from pydantic import BaseModel, Field
 from langchain_core.tools import tool
+from chat_metrics import PINECONE_QUERY_SECONDS, PRODUCT_SEARCH_TOTAL, timed
+from tools.embeddings import get_embedder
+from tools.lexical_index import LEXICAL_SEARCH, LexicalIndex, reciprocal_rank_fusion
+from tools.product_display import display_fields, search_description, stored_display
+from tools.query_normalizer import NormalizedQuery, add_catalog_brands, mentions_brand, normalize_query
+from tools.search_cache import SearchResultCache, search_key
+from tools.vector_index import CATALOG_SNAPSHOT_PATH, PRODUCT_SEARCH_BACKEND, CatalogSnapshot, LocalVectorIndex, Match
+
+PINECONE_PRICE_FILTER = os.getenv("PINECONE_PRICE_FILTER", "false").lower() in ("1", "true", "yes")
+
+# Extra matches fetched for entries dropped for an unusable name or price
+FETCH_MARGIN = 2
+# Unfiltered overfetch: first request is top_k * 3, growing 4x per retry up to this many matches
+MAX_FETCH_K = 240
+OVERFETCH_GROWTH = 4
+CATALOG_CHECK_SECONDS = float(os.getenv("CATALOG_CHECK_SECONDS", "30"))
+
+
+def _snapshot_stamp():
+    """Identity of the snapshot file on disk (changes when it is replaced), None if there is none."""
+    try:
+        stat = os.stat(CATALOG_SNAPSHOT_PATH)
+    except OSError:
+        return None
+    return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+
+class _Catalog(NamedTuple):
+    """The catalog snapshot and what is built on it, replaced as a whole on reload."""
+    snapshot: Optional[CatalogSnapshot]
+    lexical: Optional[LexicalIndex]
+    # id -> snapshot row, to look up stored display fields for Pinecone matches
+    rows: Dict[str, int]
 
 class ProductSearchInput(BaseModel):
     """Input schema for product search tool."""
@@ -30,36 +97,219 @@ class ProductSearchTool:
             
         self.pinecone_index_name = "all-products-lotus"
         self.pinecone_host = "https://all-products-lotus-imbj1oj.svc.aped-4627-b74a.pinecone.io"
+        # Backend actually in use ("all-products-lotus" or "local-exact" / "local-hnsw")
+        self.index_name = self.pinecone_index_name
         
         # Initialize components
+        self.embedder = None
         self.model = None
         self.index = None
+        # Lexical SKU/BM25 index and the snapshot its row numbers refer to
+        self._catalog = _Catalog(None, None, {})
+        self._catalog_stamp = None
+        self._catalog_checked = time.monotonic()
+        self._reloading = threading.Lock()
+        self.result_cache = SearchResultCache()
         self.is_available = False
         self._initialize()
     
     def _initialize(self):
         """Initialize the sentence transformer model and Pinecone index."""
         try:
-            # Load sentence transformer model
-            self.model = SentenceTransformer("all-MiniLM-L6-v2")
+            # Sentence transformer shared with the other search tools (or the embedding sidecar),
+            # behind the query embedding cache
+            self.embedder = get_embedder()
+            self.model = self.embedder.model
             print("✅ Sentence transformer model loaded successfully!")
             
-            # Initialize Pinecone
-            pc = Pinecone(api_key=self.pinecone_api_key)
-            self.index = pc.Index(self.pinecone_index_name, host=self.pinecone_host)
+            if PRODUCT_SEARCH_BACKEND == "local":
+                try:
+                    self.index = LocalVectorIndex.load(CATALOG_SNAPSHOT_PATH)
+                    self.index_name = f"local-{self.index.backend}"
+                    print(f"✅ Local product index loaded: {len(self.index)} products "
+                          f"({self.index.snapshot.dtype}, {self.index.backend} search)")
+                except (OSError, ValueError, KeyError) as e:
+                    print(f"⚠️  Local product index unavailable ({e}), falling back to Pinecone")
+            
+            if self.index is None:
+                # Initialize Pinecone
+                pc = Pinecone(api_key=self.pinecone_api_key)
+                self.index = pc.Index(self.pinecone_index_name, host=self.pinecone_host)
+            
+            self._load_catalog()
             
             # Test the connection
-            test_query = self.model.encode("test").tolist()
+            test_query = self.embedder.encode_batch(["test"])[0].tolist()
             self.index.query(vector=test_query, top_k=1, include_metadata=False)
             
             self.is_available = True
-            print("✅ Pinecone vector search initialized successfully!")
+            print(f"✅ Vector search initialized successfully ({self.index_name})!")
             
         except Exception as e:
             print(f"❌ Error initializing vector search: {e}")
             self.is_available = False
     
-    def search_products(self, query: str, top_k: int = 5, price_min: Optional[float] = None, price_max: Optional[float] = None) -> List[Dict[str, Any]]:
+    @property
+    def catalog(self) -> Optional[CatalogSnapshot]:
+        return self._catalog.snapshot
+    
+    @property
+    def lexical(self) -> Optional[LexicalIndex]:
+        return self._catalog.lexical
+    
+    @staticmethod
+    def _open_catalog(index) -> _Catalog:
+        """
+        The catalog snapshot (the local index's own, or the snapshot file next to Pinecone) with
+        the lexical index and the display fields stored at build time.
+        """
+        rows = {}
+        if isinstance(index, LocalVectorIndex):
+            snapshot = index.snapshot
+        else:
+            snapshot = CatalogSnapshot(CATALOG_SNAPSHOT_PATH)
+            if "product_url" in snapshot.columns:
+                # Pinecone metadata has no display fields: look them up by id
+                rows = {snapshot.string("id", row): row for row in range(len(snapshot))}
+        lexical = LexicalIndex.from_snapshot(snapshot) if LEXICAL_SEARCH else None
+        # Brand filters for brands the curated lexicon doesn't know
+        added = add_catalog_brands(snapshot.string("product_name", row) for row in range(len(snapshot)))
+        if added:
+            print(f"✅ {added} catalog brands added to the query lexicon")
+        return _Catalog(snapshot, lexical, rows)
+    
+    def _load_catalog(self):
+        """Open the catalog snapshot at startup (see _open_catalog)."""
+        self._catalog_stamp = _snapshot_stamp()
+        if self._catalog_stamp is None and not isinstance(self.index, LocalVectorIndex):
+            print("⚠️  No catalog snapshot: SKU / keyword search disabled")
+            return
+        try:
+            self._catalog = self._open_catalog(self.index)
+            if self.lexical is not None:
+                print(f"✅ Lexical product index built: {len(self.lexical)} products")
+        except (OSError, ValueError, KeyError) as e:
+            print(f"⚠️  Catalog snapshot unavailable ({e}): SKU / keyword search disabled")
+    
+    def _check_catalog(self) -> None:
+        """Start a background reload if the snapshot file was replaced (looked at every CATALOG_CHECK_SECONDS)."""
+        now = time.monotonic()
+        if now - self._catalog_checked < CATALOG_CHECK_SECONDS:
+            return
+        self._catalog_checked = now
+        stamp = _snapshot_stamp()
+        if stamp is None or stamp == self._catalog_stamp or not self._reloading.acquire(blocking=False):
+            return
+        threading.Thread(target=self._reload_catalog, args=(stamp,), daemon=True).start()
+    
+    def _reload_catalog(self, stamp) -> None:
+        try:
+            if isinstance(self.index, LocalVectorIndex):
+                index = LocalVectorIndex.load(CATALOG_SNAPSHOT_PATH)
+                # Searches in progress keep the objects they started with
+                self._catalog = self._open_catalog(index)
+                self.index = index
+            else:
+                self._catalog = self._open_catalog(self.index)
+            print(f"✅ Catalog snapshot reloaded: {len(self.catalog)} products ({self.catalog.checksum[:12]})")
+        except (OSError, ValueError, KeyError) as e:
+            print(f"⚠️  Catalog snapshot reload failed ({e}), still searching the loaded one")
+        finally:
+            # A broken file is not retried until it is replaced again
+            self._catalog_stamp = stamp
+            self._reloading.release()
+    
+    @staticmethod
+    def _attach_display(catalog: _Catalog, results: List[Dict[str, Any]]) -> None:
+        """Fill in the snapshot's stored display fields for results whose metadata lacked them."""
+        for product in results:
+            if product["display"] is None:
+                row = catalog.rows.get(product["id"])
+                if row is not None:
+                    product["display"] = stored_display(catalog.snapshot.metadata(row))
+                    product["category"] = product["display"]["category"]
+    
+    @staticmethod
+    def _catalog_matches(catalog: _Catalog, rows_and_scores) -> List[Match]:
+        """Pinecone-style matches for snapshot rows, for _to_products."""
+        return [Match(catalog.snapshot.string("id", row), score, catalog.snapshot.metadata(row))
+                for row, score in rows_and_scores]
+    
+    def normalize(self, query: str, price_min: Optional[float] = None, price_max: Optional[float] = None) -> NormalizedQuery:
+        """normalize_query(), with explicitly passed price bounds taking precedence over parsed ones."""
+        normalized = normalize_query(query)
+        if price_min is not None or price_max is not None:
+            normalized["price_min"] = price_min
+            normalized["price_max"] = price_max
+        return normalized
+    
+    @property
+    def filters_prices(self) -> bool:
+        """Whether the index applies price filters itself (LocalVectorIndex reports it; Pinecone per config)."""
+        return getattr(self.index, "supports_filter", PINECONE_PRICE_FILTER)
+    
+    @staticmethod
+    def price_filter(price_min: Optional[float], price_max: Optional[float]) -> Optional[Dict[str, Any]]:
+        """Pinecone metadata filter for a price range, None without bounds."""
+        if price_min is None and price_max is None:
+            return None
+        bounds = {"$gte": float(price_min)} if price_min is not None else {"$gt": 0.0}
+        if price_max is not None:
+            bounds["$lte"] = float(price_max)
+        return {"price_num": bounds}
+    
+    def _query_index(self, query_vec: List[float], top_k: int, filter: Optional[Dict[str, Any]] = None):
+        with timed(PINECONE_QUERY_SECONDS, index=self.index_name):
+            if filter is None:
+                return self.index.query(vector=query_vec, top_k=top_k, include_metadata=True)
+            return self.index.query(vector=query_vec, top_k=top_k, include_metadata=True, filter=filter)
+    
+    @staticmethod
+    def _to_products(matches, price_min: Optional[float], price_max: Optional[float]) -> List[Dict[str, Any]]:
+        """Search results for index matches with a usable name and a price in range."""
+        results = []
+        for match in matches:
+            metadata = match.metadata or {}
+            
+            # Validate product name
+            product_name = metadata.get("product_name", "").strip()
+            if not product_name or product_name.lower() in ['unknown', 'n/a', 'null']:
+                continue
+            
+            # Extract and validate price
+            try:
+                price_val = float(metadata.get("price", 0))
+                if price_val <= 0:
+                    continue
+            except (ValueError, TypeError):
+                continue
+            
+            # Apply price filtering (a no-op when the index already filtered)
+            if price_min is not None and price_val < price_min:
+                continue
+            if price_max is not None and price_val > price_max:
+                continue
+            
+            # Format result (display fields as stored in the catalog, if they are)
+            display = stored_display(metadata)
+            product = {
+                "id": match.id,
+                "product_id": metadata.get("product_id", match.id),
+                "score": round(match.score, 4),
+                "product_name": product_name,
+                "sku": metadata.get("sku", "N/A"),
+                "price": price_val,
+                "url": metadata.get("url", "").strip(),
+                "image_url": metadata.get("image_url", "").strip(),
+                "description": search_description(metadata.get("text", "")),
+                "category": display["category"] if display else "",
+                "display": display
+            }
+            results.append(product)
+        return results
+    
+    def search_products(self, query: str, top_k: int = 5, price_min: Optional[float] = None, price_max: Optional[float] = None,
+                        brand: Optional[str] = None, normalize: bool = True) -> List[Dict[str, Any]]:
         """
         Search for products using vector similarity and price filtering.
         
@@ -68,77 +318,148 @@ class ProductSearchTool:
             top_k: Number of results to return
             price_min: Minimum price filter
             price_max: Maximum price filter
+            brand: Products of this brand are ranked first
+            normalize: Parse filters out of `query` first (pass False if already normalized)
             
         Returns:
             List of product dictionaries with metadata
         """
         if not self.is_available:
             return []
+        
+        if normalize:
+            normalized = self.normalize(query, price_min, price_max)
+            query = normalized["query"]
+            price_min, price_max = normalized["price_min"], normalized["price_max"]
+            brand = brand or normalized["brand"]
             
+        # One snapshot for the whole search, even if a reload swaps it meanwhile
+        catalog = self._catalog
         try:
-            # Embed the query
-            query_vec = self.model.encode(query).tolist()
+            # A SKU or model number in the query: answer from the lexical index, no embedding
+            if catalog.lexical is not None:
+                exact_rows = catalog.lexical.exact(query)
+                if exact_rows:
+                    exact = self._to_products(self._catalog_matches(catalog, ((row, 1.0) for row in exact_rows)),
+                                              price_min, price_max)
+                    if exact:
+                        PRODUCT_SEARCH_TOTAL.labels(path="exact").inc()
+                        return exact[:top_k]
             
-            # Query Pinecone vector database
-            response = self.index.query(
-                vector=query_vec,
-                top_k=top_k * 3,  # Get more results for price filtering
-                include_metadata=True
-            )
+            # Embed the query (cached: popular queries skip the model)
+            query_vec = self.embedder.encode(query, component='product_search').tolist()
             
-            # Filter and format results
-            results = []
-            for match in response.matches:
-                metadata = match.metadata or {}
-                
-                # Validate product name
-                product_name = metadata.get("product_name", "").strip()
-                if not product_name or product_name.lower() in ['unknown', 'n/a', 'null']:
-                    continue
-                
-                # Extract and validate price
-                try:
-                    price_val = float(metadata.get("price", 0))
-                    if price_val <= 0:
-                        continue
-                except (ValueError, TypeError):
-                    continue
-                
-                # Apply price filtering
-                if price_min is not None and price_val < price_min:
-                    continue
-                if price_max is not None and price_val > price_max:
-                    continue
-                
-                # Format result
-                product = {
-                    "id": match.id,
-                    "product_id": metadata.get("product_id", match.id),
-                    "score": round(match.score, 4),
-                    "product_name": product_name,
-                    "sku": metadata.get("sku", "N/A"),
-                    "price": price_val,
-                    "url": metadata.get("url", "").strip(),
-                    "image_url": metadata.get("image_url", "").strip(),
-                    "description": metadata.get("text", "")[:200] + "..." if metadata.get("text", "") else ""
-                }
-                results.append(product)
-                
-                # Stop when we have enough results
-                if len(results) >= top_k:
-                    break
+            # Brand ranking re-orders the candidates, so it needs a wider pool either way
+            fetch_k = top_k * 3 if brand else top_k + FETCH_MARGIN
+            has_price_bounds = price_min is not None or price_max is not None
+            
+            if not has_price_bounds or self.filters_prices:
+                # The index returns only products in range: one round trip fills top_k
+                response = self._query_index(query_vec, fetch_k, self.price_filter(price_min, price_max))
+                results = self._to_products(response.matches, price_min, price_max)
+            else:
+                # Unfiltered backend: overfetch, and widen while too few matches are in range
+                fetch_k = max(fetch_k, top_k * 3)
+                while True:
+                    response = self._query_index(query_vec, fetch_k)
+                    results = self._to_products(response.matches, price_min, price_max)
+                    if len(results) >= top_k or len(response.matches) < fetch_k or fetch_k >= MAX_FETCH_K:
+                        break
+                    fetch_k = min(fetch_k * OVERFETCH_GROWTH, MAX_FETCH_K)
+            
+            if catalog.lexical is not None:
+                # Reciprocal-rank fusion with the BM25 ranking (score becomes the fused score)
+                lexical = self._to_products(
+                    self._catalog_matches(catalog, catalog.lexical.search(query, fetch_k, price_min, price_max)),
+                    price_min, price_max)
+                by_id = {product["id"]: product for product in lexical}
+                by_id.update((product["id"], product) for product in results)
+                fused = reciprocal_rank_fusion([[p["id"] for p in results], [p["id"] for p in lexical]])
+                results = [dict(by_id[product_id], score=round(score, 4)) for product_id, score in fused]
+                PRODUCT_SEARCH_TOTAL.labels(path="hybrid").inc()
+            else:
+                PRODUCT_SEARCH_TOTAL.labels(path="vector").inc()
             
+            # The index has no brand field: rank the named brand's products first (stable, so
+            # similarity order is kept within each group)
+            if brand:
+                results.sort(key=lambda product: not mentions_brand(product["product_name"], brand))
+            
+            results = results[:top_k]
+            if catalog.rows:
+                self._attach_display(catalog, results)
             return results
             
         except Exception as e:
             print(f"❌ Vector search error: {e}")
             return []
     
-    def format_results(self, results: List[Dict[str, Any]], query: str = "", top_k: int = 5, price_min: Optional[float] = None, price_max: Optional[float] = None) -> str:
+    @property
+    def catalog_version(self) -> str:
+        """
+        Version of the catalog being searched (snapshot checksum), for result cache invalidation.
+        Pinecone without a snapshot has no version to watch: its cached results only age out.
+        """
+        self._check_catalog()
+        if self.catalog is not None:
+            return self.catalog.checksum
+        return self.index_name
+    
+    def search_formatted(self, query: str, top_k: int = 5, price_min: Optional[float] = None,
+                         price_max: Optional[float] = None, normalized: Optional[NormalizedQuery] = None) -> str:
+        """
+        search_products() + format_results() through the result cache.
+        
+        Args:
+            query: Search query as the caller sent it (echoed in the result, not cached)
+            top_k: Number of results to return
+            price_min: Minimum price filter
+            price_max: Maximum price filter
+            normalized: self.normalize(query, price_min, price_max), if the caller already has it
+            
+        Returns:
+            Compact JSON string from format_results
+        """
+        if normalized is None:
+            normalized = self.normalize(query, price_min, price_max)
+        
+        def compute():
+            results = self.search_products(
+                query=normalized["query"],
+                top_k=top_k,
+                price_min=normalized["price_min"],
+                price_max=normalized["price_max"],
+                brand=normalized["brand"],
+                normalize=False
+            )
+            body = self._format_body(
+                results=results,
+                top_k=top_k,
+                price_min=normalized["price_min"],
+                price_max=normalized["price_max"]
+            )
+            return body, bool(results)
+        
+        key = search_key(normalized["query"], top_k, normalized["price_min"], normalized["price_max"],
+                         normalized["brand"])
+        # Queries sharing an entry differ in wording: each response echoes its own
+        return self._with_query(query, self.result_cache.get_or_compute(key, compute, version=self.catalog_version))
+    
+    @staticmethod
+    def _with_query(query: str, body: str) -> str:
+        """Prepend "search_query" to a _format_body object."""
+        return '{"search_query":' + json.dumps(query, ensure_ascii=False) + ',' + body[1:]
+    
+    @classmethod
+    def format_results(cls, results: List[Dict[str, Any]], query: str = "", top_k: int = 5, price_min: Optional[float] = None, price_max: Optional[float] = None) -> str:
         """Format search results for JSON response."""
+        return cls._with_query(query, cls._format_body(results, top_k, price_min, price_max))
+    
+    @staticmethod
+    def _format_body(results: List[Dict[str, Any]], top_k: int = 5, price_min: Optional[float] = None, price_max: Optional[float] = None) -> str:
+        """format_results without "search_query" (the part the result cache stores)."""
         if not results:
             return json.dumps({
-                "search_query": query,
                 "total_found": 0,
                 "price_filter": {
                     "min": price_min,
@@ -150,64 +471,27 @@ class ProductSearchTool:
                     "has_price_filter": price_min is not None or price_max is not None,
                     "no_results": True
                 }
-            }, ensure_ascii=False, indent=2, separators=(',', ': '))
+            }, ensure_ascii=False, separators=(',', ':'))
         
-        # Format products for JSON response
+        # Format products for JSON response: the display fields were derived when the catalog
+        # snapshot was built; only products without them (no snapshot) are derived here
         products = []
         for product in results:
-            # Extract features from description
-            description = product.get('description', '')
-            features = []
-            if description and len(description) > 20:
-                # Clean and extract meaningful features
-                clean_desc = description.replace('|', ',').replace(':', ',')
-                parts = [f.strip() for f in clean_desc.split(',') if f.strip()]
-                
-                for feature in parts:
-                    cleaned = feature.strip().rstrip('.,;:')
-                    if (5 <= len(cleaned) <= 40 and 
-                        not any(skip in cleaned.lower() for skip in ['processor:', 'operating system:', 'camera back:', 'internal memory:', 'network:']) and
-                        not any(invalid in cleaned.lower() for invalid in ['undefined', 'null', 'n/a', '...'])):
-                        features.append(cleaned)
-                        if len(features) >= 3:
-                            break
-            
-            # Add default features if needed
-            if len(features) < 3:
-                product_name_lower = product.get('product_name', '').lower()
-                if any(phone in product_name_lower for phone in ['smartphone', 'phone', 'mobile', 'galaxy', 'redmi', 'oneplus']):
-                    default_features = ["High Resolution Camera", "Fast Performance", "Long Battery Life"]
-                elif any(audio in product_name_lower for audio in ['earphone', 'headphone', 'buds', 'speaker']):
-                    default_features = ["Premium Sound Quality", "Wireless Connectivity", "Comfortable Design"]
-                elif any(tv in product_name_lower for tv in ['tv', 'television', 'smart tv']):
-                    default_features = ["Full HD Display", "Smart Features", "Energy Efficient"]
-                elif any(laptop in product_name_lower for laptop in ['laptop', 'computer']):
-                    default_features = ["High Performance", "Portable Design", "Latest Technology"]
-                else:
-                    default_features = ["Latest Technology", "High Quality Build", "Great Value for Money"]
-                
-                needed = 3 - len(features)
-                features.extend(default_features[:needed])
-            
-            # Construct product URL
-            product_url = ""
-            if product.get('url'):
-                product_id = product.get('product_id') or product.get('id', '')
-                if product_id:
-                    product_url = f"https://www.lotuselectronics.com/product/{product.get('url')}/{product_id}"
-            
+            product_id = product.get('product_id') or product.get('id', '')
+            display = product.get('display') or display_fields(
+                product['product_name'], product.get('description', ''), product['price'],
+                product.get('url', ''), product_id)
             products.append({
-                "product_id":product.get('product_id') or product.get('id', ''),
+                "product_id": product_id,
                 "product_name": product['product_name'],
-                "product_mrp": f"₹{product['price']:,.0f}",
-                "product_url": product_url,
+                "product_mrp": display['product_mrp'],
+                "product_url": display['product_url'],
                 "product_image": product.get('image_url', ''),
-                "features": features[:4]
+                "features": display['features']
             })
         
         # Return raw product data for LLM to process intelligently
         response = {
-            "search_query": query,
             "total_found": len(results),
             "price_filter": {
                 "min": price_min,
@@ -220,7 +504,7 @@ class ProductSearchTool:
             }
         }
         
-        return json.dumps(response, ensure_ascii=False, indent=2, separators=(',', ': '))
+        return json.dumps(response, ensure_ascii=False, separators=(',', ':'))
 
 # Initialize the product search tool instance
 product_search_instance = ProductSearchTool()
@@ -248,22 +532,8 @@ def search_products(query: str, top_k: int = 5, price_min: Optional[float] = Non
         - search_products("wireless headphones", top_k=10)
     """
     try:
-        # Perform the search
-        results = product_search_instance.search_products(
-            query=query,
-            top_k=top_k,
-            price_min=price_min,
-            price_max=price_max
-        )
-        
-        # Format and return results with search parameters
-        return product_search_instance.format_results(
-            results=results,
-            query=query,
-            top_k=top_k,
-            price_min=price_min,
-            price_max=price_max
-        )
+        # Splits price/brand filters out of the query text the LLM passed; repeats come from the cache
+        return product_search_instance.search_formatted(query, top_k, price_min, price_max)
         
     except Exception as e:
         return f"Error searching for products: {str(e)}"
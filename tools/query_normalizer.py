@@ -0,0 +1,286 @@
+"""
+Query normalization for product search.
+Turns a free-text query such as "samsung fridge under 30k" into a semantic
+query for the embedding ("samsung refrigerator") plus structured filters
+(price_max=30000, brand="Samsung", category="refrigerator"), with compiled
+patterns and a brand/category lexicon - no LLM call. The brand lexicon starts
+from the curated BRANDS (aliases such as "redmi" -> Xiaomi, multi-word names)
+and is extended with the brands of the catalog snapshot when ProductSearchTool
+loads it (add_catalog_brands: the first word of product names that start at
+least MIN_BRAND_PRODUCTS of them). Categories stay curated: the catalog has no
+category field to learn them from. Used by
+ProductSearchTool.search_products (so the /search endpoint gets it too) and by
+slot_memory for the per-session budget/brand/category slots.
+
+Amounts: "25000", "25,000", "₹25k", "25 thousand", "1.5 lakh", "2 lac",
+"1.2L", "1 crore". Bare numbers below MIN_PLAIN_PRICE are treated as model
+numbers or sizes ("s24", "55 inch"), not prices. An amount without a cue
+("under", "around", ...) is a maximum budget when it is unmistakably money:
+a currency sign or a unit ("1.5 lakh laptop", "₹30000 tv", "25k phone"), but
+not "4k tv" or "5000 mah".
+"""
+
+import re
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple, TypedDict
+
+_AMOUNT = r"(?:rs\.?\s*|inr\s*|₹\s*)?(\d+(?:,\d{2,3})*(?:\.\d+)?)\s*(k|thousand|l|lakhs?|lacs?|cr|crores?)?\b"
+_AMOUNT_RE = re.compile(_AMOUNT)
+_RANGE_RE = re.compile(r"(?:\b(?:between|from)\s*)?" + _AMOUNT + r"\s*(?:-|to|and)\s*" + _AMOUNT)
+_MAX_RE = re.compile(r"\b(?:under|below|less than|within|upto|up to|max(?:imum)?|not more than|budget(?: is| of)?|<)\s*" + _AMOUNT)
+# "25k budget", "30000 or less"
+_MAX_AFTER_RE = re.compile(_AMOUNT + r"\s*(?:budget|max|or less|or below|and below)\b")
+_MIN_RE = re.compile(r"\b(?:above|over|more than|min(?:imum)?|at least|starting(?: from| at)?|>)\s*" + _AMOUNT)
+_AROUND_RE = re.compile(r"\b(?:around|about|approx(?:imately)?|near|roughly)\s*" + _AMOUNT)
+# No cue: a currency sign, or a number with a unit ("1.5 lakh laptop", "₹30000 tv")
+_BARE_RE = re.compile(
+    r"(?:\brs\.?\s*|\binr\s*|₹\s*)(\d+(?:,\d{2,3})*(?:\.\d+)?)\s*(k|thousand|l|lakhs?|lacs?|cr|crores?)?\b"
+    r"|\b(\d+(?:,\d{2,3})*(?:\.\d+)?)\s*(k|thousand|l|lakhs?|lacs?|cr|crores?)\b"
+)
+
+_MULTIPLIERS = {
+    "k": 1_000, "thousand": 1_000,
+    "l": 100_000, "lakh": 100_000, "lakhs": 100_000, "lac": 100_000, "lacs": 100_000,
+    "cr": 10_000_000, "crore": 10_000_000, "crores": 10_000_000,
+}
+MIN_PLAIN_PRICE = 1000
+# "1.2L" is lakh, "250L" is a fridge's capacity in litres
+MAX_LAKH_SHORTHAND = 100
+# "around 30k" becomes a +/- band of this fraction
+AROUND_BAND = 0.15
+# Without a currency sign, "4k" / "8k" next to a product are resolutions, not ₹4,000
+MIN_BARE_THOUSANDS = 10
+
+BRANDS = {
+    "samsung": "Samsung", "lg": "LG", "sony": "Sony", "apple": "Apple", "iphone": "Apple",
+    "oneplus": "OnePlus", "one plus": "OnePlus", "xiaomi": "Xiaomi", "redmi": "Xiaomi", "mi": "Xiaomi",
+    "oppo": "Oppo", "vivo": "Vivo", "realme": "Realme", "motorola": "Motorola", "moto": "Motorola",
+    "nokia": "Nokia", "google": "Google", "pixel": "Google", "nothing": "Nothing", "iqoo": "iQOO",
+    "whirlpool": "Whirlpool", "godrej": "Godrej", "haier": "Haier", "voltas": "Voltas", "daikin": "Daikin",
+    "blue star": "Blue Star", "bluestar": "Blue Star", "hitachi": "Hitachi", "panasonic": "Panasonic",
+    "carrier": "Carrier", "lloyd": "Lloyd", "bosch": "Bosch", "ifb": "IFB", "hp": "HP", "dell": "Dell",
+    "lenovo": "Lenovo", "asus": "Asus", "acer": "Acer", "msi": "MSI", "boat": "boAt", "jbl": "JBL",
+    "philips": "Philips", "bajaj": "Bajaj", "havells": "Havells", "tcl": "TCL", "hisense": "Hisense",
+    "vu": "Vu", "crompton": "Crompton", "kent": "Kent", "aquaguard": "Aquaguard", "symphony": "Symphony",
+}
+CATEGORIES = {
+    "smartphone": "smartphone", "smartphones": "smartphone", "phone": "smartphone", "phones": "smartphone",
+    "mobile": "smartphone", "mobiles": "smartphone",
+    "tv": "television", "tvs": "television", "television": "television", "led tv": "television",
+    "laptop": "laptop", "laptops": "laptop", "notebook": "laptop",
+    "fridge": "refrigerator", "refrigerator": "refrigerator", "refrigerators": "refrigerator",
+    "ac": "air conditioner", "acs": "air conditioner", "air conditioner": "air conditioner",
+    "washing machine": "washing machine", "washer": "washing machine",
+    "microwave": "microwave", "oven": "microwave",
+    "headphone": "headphones", "headphones": "headphones", "earphones": "headphones",
+    "earbuds": "headphones", "buds": "headphones", "neckband": "headphones",
+    "speaker": "speaker", "speakers": "speaker", "soundbar": "soundbar",
+    "smartwatch": "smartwatch", "smart watch": "smartwatch", "watch": "smartwatch",
+    "tablet": "tablet", "tab": "tablet", "ipad": "tablet",
+    "water purifier": "water purifier", "ro": "water purifier",
+    "cooler": "air cooler", "air cooler": "air cooler", "geyser": "geyser", "water heater": "geyser",
+}
+# A catalog brand must start this many product names ("Acme X1 ..." once is noise)
+MIN_BRAND_PRODUCTS = 3
+# Words that start product names without being brands
+_NOT_BRANDS = {
+    "new", "the", "smart", "digital", "portable", "wireless", "bluetooth", "automatic", "fully", "semi",
+    "front", "top", "double", "single", "side", "split", "window", "inverter", "combo", "pack", "set",
+    "mini", "pro", "ultra", "max", "plus", "led", "oled", "qled", "full", "hd", "ultra hd", "gaming",
+}
+# Rewrites of the semantic query towards the wording used in catalog product names
+SYNONYMS = {
+    "fridge": "refrigerator", "fridges": "refrigerators",
+    "ac": "air conditioner", "acs": "air conditioners", "a/c": "air conditioner",
+    "mobile": "smartphone", "mobiles": "smartphones", "cellphone": "smartphone",
+    "washer": "washing machine", "telly": "tv", "earbud": "earbuds",
+    "lappy": "laptop", "specs": "specifications",
+}
+# Sizes and capacities: 55" -> 55 inch, 1.5t -> 1.5 ton, 250l -> 250 litre, 8gb -> 8 gb
+_UNIT_PATTERNS = [
+    (re.compile(r"\b(\d+(?:\.\d+)?)\s*(?:\"|''|inches|inch|in)(?=\s|$)"), r"\1 inch"),
+    (re.compile(r"\b(\d+(?:\.\d+)?)\s*(?:tons?|tonnes?|tr|t)\b"), r"\1 ton"),
+    (re.compile(r"\b(\d{2,4})\s*(?:ltrs?|litres?|liters?|l)\b"), r"\1 litre"),
+    (re.compile(r"\b(\d+)\s*(gb|tb|mah|mp|hz|w)\b"), r"\1 \2"),
+]
+# Request phrasing that carries no product meaning
+_FILLER_RE = re.compile(
+    r"\b(?:show me|show|i want|i need|i am looking for|i'm looking for|looking for|please|pls|can you|"
+    r"could you|suggest|recommend|find me|find|search for|get me|buy|some|any|me|a|an|the|"
+    r"price range|price|prices|budget|rupees|rs|inr|in my)\b"
+)
+# Connectives left dangling once a price phrase is cut out ("tv under 40k and above 20k")
+_DANGLING_RE = re.compile(r"^(?:and|or|for|with|in)\b\s*|\s*\b(?:and|or|for|with|in)$")
+_SPACE_RE = re.compile(r"\s+")
+
+
+def _lexicon_re(words) -> "re.Pattern":
+    # Longest first so "blue star" wins over "star", "led tv" over "tv"
+    alternatives = sorted(words, key=len, reverse=True)
+    return re.compile(r"(?<![\w/])(" + "|".join(re.escape(w) for w in alternatives) + r")(?![\w/])")
+
+
+_BRAND_RE = _lexicon_re(BRANDS)
+_CATEGORY_RE = _lexicon_re(CATEGORIES)
+_SYNONYM_RE = _lexicon_re(SYNONYMS)
+
+
+class NormalizedQuery(TypedDict):
+    """normalize_query() result; filters are None when the query doesn't state them."""
+    query: str
+    original: str
+    price_min: Optional[float]
+    price_max: Optional[float]
+    brand: Optional[str]
+    category: Optional[str]
+
+
+def to_amount(number: str, unit: Optional[str]) -> Optional[float]:
+    """Rupee value of a matched amount ("1.5", "lakh" -> 150000), or None if it isn't a price."""
+    try:
+        value = float(number.replace(",", ""))
+    except ValueError:
+        return None
+    if unit:
+        if unit == "l" and value >= MAX_LAKH_SHORTHAND:
+            return None
+        return value * _MULTIPLIERS[unit]
+    return value if value >= MIN_PLAIN_PRICE else None
+
+
+def parse_price(text: str) -> Optional[float]:
+    """First amount in `text` in rupees ("25k" -> 25000, "1.5 lakh" -> 150000), or None."""
+    for match in _AMOUNT_RE.finditer((text or "").lower()):
+        amount = to_amount(*match.groups())
+        if amount is not None:
+            return amount
+    return None
+
+
+def _budget(text: str) -> Tuple[Dict[str, float], List[Tuple[int, int]]]:
+    """Budget stated in lower-cased `text` and the spans of the phrases that stated it."""
+    match = _RANGE_RE.search(text)
+    if match:
+        # "20 to 30k" - the unit of the upper bound applies to both
+        low = to_amount(match.group(1), match.group(2) or match.group(4))
+        high = to_amount(match.group(3), match.group(4))
+        if low is not None and high is not None and low < high:
+            return {"price_min": low, "price_max": high}, [match.span()]
+
+    budget, spans = {}, []
+    for pattern, key in ((_MAX_RE, "price_max"), (_MAX_AFTER_RE, "price_max"), (_MIN_RE, "price_min")):
+        match = pattern.search(text)
+        if match and key not in budget:
+            amount = to_amount(match.group(1), match.group(2))
+            if amount is not None:
+                budget[key] = amount
+                spans.append(match.span())
+    if budget:
+        return budget, spans
+
+    match = _AROUND_RE.search(text)
+    if match:
+        amount = to_amount(match.group(1), match.group(2))
+        if amount is not None:
+            band = {"price_min": round(amount * (1 - AROUND_BAND)), "price_max": round(amount * (1 + AROUND_BAND))}
+            return band, [match.span()]
+
+    for match in _BARE_RE.finditer(text):
+        if match.group(1) is not None:
+            amount = to_amount(match.group(1), match.group(2))
+        elif match.group(4) in ("k", "thousand") and float(match.group(3).replace(",", "")) < MIN_BARE_THOUSANDS:
+            continue
+        else:
+            amount = to_amount(match.group(3), match.group(4))
+        if amount is not None:
+            return {"price_max": amount}, [match.span()]
+    return {}, []
+
+
+def parse_budget(text: str) -> Dict[str, float]:
+    """price_min / price_max implied by the text ({} when it states no budget)."""
+    return _budget((text or "").lower())[0]
+
+
+def find_brand(text: str) -> Optional[str]:
+    match = _BRAND_RE.search((text or "").lower())
+    return BRANDS[match.group(1)] if match else None
+
+
+def find_category(text: str) -> Optional[str]:
+    match = _CATEGORY_RE.search((text or "").lower())
+    return CATEGORIES[match.group(1)] if match else None
+
+
+def _brand_alias_res() -> Dict[str, "re.Pattern"]:
+    return {
+        brand: _lexicon_re([alias for alias, name in BRANDS.items() if name == brand])
+        for brand in set(BRANDS.values())
+    }
+
+
+_BRAND_ALIAS_RES = _brand_alias_res()
+
+
+def add_catalog_brands(product_names: Iterable[str]) -> int:
+    """Add the brands of a catalog (first words of its product names) to BRANDS; returns how many were new."""
+    counts, spellings = Counter(), {}
+    for name in product_names:
+        words = (name or "").split()
+        if not words:
+            continue
+        word = words[0].strip(".,()-")
+        key = word.lower()
+        if len(key) < 2 or not key.isalpha():
+            continue
+        counts[key] += 1
+        spellings.setdefault(key, Counter())[word] += 1
+    known = {alias for alias in BRANDS} | {alias.lower() for alias in BRANDS.values()}
+    new = {}
+    for key, count in counts.items():
+        if count < MIN_BRAND_PRODUCTS or key in known or key in _NOT_BRANDS:
+            continue
+        if key in CATEGORIES or key in SYNONYMS or _FILLER_RE.fullmatch(key):
+            continue
+        spelling = spellings[key].most_common(1)[0][0]
+        new[key] = spelling.title() if spelling.islower() else spelling
+    if new:
+        global _BRAND_RE, _BRAND_ALIAS_RES
+        # The dict first: a match of the new pattern must always find its brand
+        BRANDS.update(new)
+        _BRAND_RE = _lexicon_re(BRANDS)
+        _BRAND_ALIAS_RES = _brand_alias_res()
+    return len(new)
+
+
+def mentions_brand(text: str, brand: str) -> bool:
+    """Whether `text` (e.g. a product name) names `brand` or one of its aliases ("Redmi" for Xiaomi)."""
+    pattern = _BRAND_ALIAS_RES.get(brand)
+    return bool(pattern and pattern.search((text or "").lower()))
+
+
+def normalize_query(query: str) -> NormalizedQuery:
+    """Split a search query into semantic text and price/brand/category filters."""
+    text = (query or "").lower()
+    budget, spans = _budget(text)
+    for start, end in sorted(spans, reverse=True):
+        text = text[:start] + " " + text[end:]
+    for pattern, replacement in _UNIT_PATTERNS:
+        text = pattern.sub(replacement, text)
+    text = _SYNONYM_RE.sub(lambda m: SYNONYMS[m.group(1)], text)
+    text = _FILLER_RE.sub(" ", text)
+    semantic = _DANGLING_RE.sub("", _SPACE_RE.sub(" ", text).strip(" ,.?!-"))
+    return {
+        # A query that was nothing but filters ("under 20k") still needs some text to embed
+        "query": semantic or (query or "").strip(),
+        "original": query or "",
+        "price_min": budget.get("price_min"),
+        "price_max": budget.get("price_max"),
+        "brand": find_brand(semantic),
+        "category": find_category(semantic),
+    }
+
+
+__all__ = ['NormalizedQuery', 'normalize_query', 'parse_price', 'parse_budget', 'to_amount',
+           'find_brand', 'find_category', 'mentions_brand', 'add_catalog_brands', 'BRANDS', 'CATEGORIES',
+           'SYNONYMS']
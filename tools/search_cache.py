@@ -0,0 +1,139 @@
+"""
+Per-worker cache of formatted product search results, for the search_products
+tool and the /search endpoint. A repeat query skips the embedding, the index
+query and format_results, and gets back the compact JSON produced the first time.
+
+Keys are the normalized query (lower case, single spaces, after filter
+extraction), the brand, top_k and the price bounds rounded to whole rupees,
+so "Samsung AC under 50k" and "samsung ac below 50000" share an entry.
+
+Entries are fresh for SEARCH_CACHE_TTL seconds. After that, and for up to
+SEARCH_CACHE_STALE_SECONDS more, a hit still returns the stored result at once
+and refreshes it on a background thread (stale-while-revalidate, one refresh
+per key at a time); older entries are recomputed in the request. Results
+with no products are not stored (a failed search looks the same). Every entry
+belongs to a catalog version (the loaded snapshot's checksum, which changes when
+ProductSearchTool reloads a rebuilt snapshot): when the version changes the
+whole cache is dropped. Pinecone without a snapshot has no version, so its
+entries are only bounded by the TTLs.
+
+Values are format_results JSON without "search_query", which the caller adds
+after the lookup: queries sharing an entry are worded differently.
+
+Configuration (environment):
+    SEARCH_CACHE_SIZE           entries per worker (default: 1024, 0 disables)
+    SEARCH_CACHE_TTL            seconds a result is fresh (default: 60)
+    SEARCH_CACHE_STALE_SECONDS  seconds a stale result may be served while refreshing (default: 240)
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Hashable, Optional, Tuple
+
+from chat_metrics import SEARCH_CACHE_TOTAL
+from tools.embeddings import normalize_text
+
+SEARCH_CACHE_SIZE = int(os.getenv("SEARCH_CACHE_SIZE", "1024"))
+SEARCH_CACHE_TTL = float(os.getenv("SEARCH_CACHE_TTL", "60"))
+SEARCH_CACHE_STALE_SECONDS = float(os.getenv("SEARCH_CACHE_STALE_SECONDS", "240"))
+
+# compute() returns the value and whether it may be stored
+Compute = Callable[[], Tuple[str, bool]]
+
+
+def search_key(query: str, top_k: int, price_min: Optional[float], price_max: Optional[float],
+               brand: Optional[str] = None) -> Tuple:
+    """Cache key of a normalized search."""
+    return (
+        normalize_text(query),
+        (brand or "").lower(),
+        int(top_k),
+        None if price_min is None else round(price_min),
+        None if price_max is None else round(price_max),
+    )
+
+
+class SearchResultCache:
+    """LRU of formatted results with a fresh TTL and a stale-while-revalidate window."""
+
+    def __init__(self, max_entries: int = SEARCH_CACHE_SIZE, ttl: float = SEARCH_CACHE_TTL,
+                 stale_seconds: float = SEARCH_CACHE_STALE_SECONDS):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.stale_seconds = stale_seconds
+        self.version = None
+        self._entries = OrderedDict()   # key -> (stored at, value)
+        self._refreshing = set()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.ttl > 0
+
+    def set_version(self, version: str) -> None:
+        """Drop every entry if the catalog version differs from the one they were computed on."""
+        with self._lock:
+            if version != self.version:
+                if self.version is not None:
+                    SEARCH_CACHE_TOTAL.labels(result='invalidated').inc(len(self._entries))
+                self._entries.clear()
+                self.version = version
+
+    def _store(self, key: Hashable, value: str, version: str) -> None:
+        with self._lock:
+            # Computed on a catalog that has been replaced meanwhile
+            if version != self.version:
+                return
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _refresh(self, key: Hashable, compute: Compute, version: str) -> None:
+        try:
+            value, cacheable = compute()
+            if cacheable:
+                self._store(key, value, version)
+        except Exception as e:
+            print(f"⚠️  Search cache refresh failed: {e}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def get_or_compute(self, key: Hashable, compute: Compute, version: str = "") -> str:
+        """The cached value of `key`, computing it (or refreshing it in the background) as needed."""
+        if not self.enabled:
+            return compute()[0]
+        self.set_version(version)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                age = now - entry[0]
+                if age < self.ttl:
+                    SEARCH_CACHE_TOTAL.labels(result='hit').inc()
+                    return entry[1]
+                if age < self.ttl + self.stale_seconds:
+                    if key not in self._refreshing:
+                        self._refreshing.add(key)
+                        threading.Thread(target=self._refresh, args=(key, compute, version), daemon=True).start()
+                    SEARCH_CACHE_TOTAL.labels(result='stale').inc()
+                    return entry[1]
+        SEARCH_CACHE_TOTAL.labels(result='miss').inc()
+        value, cacheable = compute()
+        if cacheable:
+            self._store(key, value, version)
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+__all__ = ['SearchResultCache', 'search_key', 'SEARCH_CACHE_SIZE', 'SEARCH_CACHE_TTL', 'SEARCH_CACHE_STALE_SECONDS']
@@ -9,10 +9,11 @@ import json
 from typing import Dict, List, Any
 from langchain_core.tools import tool
 from pydantic import BaseModel, Field
+from chat_metrics import PINECONE_QUERY_SECONDS, timed
 
 try:
     from pinecone import Pinecone
-    from sentence_transformers import SentenceTransformer
+    from tools.embeddings import get_embedder
     from textblob import TextBlob
     from langchain_google_genai import ChatGoogleGenerativeAI
     DEPENDENCIES_AVAILABLE = True
@@ -37,6 +38,7 @@ class TermsConditionsSearchTool:
     def __init__(self, use_llm_refinement=False):
         self.is_available = DEPENDENCIES_AVAILABLE
         self.index = None
+        self.embedder = None
         self.model = None
         self.llm = None
         self.use_llm_refinement = use_llm_refinement
@@ -55,8 +57,9 @@ class TermsConditionsSearchTool:
             )
             self.index_name = "lotus-tc"
             
-            # Initialize embedding model
-            self.model = SentenceTransformer('all-MiniLM-L6-v2')
+            # Embedding model shared with product search (or the embedding sidecar), behind the query embedding cache
+            self.embedder = get_embedder()
+            self.model = self.embedder.model
             
             # Initialize Pinecone
             pc = Pinecone(api_key=self.pinecone_api_key)
@@ -225,7 +228,7 @@ Provide only the refined policy text, no additional commentary:
         Returns:
             Dictionary containing relevant policy sections
         """
-        if not self.is_available or not self.index or not self.model:
+        if not self.is_available or not self.index or not self.embedder:
             return {
                 "success": False,
                 "error": "Terms & Conditions search service is currently unavailable",
@@ -238,17 +241,18 @@ Provide only the refined policy text, no additional commentary:
             if max_results <= 2:  # Only show debug info for test runs
                 print(f"🔍 Searching for: '{corrected_query}'")
             
-            # Embed the query
-            query_embedding = self.model.encode(corrected_query).tolist()
+            # Embed the query (cached: popular questions skip the model)
+            query_embedding = self.embedder.encode(corrected_query, component='terms_conditions').tolist()
             if max_results <= 2:  # Only show debug info for test runs
                 print(f"📊 Query embedding dimension: {len(query_embedding)}")
             
             # Query Pinecone - match the working search_tc.py exactly
-            results = self.index.query(
-                vector=query_embedding,
-                top_k=min(max_results, 5),
-                include_metadata=True
-            )
+            with timed(PINECONE_QUERY_SECONDS, index=self.index_name):
+                results = self.index.query(
+                    vector=query_embedding,
+                    top_k=min(max_results, 5),
+                    include_metadata=True
+                )
             
             if max_results <= 2:  # Only show debug info for test runs
                 print(f"🔍 Raw Pinecone results: {len(results.get('matches', []))} matches found")
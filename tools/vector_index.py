@@ -0,0 +1,402 @@
+"""
+In-process nearest-neighbour index over a snapshot of the Pinecone product catalog.
+LocalVectorIndex answers query(vector=..., top_k=..., include_metadata=...) like
+a Pinecone Index (response.matches with .id / .score / .metadata), so
+ProductSearchTool can use either without a network round trip for local search.
+
+The snapshot is one file that every worker memory-maps read-only: the kernel
+keeps a single page-cache copy however many gunicorn workers open it, and
+NumPy arrays are views straight into the mapping (no per-worker copy of the
+catalog). Metadata dicts are built only for the rows a query returns.
+
+Search is an exact scan over the quantized embeddings, converted to float32 a
+block of rows at a time (int8 converts several times faster than float16).
+hnswlib is used instead when it is installed and the catalog is large enough
+for an approximate index to pay off (its graph lives in each worker's memory).
+
+Snapshot file (written by save_snapshot / build_catalog_snapshot.py):
+    header    64 bytes: magic, format version, dtype, rows, dims, TOC length,
+              SHA-256 of everything after the header
+    TOC       JSON: byte offset and length of each section
+    sections  (64-byte aligned)
+              vectors     float16, or int8 with a float32 per-row scale
+              price       float64 (NaN when unknown)
+              <column>    uint64 offsets + UTF-8 bytes per string column
+              (id, product_id, product_name, sku, url, image_url, text)
+              display columns derived at write time (tools/product_display.py):
+              features ("|"-joined), category, product_mrp, product_url;
+              optional, older snapshots have none
+Files are replaced atomically, so workers still mapping the old one keep
+working until they reload.
+
+Queries accept Pinecone's price filter, {"price_num": {"$gte": ..., "$lte": ...}},
+evaluated on the price column before ranking, so a filtered query fills top_k
+from the matching products only (exact search; the HNSW graph cannot filter and
+reports supports_filter = False).
+
+Configuration (environment):
+    PRODUCT_SEARCH_BACKEND  "pinecone" (default) or "local"
+    CATALOG_SNAPSHOT_PATH   snapshot file (default: data/catalog.snap)
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import struct
+import tempfile
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from tools.product_display import FEATURE_SEPARATOR, display_fields, search_description
+
+try:
+    import hnswlib
+    HNSWLIB_AVAILABLE = True
+except ImportError:
+    HNSWLIB_AVAILABLE = False
+
+PRODUCT_SEARCH_BACKEND = os.getenv("PRODUCT_SEARCH_BACKEND", "pinecone").lower()
+CATALOG_SNAPSHOT_PATH = os.getenv(
+    "CATALOG_SNAPSHOT_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "catalog.snap"),
+)
+
+SNAPSHOT_MAGIC = b"LOTUSCAT"
+SNAPSHOT_VERSION = 1
+# magic, version, dtype code, rows, dims, TOC length, SHA-256 of the rest of the file
+_HEADER = struct.Struct("<8sHHIIQ32s")
+HEADER_SIZE = 64
+SECTION_ALIGN = 64
+_DTYPES = {1: "float16", 2: "int8"}
+_DTYPE_CODES = {name: code for code, name in _DTYPES.items()}
+
+STRING_COLUMNS = ("id", "product_id", "product_name", "sku", "url", "image_url", "text")
+# Precomputed search result fields; read only if present in the file
+DISPLAY_COLUMNS = ("features", "category", "product_mrp", "product_url")
+# search_products only shows the first 200 characters of the description
+DESCRIPTION_CHARS = 200
+
+# Rows converted to float32 at a time during an exact scan (1.5 MB at 384 dims, stays in cache)
+SCORE_BLOCK_ROWS = 1024
+
+# Below this many vectors an exact scan beats building and querying an HNSW graph
+HNSW_MIN_VECTORS = 20000
+HNSW_M = 16
+HNSW_EF_CONSTRUCTION = 200
+HNSW_EF_SEARCH = 100
+
+
+class Match:
+    """One search hit, shaped like a Pinecone ScoredVector."""
+    __slots__ = ("id", "score", "metadata")
+
+    def __init__(self, id: str, score: float, metadata: Optional[Dict[str, Any]]):
+        self.id = id
+        self.score = score
+        self.metadata = metadata
+
+
+class QueryResponse:
+    """Shaped like a Pinecone QueryResponse."""
+    __slots__ = ("matches",)
+
+    def __init__(self, matches: List[Match]):
+        self.matches = matches
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def _quantize(vectors: np.ndarray, dtype: str):
+    """(stored matrix, per-row float32 scales or None) for normalized float32 `vectors`."""
+    if dtype == "float16":
+        return vectors.astype(np.float16), None
+    if dtype == "int8":
+        scales = np.abs(vectors).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        return np.round(vectors / scales[:, None]).astype(np.int8), scales.astype(np.float32)
+    raise ValueError(f"unsupported snapshot dtype: {dtype}")
+
+
+def _price(metadata: Dict[str, Any]) -> float:
+    try:
+        return float(metadata.get("price_num", metadata.get("price")))
+    except (TypeError, ValueError):
+        return float("nan")
+
+
+def _display(vector_id: str, metadata: Dict[str, Any]) -> Dict[str, str]:
+    """DISPLAY_COLUMNS values of one product, as search_products would derive them from its metadata."""
+    fields = display_fields(
+        str(metadata.get("product_name") or "").strip(),
+        search_description(str(metadata.get("text") or "")),
+        _price(metadata),
+        str(metadata.get("url") or "").strip(),
+        str(metadata.get("product_id") or vector_id),
+    )
+    fields["features"] = FEATURE_SEPARATOR.join(fields["features"])
+    return fields
+
+
+def _string_column(values: List[str]):
+    encoded = [value.encode("utf-8") for value in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.uint64)
+    offsets[1:] = np.cumsum([len(value) for value in encoded], dtype=np.uint64)
+    return offsets, b"".join(encoded)
+
+
+def save_snapshot(path: str, ids: List[str], vectors, metadata: List[Dict[str, Any]],
+                  dtype: str = "float16") -> str:
+    """Write a snapshot file (see the module docstring); returns its SHA-256."""
+    if len(ids) != len(vectors) or len(ids) != len(metadata):
+        raise ValueError(f"snapshot mismatch: {len(ids)} ids, {len(vectors)} vectors, {len(metadata)} metadata rows")
+    matrix = _normalize(np.asarray(vectors, dtype=np.float32))
+    stored, scales = _quantize(matrix, dtype)
+
+    sections = [("vectors", stored.tobytes())]
+    if scales is not None:
+        sections.append(("scales", scales.tobytes()))
+    sections.append(("price", np.array([_price(m) for m in metadata], dtype=np.float64).tobytes()))
+    for column in STRING_COLUMNS:
+        if column == "id":
+            values = [str(i) for i in ids]
+        else:
+            values = [str(m.get(column) or "").strip() for m in metadata]
+            if column == "text":
+                values = [value[:DESCRIPTION_CHARS] for value in values]
+        offsets, data = _string_column(values)
+        sections.append((f"{column}.offsets", offsets.tobytes()))
+        sections.append((f"{column}.data", data))
+    # Derived once here instead of on every search
+    display = [_display(str(i), m) for i, m in zip(ids, metadata)]
+    for column in DISPLAY_COLUMNS:
+        offsets, data = _string_column([fields[column] for fields in display])
+        sections.append((f"{column}.offsets", offsets.tobytes()))
+        sections.append((f"{column}.data", data))
+
+    # Section offsets are relative to the end of the TOC, so the TOC can be sized first
+    layout, position = {}, 0
+    for name, data in sections:
+        layout[name] = [position, len(data)]
+        position += len(data) + (-len(data)) % SECTION_ALIGN
+    toc = json.dumps({"sections": layout}).encode("utf-8")
+    toc += b" " * ((-(HEADER_SIZE + len(toc))) % SECTION_ALIGN)
+
+    digest = hashlib.sha256(toc)
+    for _, data in sections:
+        digest.update(data)
+        digest.update(b"\0" * ((-len(data)) % SECTION_ALIGN))
+    header = _HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, _DTYPE_CODES[dtype], len(ids),
+                          stored.shape[1], len(toc), digest.digest())
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(header.ljust(HEADER_SIZE, b"\0"))
+            f.write(toc)
+            for _, data in sections:
+                f.write(data)
+                f.write(b"\0" * ((-len(data)) % SECTION_ALIGN))
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return digest.hexdigest()
+
+
+class CatalogSnapshot:
+    """Read-only, memory-mapped view of a snapshot file."""
+
+    def __init__(self, path: str = CATALOG_SNAPSHOT_PATH, verify: bool = True):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._open(verify)
+        except Exception:
+            self._mmap.close()
+            raise
+
+    def _open(self, verify: bool) -> None:
+        if len(self._mmap) < HEADER_SIZE:
+            raise ValueError(f"{self.path}: truncated snapshot")
+        magic, version, dtype_code, rows, dims, toc_length, digest = _HEADER.unpack_from(self._mmap, 0)
+        if magic != SNAPSHOT_MAGIC:
+            raise ValueError(f"{self.path}: not a catalog snapshot")
+        if version != SNAPSHOT_VERSION:
+            raise ValueError(f"{self.path}: snapshot format v{version}, expected v{SNAPSHOT_VERSION}")
+        if dtype_code not in _DTYPES:
+            raise ValueError(f"{self.path}: unknown vector dtype {dtype_code}")
+        if verify and hashlib.sha256(memoryview(self._mmap)[HEADER_SIZE:]).digest() != digest:
+            raise ValueError(f"{self.path}: checksum mismatch")
+
+        self.version = version
+        self.checksum = digest.hex()
+        self.dtype = _DTYPES[dtype_code]
+        self.rows = rows
+        self.dims = dims
+        base = HEADER_SIZE + toc_length
+        toc = json.loads(bytes(self._mmap[HEADER_SIZE:base]))
+        self._sections = {name: (base + offset, length) for name, (offset, length) in toc["sections"].items()}
+
+        self.vectors = self._array("vectors", self.dtype, rows * dims).reshape(rows, dims)
+        self.scales = self._array("scales", np.float32, rows) if self.dtype == "int8" else None
+        self.prices = self._array("price", np.float64, rows)
+        self.columns = STRING_COLUMNS + tuple(c for c in DISPLAY_COLUMNS if f"{c}.offsets" in self._sections)
+        self._offsets = {column: self._array(f"{column}.offsets", np.uint64, rows + 1) for column in self.columns}
+
+    def _array(self, section: str, dtype, count: int) -> np.ndarray:
+        offset, _ = self._sections[section]
+        # A view into the mapping: read-only, shared with every other process mapping the file
+        return np.frombuffer(self._mmap, dtype=dtype, count=count, offset=offset)
+
+    def __len__(self) -> int:
+        return self.rows
+
+    def string(self, column: str, row: int) -> str:
+        offsets = self._offsets[column]
+        start, end = int(offsets[row]), int(offsets[row + 1])
+        data_offset = self._sections[f"{column}.data"][0]
+        return self._mmap[data_offset + start:data_offset + end].decode("utf-8")
+
+    def metadata(self, row: int) -> Dict[str, Any]:
+        """Pinecone-style metadata dict of one row."""
+        metadata = {column: self.string(column, row) for column in self.columns if column != "id"}
+        if not metadata["sku"]:
+            del metadata["sku"]
+        price = float(self.prices[row])
+        if price == price:
+            metadata["price"] = price
+        return metadata
+
+    def scores(self, query: np.ndarray) -> np.ndarray:
+        """Cosine similarity of a normalized float32 query with every row."""
+        scores = np.empty(self.rows, dtype=np.float32)
+        block = np.empty((min(SCORE_BLOCK_ROWS, self.rows), self.dims), dtype=np.float32)
+        for start in range(0, self.rows, SCORE_BLOCK_ROWS):
+            end = min(start + SCORE_BLOCK_ROWS, self.rows)
+            rows = block[:end - start]
+            rows[...] = self.vectors[start:end]
+            np.matmul(rows, query, out=scores[start:end])
+        if self.scales is not None:
+            scores *= self.scales
+        return scores
+
+    def dense_vectors(self) -> np.ndarray:
+        """Dequantized float32 copy of the matrix (for building an HNSW graph)."""
+        vectors = self.vectors.astype(np.float32)
+        if self.scales is not None:
+            vectors *= self.scales[:, None]
+        return vectors
+
+    def close(self) -> None:
+        self.vectors = self.scales = self.prices = None
+        self._offsets = {}
+        self._mmap.close()
+
+
+class LocalVectorIndex:
+    """Cosine-similarity index over a catalog snapshot, queried like a Pinecone Index."""
+
+    def __init__(self, snapshot: CatalogSnapshot, use_hnsw: Optional[bool] = None):
+        self.snapshot = snapshot
+        if use_hnsw is None:
+            use_hnsw = HNSWLIB_AVAILABLE and len(snapshot) >= HNSW_MIN_VECTORS
+        self._hnsw = self._build_hnsw() if use_hnsw else None
+
+    @classmethod
+    def load(cls, path: str = CATALOG_SNAPSHOT_PATH, verify: bool = True, **kwargs) -> "LocalVectorIndex":
+        return cls(CatalogSnapshot(path, verify=verify), **kwargs)
+
+    @property
+    def backend(self) -> str:
+        return "hnsw" if self._hnsw is not None else "exact"
+
+    @property
+    def supports_filter(self) -> bool:
+        """Whether query(filter=...) restricts the search (True) or is ignored (HNSW)."""
+        return self._hnsw is None
+
+    @property
+    def version(self) -> str:
+        """Checksum of the loaded snapshot; changes whenever the catalog is rebuilt."""
+        return self.snapshot.checksum
+
+    def __len__(self) -> int:
+        return len(self.snapshot)
+
+    def _build_hnsw(self):
+        if not HNSWLIB_AVAILABLE:
+            raise RuntimeError("hnswlib is not installed")
+        index = hnswlib.Index(space="ip", dim=self.snapshot.dims)
+        index.init_index(max_elements=len(self.snapshot), ef_construction=HNSW_EF_CONSTRUCTION, M=HNSW_M)
+        index.add_items(self.snapshot.dense_vectors(), np.arange(len(self.snapshot)))
+        index.set_ef(HNSW_EF_SEARCH)
+        return index
+
+    def _price_rows(self, filter: Optional[Dict[str, Any]]) -> Optional[np.ndarray]:
+        """Row numbers passing a {"price_num": {"$gte"/"$gt"/"$lte"/"$lt": x}} filter, None without one."""
+        bounds = (filter or {}).get("price_num")
+        if not bounds:
+            return None
+        prices = self.snapshot.prices
+        mask = ~np.isnan(prices)
+        for op, value in bounds.items():
+            if op == "$gte":
+                mask &= prices >= value
+            elif op == "$gt":
+                mask &= prices > value
+            elif op == "$lte":
+                mask &= prices <= value
+            elif op == "$lt":
+                mask &= prices < value
+            else:
+                raise ValueError(f"unsupported price filter operator: {op}")
+        return np.flatnonzero(mask)
+
+    def _search(self, vector: np.ndarray, top_k: int, filter: Optional[Dict[str, Any]] = None):
+        """Row numbers and cosine scores of the top_k nearest products (within `filter`), best first."""
+        top_k = min(top_k, len(self.snapshot))
+        if top_k <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        if self._hnsw is not None:
+            self._hnsw.set_ef(max(HNSW_EF_SEARCH, top_k))
+            labels, distances = self._hnsw.knn_query(vector, k=top_k)
+            # hnswlib's "ip" distance is 1 - dot product
+            return labels[0].astype(np.int64), 1.0 - distances[0]
+        scores = self.snapshot.scores(vector)
+        candidates = self._price_rows(filter)
+        if candidates is None:
+            candidates = np.arange(len(scores))
+        top_k = min(top_k, len(candidates))
+        if top_k <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        candidate_scores = scores[candidates]
+        if top_k < len(candidates):
+            best = np.argpartition(-candidate_scores, top_k - 1)[:top_k]
+        else:
+            best = np.arange(len(candidates))
+        best = best[np.argsort(-candidate_scores[best], kind="stable")]
+        return candidates[best], candidate_scores[best]
+
+    def query(self, vector, top_k: int = 10, include_metadata: bool = False,
+              filter: Optional[Dict[str, Any]] = None, **kwargs) -> QueryResponse:
+        """Pinecone-compatible query (price_num filters only); other Pinecone arguments are ignored."""
+        query = _normalize(np.asarray(vector, dtype=np.float32))
+        rows, scores = self._search(query, top_k, filter)
+        return QueryResponse([
+            Match(self.snapshot.string("id", row), float(score),
+                  self.snapshot.metadata(row) if include_metadata else None)
+            for row, score in zip(rows.tolist(), scores.tolist())
+        ])
+
+
+__all__ = ['LocalVectorIndex', 'CatalogSnapshot', 'QueryResponse', 'Match', 'save_snapshot',
+           'HNSWLIB_AVAILABLE', 'PRODUCT_SEARCH_BACKEND', 'CATALOG_SNAPSHOT_PATH', 'SNAPSHOT_VERSION']
@@ -0,0 +1,187 @@
+"""
+Sampled structured tracing for the chat hot path.
+Spans per request, graph node and tool call are written as JSON lines through a
+non-blocking queue handler. Sampling is decided once per request (head-based):
+unsampled requests get a shared no-op span, so disabled tracing costs a context
+variable lookup per call site.
+
+Configuration (environment):
+    TRACE_SAMPLE_RATE   fraction of requests to trace, 0.0-1.0 (default: 0.0)
+    TRACE_LOG_FILE      file to append JSON spans to (default: stderr)
+"""
+
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import time
+import uuid
+from contextvars import ContextVar
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "0.0"))
+TRACE_LOG_FILE = os.getenv("TRACE_LOG_FILE")
+
+_current_trace: ContextVar[Optional["Trace"]] = ContextVar("lotus_trace", default=None)
+_current_span_id: ContextVar[Optional[str]] = ContextVar("lotus_span_id", default=None)
+
+_logger = logging.getLogger("lotus.trace")
+_logger.propagate = False
+_listener = None
+_listener_pid = None
+
+
+class _DeferredQueueHandler(QueueHandler):
+    """QueueHandler that leaves JSON encoding to the listener thread."""
+
+    def prepare(self, record):
+        return record
+
+
+class _JsonFormatter(logging.Formatter):
+    def format(self, record):
+        return json.dumps(record.msg, ensure_ascii=False, default=str)
+
+
+def _ensure_listener():
+    """Start the queue listener lazily, once per process (gunicorn forks after import)."""
+    global _listener, _listener_pid
+    if _listener is not None and _listener_pid == os.getpid():
+        return
+    if TRACE_LOG_FILE:
+        handler = logging.FileHandler(TRACE_LOG_FILE)
+    else:
+        handler = logging.StreamHandler()
+    handler.setFormatter(_JsonFormatter())
+
+    trace_queue = queue.SimpleQueue()
+    _logger.handlers = [_DeferredQueueHandler(trace_queue)]
+    _logger.setLevel(logging.INFO)
+    _listener = QueueListener(trace_queue, handler)
+    _listener.start()
+    _listener_pid = os.getpid()
+    atexit.register(_listener.stop)
+
+
+class _NoopSpan:
+    """Returned for unsampled requests - every operation is a no-op."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+    def event(self, name, **attrs):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class Trace:
+    """A sampled request; owns the trace id shared by all of its spans."""
+
+    def __init__(self):
+        self.trace_id = uuid.uuid4().hex
+
+    def emit(self, record: dict):
+        record["trace_id"] = self.trace_id
+        _logger.info(record)
+
+
+class Span:
+    """A timed unit of work inside a sampled trace."""
+
+    def __init__(self, trace: Trace, name: str, attrs: dict, root: bool = False):
+        self.trace = trace
+        self.name = name
+        self.attrs = attrs
+        self.root = root
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = _current_span_id.get()
+        self.events = []
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        self._start_ts = time.time()
+        self._span_token = _current_span_id.set(self.span_id)
+        if self.root:
+            self._trace_token = _current_trace.set(self.trace)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration_ms = (time.perf_counter() - self._start) * 1000
+        _current_span_id.reset(self._span_token)
+        if self.root:
+            _current_trace.reset(self._trace_token)
+
+        record = {
+            "span": self.name,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start": self._start_ts,
+            "duration_ms": round(duration_ms, 3),
+            "attrs": self.attrs,
+        }
+        if self.events:
+            record["events"] = self.events
+        if exc is not None:
+            record["error"] = f"{type(exc).__name__}: {exc}"
+        self.trace.emit(record)
+        return False
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def event(self, name, **attrs):
+        self.events.append({"name": name, "offset_ms": round((time.perf_counter() - self._start) * 1000, 3), **attrs})
+
+
+def start_trace(name: str, sample_rate: Optional[float] = None, **attrs):
+    """
+    Begin a request trace. The sampling decision is made here and inherited by
+    every span opened inside it; unsampled requests get NOOP_SPAN.
+    """
+    rate = TRACE_SAMPLE_RATE if sample_rate is None else sample_rate
+    if rate <= 0 or (rate < 1 and random.random() >= rate):
+        return NOOP_SPAN
+    _ensure_listener()
+    return Span(Trace(), name, attrs, root=True)
+
+
+def span(name: str, **attrs):
+    """Open a child span of the current trace, or NOOP_SPAN when not sampled."""
+    trace = _current_trace.get()
+    if trace is None:
+        return NOOP_SPAN
+    return Span(trace, name, attrs)
+
+
+def is_sampled() -> bool:
+    """True inside a sampled trace - guard expensive attribute building with this."""
+    return _current_trace.get() is not None
+
+
+def event(name: str, **attrs):
+    """Record a point-in-time event as a zero-length span of the current trace."""
+    trace = _current_trace.get()
+    if trace is None:
+        return
+    trace.emit({
+        "span": name,
+        "span_id": uuid.uuid4().hex[:16],
+        "parent_id": _current_span_id.get(),
+        "start": time.time(),
+        "duration_ms": 0.0,
+        "attrs": attrs,
+    })
+
+
+__all__ = ['start_trace', 'span', 'event', 'is_sampled', 'NOOP_SPAN', 'TRACE_SAMPLE_RATE']